@@ -0,0 +1,145 @@
+# encoding: utf-8
+"""
+Benchmark of decoding RabbitMQ messages and building their records.
+
+Compares the original decoder, which logged every message at ``INFO`` and
+parsed with the standard library, against ``RabbitMQInput.record`` with
+`orjson <https://github.com/ijl/orjson>`_ and with the standard library.
+Logging is enabled at ``INFO`` and written to ``/dev/null``.
+
+Usage::
+
+    python benchmarks/rabbitmq_decode.py --messages 1000000
+
+"""
+__author__ = "Richard Smith"
+__date__ = "19 Oct 2026"
+__copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+__contact__ = "richard.d.smith@stfc.ac.uk"
+
+import argparse
+import ast
+import itertools
+import json
+import logging
+import os
+import time
+from collections.abc import Callable
+
+from stac_generator.core import utils
+from stac_generator.plugins.inputs.rabbit_mq import RabbitMQInput
+
+LOGGER = logging.getLogger("benchmark")
+
+
+def messages(count: int) -> list[bytes]:
+    """
+    Synthetic file events.
+
+    :param count: number of messages
+    """
+    return [
+        json.dumps(
+            {
+                "uri": f"/badc/cmip6/data/file_{number}.nc",
+                "action": "DEPOSIT",
+                "filesize": number,
+                "datetime": "2024-01-01 00:00:00",
+            }
+        ).encode("utf-8")
+        for number in range(count)
+    ]
+
+
+def original_record(body: bytes) -> dict:
+    """
+    Decoding and record building as the input did before formats were configurable.
+
+    :param body: message body
+    """
+    body = body.decode("utf-8")
+
+    LOGGER.info("RabbitMQ message recieved: %s", body)
+
+    try:
+        msg = json.loads(body)
+
+    except json.JSONDecodeError:
+        msg = ast.literal_eval(body)
+
+    if "uri" not in msg:
+        msg["uri"] = msg["filepath"]
+
+    LOGGER.info("Input processing: %s message: %s", msg["uri"], msg)
+
+    return {"uri": msg["uri"]}
+
+
+class Tracker:
+    """Stands in for the tracker of a channel."""
+
+    def complete(self, delivery_tag: int) -> None:
+        pass
+
+
+def current_record() -> Callable[[bytes], dict]:
+    """
+    Record building of a ``RabbitMQInput`` with the default configuration.
+    """
+    rabbit_input = RabbitMQInput(
+        conf={
+            "connection": {"user": "u", "password": "p", "host": "h", "vhost": "v"},
+            "exchange": {"name": "e"},
+            "uri_term": "uri",
+            "regex": "",
+        }
+    )
+    rabbit_input.received = itertools.count(1)
+    tracker = Tracker()
+
+    return lambda body: rabbit_input.record(tracker, 1, body)
+
+
+def timed(record: Callable[[bytes], dict], bodies: list[bytes]) -> float:
+    """
+    Seconds taken to build the records for the messages.
+
+    :param record: record builder
+    :param bodies: message bodies
+    """
+    start = time.perf_counter()
+
+    for body in bodies:
+        record(body)
+
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--messages", type=int, default=1_000_000, help="Number of messages")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, stream=open(os.devnull, "w"))
+    bodies = messages(args.messages)
+
+    results = {"before": timed(original_record, bodies)}
+
+    if utils.orjson:
+        results["after, orjson"] = timed(current_record(), bodies)
+
+    orjson, utils.orjson = utils.orjson, None
+    try:
+        results["after, stdlib json"] = timed(current_record(), bodies)
+
+    finally:
+        utils.orjson = orjson
+
+    for name, seconds in results.items():
+        rate = args.messages / seconds / 1000
+        print(f"{name + ':':21}{seconds:5.1f}s ({rate:,.0f}k msg/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -45,6 +45,7 @@ class Recipe(BaseModel):
     type: str
     paths: Optional[list[Path]] = []
     extraction_methods: Optional[list[ExtractionMethodConf]] = []
+    cost: Optional[float] = None
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -58,7 +59,8 @@ class Recipe(BaseModel):
 
     def set_key(self):
         """Fuction to set recipe key"""
-        recipe_json = self.model_dump_json()
+        # The cost is a scheduling hint, so changing it keeps the key
+        recipe_json = self.model_dump_json(exclude={"cost"})
         # Using hash for key as it is independent of storage location
         self._key = hashlib.md5(recipe_json.encode("utf-8")).hexdigest()
 
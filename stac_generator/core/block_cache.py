@@ -0,0 +1,319 @@
+# encoding: utf-8
+"""
+Block Cache
+-----------
+
+A byte range cache shared by the extraction methods of a generator, so the
+header bytes of a remote object are only fetched once however many methods
+read them.
+
+Objects are split into fixed size blocks keyed by ``(uri, etag, block)``.
+Blocks are held in an in-memory LRU within ``memory_limit`` bytes, with an
+optional local disk tier. Adjacent missing blocks are fetched in a single
+range request, along with ``read_ahead`` blocks after the requested range.
+
+Enable it in the generator configuration:
+
+.. code-block:: yaml
+
+    block_cache:
+      block_size: 262144
+      memory_limit: 536870912
+      disk_path: /tmp/stac-generator-cache
+      read_ahead: 2
+
+The cache is passed to the extraction methods in the ``BLOCK_CACHE`` kwarg
+and is registered as the ``block_cache`` client, so inputs can reference it
+from record bodies with a :py:class:`~stac_generator.core.clients.ClientReference`.
+Extraction methods can then read a range with :py:meth:`BlockCache.read` or
+open a seekable file object with :py:meth:`BlockCache.open`.
+
+The disk tier is not evicted, so point ``disk_path`` at scratch space which
+is cleaned up externally.
+
+"""
+__author__ = "Richard Smith"
+__date__ = "19 Oct 2026"
+__copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+__contact__ = "richard.d.smith@stfc.ac.uk"
+
+import hashlib
+import io
+import logging
+import os
+import threading
+from typing import Any
+from urllib.parse import urlparse
+
+import requests
+from cachetools import LRUCache
+from pydantic import BaseModel, Field
+
+from stac_generator.core.metrics import METRICS
+
+LOGGER = logging.getLogger(__name__)
+
+
+class BlockCacheConf(BaseModel):
+    """Block cache config."""
+
+    block_size: int = Field(
+        default=256 * 1024,
+        description="Size of cached blocks in bytes.",
+    )
+    memory_limit: int = Field(
+        default=256 * 1024 * 1024,
+        description="Memory budget for cached blocks in bytes.",
+    )
+    disk_path: str | None = Field(
+        default=None,
+        description="Directory for the disk tier.",
+    )
+    read_ahead: int = Field(
+        default=1,
+        description="Number of blocks to prefetch after a read.",
+    )
+
+
+class BlockCache:
+    """
+    Thread safe cache of object byte ranges.
+    """
+
+    def __init__(self, conf: BlockCacheConf):
+        self.conf = conf
+        self.memory = LRUCache(maxsize=conf.memory_limit, getsizeof=len)
+        self._lock = threading.Lock()
+        self._session = requests.Session()
+
+    def _disk_path(self, key: tuple) -> str:
+        uri, etag, block = key
+        digest = hashlib.sha1(f"{uri}|{etag}".encode("utf-8")).hexdigest()
+
+        return os.path.join(self.conf.disk_path, digest[:2], digest, str(block))
+
+    def _get(self, key: tuple) -> bytes | None:
+        with self._lock:
+            data = self.memory.get(key)
+
+        if data is not None or not self.conf.disk_path:
+            return data
+
+        try:
+            with open(self._disk_path(key), "rb") as reader:
+                data = reader.read()
+        except FileNotFoundError:
+            return None
+
+        self._put(key, data, disk=False)
+        return data
+
+    def _put(self, key: tuple, data: bytes, disk: bool = True) -> None:
+        with self._lock:
+            # Blocks bigger than the budget are not cached
+            if len(data) <= self.memory.maxsize:
+                self.memory[key] = data
+
+        if disk and self.conf.disk_path:
+            path = self._disk_path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+            # Write then rename so readers never see a partial block
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}"
+            with open(tmp_path, "wb") as writer:
+                writer.write(data)
+            os.replace(tmp_path, path)
+
+    def fetch(self, uri: str, start: int, end: int, client: Any = None) -> bytes:
+        """
+        Fetch a byte range from the source.
+
+        :param uri: object uri
+        :param start: first byte
+        :param end: last byte, inclusive
+        :param client: boto3 S3 client for object store uris
+
+        :return: bytes in the range, fewer if the object ends first
+        """
+        METRICS.increment("block_cache.requests")
+
+        if client is not None:
+            # Object store uris are built as <endpoint_url>/<bucket>/<key>
+            path = uri[len(client.meta.endpoint_url) :].lstrip("/")
+            bucket, key = path.split("/", 1)
+
+            try:
+                response = client.get_object(Bucket=bucket, Key=key, Range=f"bytes={start}-{end}")
+            except client.exceptions.ClientError as error:
+                if error.response.get("Error", {}).get("Code") == "InvalidRange":
+                    return b""
+                raise
+
+            return response["Body"].read()
+
+        if urlparse(uri).scheme in ("http", "https"):
+            response = self._session.get(uri, headers={"Range": f"bytes={start}-{end}"})
+
+            if response.status_code == 416:
+                return b""
+
+            response.raise_for_status()
+
+            # Servers which ignore ranges return the whole object
+            if response.status_code == 200:
+                return response.content[start : end + 1]
+
+            return response.content
+
+        with open(uri, "rb") as reader:
+            reader.seek(start)
+            return reader.read(end - start + 1)
+
+    def read(
+        self,
+        uri: str,
+        start: int,
+        length: int,
+        etag: str | None = None,
+        size: int | None = None,
+        client: Any = None,
+    ) -> bytes:
+        """
+        Read a byte range through the cache.
+
+        :param uri: object uri
+        :param start: first byte
+        :param length: number of bytes
+        :param etag: object ETag, so changed objects are not served from the cache
+        :param size: object size, if known, to stop read ahead at the end
+        :param client: boto3 S3 client for object store uris
+
+        :return: bytes in the range, fewer if the object ends first
+        """
+        if length <= 0:
+            return b""
+
+        block_size = self.conf.block_size
+        first = start // block_size
+        last = (start + length - 1) // block_size
+
+        blocks = {}
+        missing = []
+        for block in range(first, last + 1):
+            data = self._get((uri, etag, block))
+
+            if data is None:
+                missing.append(block)
+            else:
+                blocks[block] = data
+
+        METRICS.increment("block_cache.hits", len(blocks))
+        METRICS.increment("block_cache.misses", len(missing))
+
+        if missing:
+            final = missing[-1] + self.conf.read_ahead
+            if size is not None:
+                final = min(final, (size - 1) // block_size)
+
+            # Read ahead blocks which are already cached are fetched again,
+            # which is cheaper than splitting the request
+            missing.extend(range(missing[-1] + 1, final + 1))
+
+            for run_start, run_end in self._runs(missing):
+                data = self.fetch(
+                    uri, run_start * block_size, (run_end + 1) * block_size - 1, client
+                )
+
+                for block in range(run_start, run_end + 1):
+                    offset = (block - run_start) * block_size
+                    block_data = data[offset : offset + block_size]
+
+                    if block_data:
+                        self._put((uri, etag, block), block_data)
+
+                    blocks[block] = block_data
+
+        data = b"".join(blocks.get(block, b"") for block in range(first, last + 1))
+        offset = start - first * block_size
+
+        return data[offset : offset + length]
+
+    @staticmethod
+    def _runs(blocks: list[int]) -> list[tuple[int, int]]:
+        """
+        Coalesce block numbers into runs of adjacent blocks.
+
+        :param blocks: sorted block numbers
+
+        :return: first and last block of each run
+        """
+        runs = []
+        for block in blocks:
+            if runs and block == runs[-1][1] + 1:
+                runs[-1] = (runs[-1][0], block)
+            else:
+                runs.append((block, block))
+
+        return runs
+
+    def open(
+        self, uri: str, size: int, etag: str | None = None, client: Any = None
+    ) -> io.BufferedReader:
+        """
+        Open a seekable, read only file object which reads through the cache.
+
+        :param uri: object uri
+        :param size: object size
+        :param etag: object ETag
+        :param client: boto3 S3 client for object store uris
+
+        :return: file object
+        """
+        return io.BufferedReader(
+            CachedObject(self, uri, size, etag, client), buffer_size=self.conf.block_size
+        )
+
+
+class CachedObject(io.RawIOBase):
+    """
+    Raw file object reading an object through a :py:class:`BlockCache`.
+    """
+
+    def __init__(self, cache: BlockCache, uri: str, size: int, etag: str | None, client: Any):
+        super().__init__()
+        self.cache = cache
+        self.uri = uri
+        self.size = size
+        self.etag = etag
+        self.client = client
+        self.position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += self.size
+
+        self.position = max(0, offset)
+        return self.position
+
+    def readinto(self, buffer) -> int:
+        length = min(len(buffer), self.size - self.position)
+        if length <= 0:
+            return 0
+
+        data = self.cache.read(self.uri, self.position, length, self.etag, self.size, self.client)
+        buffer[: len(data)] = data
+        self.position += len(data)
+
+        return len(data)
@@ -13,13 +13,14 @@ from abc import abstractmethod
 from cachetools import Cache
 from pydantic import BaseModel, Field
 
+from stac_generator.core.baker import Recipe
 from stac_generator.core.process_config import SetConfig
 
 
 class BulkOutputConf(BaseModel):
     """Elasticsearch config model."""
 
-    cache_max_size: str = Field(
+    cache_max_size: int = Field(
         description="Max size of cache.",
     )
 
@@ -68,11 +69,12 @@ class BulkOutput(SetConfig):
         """
         return {data["id"]: data}
 
-    def run(self, data: dict) -> None:
+    def run(self, data: dict, recipe: Recipe | None = None, **kwargs) -> None:
         """
         Add data to cache and if cache is full export data.
 
         :param data: data to be exported
+        :param recipe: recipe used to generate the data
         """
         # add to cache
         self.data_cache.update(self.data_to_cache(data))
@@ -0,0 +1,97 @@
+# encoding: utf-8
+"""
+Clients
+-------
+
+Registry of named clients which can be referenced from a record body.
+
+Inputs register a factory for their client and put a
+:py:class:`ClientReference` in the body instead of the client itself. This
+keeps bodies small and picklable, so they can be passed between processes.
+The generator resolves the references before running the extraction
+methods, creating one client per process on first use.
+
+"""
+__author__ = "Richard Smith"
+__date__ = "19 Oct 2026"
+__copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+__contact__ = "richard.d.smith@stfc.ac.uk"
+
+import logging
+import os
+import threading
+from collections.abc import Callable
+from typing import Any
+
+LOGGER = logging.getLogger(__name__)
+
+
+class ClientReference(str):
+    """
+    Name of a client in the :py:data:`CLIENTS` registry.
+    """
+
+
+class ClientRegistry:
+    """
+    Lazily creates and caches one client per name in each process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._factories = {}
+        self._clients = {}
+        self._pid = os.getpid()
+
+    def register(self, name: str, factory: Callable[[], Any]) -> ClientReference:
+        """
+        Register a client factory. Registering the same name again replaces
+        the factory but keeps any client already created.
+
+        :param name: name of the client
+        :param factory: callable returning a new client
+
+        :return: reference to the client for use in record bodies
+        """
+        with self._lock:
+            self._factories[name] = factory
+
+        return ClientReference(name)
+
+    def get(self, name: str) -> Any:
+        """
+        Get the client for this process, creating it if needed.
+
+        :param name: name of the client
+
+        :return: client
+        """
+        with self._lock:
+            # Clients are not shared with forked processes
+            if os.getpid() != self._pid:
+                self._clients = {}
+                self._pid = os.getpid()
+
+            if name not in self._clients:
+                LOGGER.debug("Creating client: %s", name)
+                self._clients[name] = self._factories[name]()
+
+            return self._clients[name]
+
+    def resolve(self, body: dict) -> tuple[dict, dict]:
+        """
+        Replace client references in a body with the clients.
+
+        :param body: record body
+
+        :return: resolved body and the references which were replaced
+        """
+        references = {
+            key: value for key, value in body.items() if isinstance(value, ClientReference)
+        }
+
+        return body | {key: self.get(value) for key, value in references.items()}, references
+
+
+CLIENTS = ClientRegistry()
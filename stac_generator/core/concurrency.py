@@ -0,0 +1,122 @@
+# encoding: utf-8
+"""
+Concurrency
+-----------
+
+Helpers for inputs which read from several sources at once.
+
+"""
+__author__ = "Richard Smith"
+__date__ = "19 Oct 2026"
+__copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+__contact__ = "richard.d.smith@stfc.ac.uk"
+
+import logging
+import queue
+import threading
+from collections.abc import Generator, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+
+from stac_generator.core.metrics import METRICS
+
+LOGGER = logging.getLogger(__name__)
+
+
+class _Done:
+    """Marks the end of one of the merged iterables."""
+
+
+class _Failure:
+    """Carries an exception from a worker thread to the consumer."""
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def merge_iterators(
+    iterables: Iterable[Iterable], workers: int, max_size: int = 1000, metric: str | None = None
+) -> Iterator:
+    """
+    Iterate over several iterables concurrently on a thread pool, yielding
+    their items as they arrive. Items from one iterable keep their order.
+
+    Exceptions raised by an iterable are re-raised in the consumer and stop
+    the other workers, as does closing the returned generator. Iterables which
+    are generators are closed by their worker, so their ``finally`` blocks run
+    straight away.
+
+    :param iterables: lazy iterables to be consumed, such as generators
+    :param workers: number of threads
+    :param max_size: maximum number of items buffered between the threads and consumer
+    :param metric: name of a gauge reporting the number of buffered items,
+        sampled whenever an item is put or taken, or a put waits on a full buffer
+
+    :return: items from all of the iterables
+    """
+    iterables = list(iterables)
+    results = queue.Queue(maxsize=max_size)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                results.put(item, timeout=0.1)
+
+            except queue.Full:
+                if metric:
+                    METRICS.gauge(metric, max_size)
+
+                continue
+
+            if metric:
+                METRICS.gauge(metric, results.qsize())
+
+            return True
+
+        return False
+
+    def drain(iterable: Iterable) -> None:
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+
+        except Exception as error:
+            put(_Failure(error))
+
+        finally:
+            try:
+                if isinstance(iterable, Generator):
+                    iterable.close()
+
+            except Exception as error:
+                put(_Failure(error))
+
+            put(_Done)
+
+    pool = ThreadPoolExecutor(max_workers=workers)
+
+    try:
+        for iterable in iterables:
+            pool.submit(drain, iterable)
+
+        remaining = len(iterables)
+        while remaining:
+            item = results.get()
+
+            if metric:
+                METRICS.gauge(metric, results.qsize())
+
+            if item is _Done:
+                remaining -= 1
+
+            elif isinstance(item, _Failure):
+                raise item.error
+
+            else:
+                yield item
+
+    finally:
+        stop.set()
+        pool.shutdown(wait=True, cancel_futures=True)
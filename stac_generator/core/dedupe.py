@@ -0,0 +1,147 @@
+# encoding: utf-8
+"""
+Dedupe
+------
+
+Memory bounded sets of the keys an input has already emitted, such as uris.
+
+Keys are stored as 8 byte ``blake2b`` hashes in an open addressing table
+backed by an ``array``, which takes around 12 bytes per key rather than the
+100 or more of a Python ``set`` of strings. Distinct keys with the same hash
+are treated as duplicates, which is vanishingly unlikely below billions of
+keys.
+
+Where even that is too much, :py:class:`BloomFilter` uses a fixed amount of
+memory for an expected number of keys, at the cost of dropping a bounded
+fraction of keys which were never seen.
+
+"""
+__author__ = "Richard Smith"
+__date__ = "19 Oct 2026"
+__copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+__contact__ = "richard.d.smith@stfc.ac.uk"
+
+import math
+from array import array
+from hashlib import blake2b
+
+
+def key_hash(key: str, size: int = 8) -> int:
+    """
+    Fixed size hash of a key.
+
+    :param key: key to hash
+    :param size: number of bytes in the hash
+
+    :return: hash as an unsigned int
+    """
+    return int.from_bytes(blake2b(key.encode("utf-8"), digest_size=size).digest(), "little")
+
+
+class HashSet:
+    """
+    Set of 8 byte key hashes with linear probing.
+    """
+
+    # Load factor at which the table doubles
+    max_load = 0.7
+
+    def __init__(self, capacity: int = 1024):
+        """
+        :param capacity: initial number of slots, rounded up to a power of two
+        """
+        size = 1 << max(capacity - 1, 1).bit_length()
+        self.table = array("Q", bytes(8 * size))
+        self.mask = size - 1
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _insert(self, value: int) -> bool:
+        table = self.table
+        mask = self.mask
+        slot = value & mask
+
+        while True:
+            current = table[slot]
+
+            if current == 0:
+                table[slot] = value
+                self.count += 1
+                return True
+
+            if current == value:
+                return False
+
+            slot = (slot + 1) & mask
+
+    def _grow(self) -> None:
+        table = self.table
+        self.table = array("Q", bytes(16 * len(table)))
+        self.mask = len(self.table) - 1
+        self.count = 0
+
+        for value in table:
+            if value:
+                self._insert(value)
+
+    def add(self, key: str) -> bool:
+        """
+        Add a key.
+
+        :param key: key to add
+
+        :return: True if the key was not already in the set
+        """
+        # Zero marks an empty slot
+        value = key_hash(key) or 1
+
+        if self.count >= self.max_load * len(self.table):
+            self._grow()
+
+        return self._insert(value)
+
+
+class BloomFilter:
+    """
+    Probabilistic set with a fixed size and bounded false positive rate.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        """
+        :param capacity: expected number of keys
+        :param error_rate: false positive rate at the expected number of keys
+        """
+        self.size = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hashes = max(round(self.size / capacity * math.log(2)), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def add(self, key: str) -> bool:
+        """
+        Add a key.
+
+        :param key: key to add
+
+        :return: True if the key was not already in the filter. Keys which
+            were never added are reported as present at the error rate.
+        """
+        value = key_hash(key, 16)
+        first, second = value & 0xFFFFFFFFFFFFFFFF, value >> 64
+
+        added = False
+        for number in range(self.hashes):
+            bit = (first + number * second) % self.size
+            byte, mask = bit >> 3, 1 << (bit & 7)
+
+            if not self.bits[byte] & mask:
+                self.bits[byte] |= mask
+                added = True
+
+        self.count += added
+        return added
@@ -12,13 +12,22 @@ __copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
 __license__ = "BSD - see LICENSE file in top-level package directory"
 __contact__ = "richard.d.smith@stfc.ac.uk"
 
+import functools
 import logging
+import threading
+import time
 import traceback
 from collections import defaultdict
 
 from extraction_methods.core.extraction_method import ExtractionMethod
 
+from stac_generator.core.block_cache import BlockCache, BlockCacheConf
 from stac_generator.core.bulk_output import BulkOutput
+from stac_generator.core.clients import CLIENTS
+from stac_generator.core.concurrency import merge_iterators
+from stac_generator.core.input import Input
+from stac_generator.core.lanes import LaneClassifier, LanePoolConf, Lanes
+from stac_generator.core.metrics import METRICS
 from stac_generator.core.output import Output
 
 from .baker import ExtractionMethodConf, Recipe, Recipes
@@ -48,6 +57,17 @@ class Generator:
 
         self.extraction_methods = self.load_extraction_methods()
 
+        # Outputs are shared by the lanes
+        self.output_lock = threading.RLock()
+        self.lane_pools = [LanePoolConf(**pool) for pool in conf.get("lane_pools", [])]
+        self.lane_classifier = LaneClassifier(self.lane_pools)
+
+        self.block_cache = None
+        if "block_cache" in conf:
+            block_cache_conf = BlockCacheConf(**conf["block_cache"])
+            CLIENTS.register("block_cache", lambda: BlockCache(block_cache_conf))
+            self.block_cache = CLIENTS.get("block_cache")
+
     def load_extraction_methods(self) -> HandlerPicker:
         """
         Load extraction methods from entrypoint.
@@ -130,16 +150,49 @@ class Generator:
         :param data: data to be output
         :param kwargs:
         """
-        for output in outputs:
-            output.run(body, recipe, **kwargs)
+        with self.output_lock:
+            for output in outputs:
+                output.run(body, recipe, **kwargs)
+
+    def bulk_outputs(self) -> list[BulkOutput]:
+        """
+        Bulk outputs and failed outputs, which hold data until their cache is full.
+        """
+        return [
+            output
+            for output in self.outputs + self.failed_outputs
+            if isinstance(output, BulkOutput)
+        ]
+
+    def pending_outputs(self) -> bool:
+        """
+        Check if any bulk output is holding data which has not been exported.
+        """
+        return any(output.data_cache.currsize for output in self.bulk_outputs())
+
+    def flush(self, input_plugin: Input) -> None:
+        """
+        Export the data held by the bulk outputs, then tell the input its
+        processed bodies have been written.
+
+        :param input_plugin: input the bodies came from
+        """
+        with self.output_lock:
+            for output in self.bulk_outputs():
+                if output.data_cache.currsize:
+                    output.clear_cache()
+
+            input_plugin.flushed()
 
     def finished(self) -> None:
         """
-        Run clear cache of remaining data for bulk outputs.
+        Run clear cache of remaining data for bulk outputs and report metrics.
         """
-        for output in self.outputs:
-            if isinstance(output, BulkOutput):
-                output.clear_cache()
+        for output in self.bulk_outputs():
+            output.clear_cache()
+
+        METRICS.stop_reporting()
+        METRICS.log()
 
     def process(self, body: dict, recipe: Recipe, **kwargs) -> None:
         """
@@ -150,24 +203,144 @@ class Generator:
         """
         LOGGER.debug("Generating %s : %s with recipe %s", self.conf.get("generator"), body["uri"], recipe)
 
-        return self.run_extraction_methods(body, recipe.extraction_methods, **kwargs)
+        body, references = CLIENTS.resolve(body)
+
+        body = self.run_extraction_methods(body, recipe.extraction_methods, **kwargs)
+
+        # Swap clients back to their references so the body can be output
+        return body | {key: reference for key, reference in references.items() if key in body}
+
+    def recipe(self, record: dict, required: bool = True) -> Recipe | None:
+        """
+        Get the recipe for a record from its ``recipe_path`` or ``uri``.
+
+        :param record: record from an input
+        :param required: raise an error if there is no recipe, otherwise return None
+
+        :return: recipe
+        """
+        path = record.get("recipe_path", record.get("uri"))
+
+        try:
+            return self.recipes.get(path, self.conf.get("generator"))
+
+        except (ValueError, TypeError):
+            if required:
+                raise
+
+            return None
+
+    def process_record(self, input_plugin: Input, record: dict) -> None:
+        """
+        Generate and output a record from an input.
+
+        :param input_plugin: input the record came from
+        :param record: record yielded by the input
+        """
+        body = record
+        kwargs = {"GENERATOR_TYPE": self.conf.get("generator")}
+        if self.block_cache:
+            kwargs["BLOCK_CACHE"] = self.block_cache
+        recipe = self.recipe(record, required=not input_plugin.skip_extraction)
+
+        start = time.monotonic()
+
+        try:
+            if not input_plugin.skip_extraction:
+                body = self.process(body, recipe, **kwargs)
+
+            self.output(body, self.outputs, recipe, **kwargs)
+
+        except Exception:
+            body["ERROR"] = traceback.format_exc()
+            self.output(body, self.failed_outputs, recipe, **kwargs)
+
+        if recipe:
+            self.lane_classifier.record_latency(recipe, time.monotonic() - start)
+
+        with self.output_lock:
+            input_plugin.processed(record)
 
+            # Bodies held by bulk outputs are only written once their cache is exported
+            if not self.pending_outputs():
+                input_plugin.flushed()
+
+            # Lanes may still be processing when the input last asked for a flush
+            elif input_plugin.flush_due():
+                self.flush(input_plugin)
+
+    def records(self, input_plugin: Input):
+        """
+        Records from an input. With ``read_ahead``, the input is run on a
+        background thread which reads ahead of processing.
+
+        :param input_plugin: input to run
+
+        :return: records
+        """
+        if not input_plugin.read_ahead:
+            return input_plugin.run()
+
+        return merge_iterators(
+            [input_plugin.run()],
+            workers=1,
+            max_size=input_plugin.read_ahead,
+            metric=f"inputs.{type(input_plugin).__name__}.read_ahead",
+        )
+
+    def run_lanes(self, input_plugin: Input) -> None:
+        """
+        Process the records from an input on the lanes, routing them to a
+        lane pool by their estimated cost. Records for a uri which is still
+        in flight follow it to the same pool.
+
+        :param input_plugin: input to run
+        """
+
+        def worker(item: tuple[str, dict]) -> None:
+            key, record = item
+
+            try:
+                self.process_record(input_plugin, record)
+            finally:
+                self.lane_classifier.release(key)
+
+        pools = {None: Lanes(worker, self.conf.get("lanes", 1))}
+        for pool in self.lane_pools:
+            pools[pool.name] = Lanes(worker, pool.lanes, name=f"lanes.{pool.name}")
+
+        try:
+            for record in self.records(input_plugin):
+                key = str(record.get("uri", record.get("id")))
+                pool = self.lane_classifier.assign(key, record, self.recipe(record, required=False))
+                pools[pool].submit(key, (key, record))
+
+        finally:
+            errors = []
+            for lanes in pools.values():
+                try:
+                    lanes.close()
+                except Exception as error:
+                    errors.append(error)
+
+            if errors:
+                raise errors[0]
 
     def run(self) -> None:
         """
         Run generator.
         """
+        if metrics_interval := self.conf.get("metrics_interval"):
+            METRICS.start_reporting(metrics_interval)
+
         for input_plugin in self.inputs:
-            for body in input_plugin.run():
-                kwargs = {"GENERATOR_TYPE": self.conf.get("generator")}
-                recipe = self.recipes.get(body.get("recipe_path", body["uri"]), self.conf.get("generator"))
+            input_plugin.flush_outputs = functools.partial(self.flush, input_plugin)
 
-                try:
-                    body = self.process(body, recipe, **kwargs)
-                    self.output(body, self.outputs, recipe, **kwargs)
+            if self.conf.get("lanes", 1) > 1 or self.lane_pools:
+                self.run_lanes(input_plugin)
 
-                except Exception:
-                    body["ERROR"] = traceback.format_exc()
-                    self.output(body, self.failed_outputs, recipe, **kwargs)
+            else:
+                for record in self.records(input_plugin):
+                    self.process_record(input_plugin, record)
 
         self.finished()
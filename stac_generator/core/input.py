@@ -9,17 +9,63 @@ __license__ = "BSD - see LICENSE file in top-level package directory"
 __contact__ = "richard.d.smith@stfc.ac.uk"
 
 from abc import abstractmethod
+from collections.abc import Callable
+from typing import Annotated
+
+from pydantic import Field, TypeAdapter
 
 from stac_generator.core.process_config import SetConfig
 
+# Number of records read ahead, as a non-negative int
+READ_AHEAD = TypeAdapter(Annotated[int, Field(ge=0, strict=True)])
+
 
 class Input(SetConfig):
     """
     Base class to define an input
     """
 
+    #: Set by the generator. Flushes the bulk outputs, then calls :py:meth:`flushed`.
+    flush_outputs: Callable[[], None] | None = None
+
+    #: Records are already generated, so only the mappings and outputs are run.
+    skip_extraction: bool = False
+
+    def __init__(self, **kwargs):
+        """
+        Set the config and the number of records to read ahead.
+
+        :param kwargs:
+        """
+        super().__init__(**kwargs)
+
+        #: Number of records read ahead on a background thread, 0 to read on demand.
+        self.read_ahead = READ_AHEAD.validate_python(kwargs.get("read_ahead", 0))
+
     @abstractmethod
     def run(self):
         """
         Run the input plugin.
         """
+
+    def processed(self, body: dict) -> None:
+        """
+        Called by the generator once a body yielded by :py:meth:`run` has
+        been passed to the outputs. Bulk outputs may still be holding it.
+
+        :param body: body as yielded by :py:meth:`run`
+        """
+
+    def flushed(self) -> None:
+        """
+        Called by the generator once every processed body has been written
+        by the outputs, so inputs can acknowledge their source.
+        """
+
+    def flush_due(self) -> bool:
+        """
+        Called by the generator after a body is processed while bulk outputs
+        are holding data. Inputs which cannot receive more bodies until their
+        source is acknowledged return True to have the outputs flushed.
+        """
+        return False
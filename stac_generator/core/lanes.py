@@ -0,0 +1,296 @@
+# encoding: utf-8
+"""
+Lanes
+-----
+
+Processes records on a fixed number of worker threads. Records are routed
+to a lane by a hash of their key, usually the uri, and each lane processes
+its records in the order they were submitted. Records for different uris
+are processed in parallel, while events for the same uri, such as a delete
+followed by a re-create, are never reordered.
+
+Enable it in the generator configuration:
+
+.. code-block:: yaml
+
+    lanes: 8
+
+Expensive records can be sent to separate pools of lanes, so they do not
+hold up the cheap records queued behind them. A record goes to the first
+pool whose ``min_size`` is at most the record's ``filesize`` or ``size``,
+or whose ``min_latency`` is at most the expected seconds per record of its
+recipe. The expected latency is the recipe's ``cost`` annotation, or the
+average latency measured for the recipe so far. Other records go to the
+default ``lanes``.
+
+.. code-block:: yaml
+
+    lanes: 8
+    lane_pools:
+      - name: large
+        lanes: 2
+        min_size: 1073741824
+        min_latency: 30
+
+A uri is only classified when it has no records in flight. Later records
+for a uri go to the pool its earlier records are still queued or running
+in, so records for the same uri stay in order across the pools too.
+
+"""
+__author__ = "Richard Smith"
+__date__ = "19 Oct 2026"
+__copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+__contact__ = "richard.d.smith@stfc.ac.uk"
+
+import logging
+import threading
+import zlib
+from collections.abc import Callable
+from queue import Full, Queue
+from typing import Any
+
+from pydantic import BaseModel, Field
+
+from stac_generator.core.baker import Recipe
+from stac_generator.core.metrics import METRICS
+
+LOGGER = logging.getLogger(__name__)
+
+
+class LanePoolConf(BaseModel):
+    """Lane pool config."""
+
+    name: str = Field(
+        description="Name of the pool.",
+    )
+    lanes: int = Field(
+        default=1,
+        description="Number of lanes in the pool.",
+    )
+    min_size: int | None = Field(
+        default=None,
+        description="Minimum record size in bytes.",
+    )
+    min_latency: float | None = Field(
+        default=None,
+        description="Minimum expected recipe latency in seconds.",
+    )
+
+
+class LaneClassifier:
+    """
+    Picks the lane pool for a record from its estimated cost.
+    """
+
+    def __init__(self, pools: list[LanePoolConf], smoothing: float = 0.2):
+        """
+        :param pools: pools in order of precedence
+        :param smoothing: weight of the latest measurement in the average latency
+        """
+        self.pools = pools
+        self.smoothing = smoothing
+        self.latencies = {}
+        # key: pool and number of records in flight
+        self.in_flight = {}
+        self._lock = threading.Lock()
+
+    def record_latency(self, recipe: Recipe, seconds: float) -> None:
+        """
+        Update the average latency of a recipe.
+
+        :param recipe: recipe the record was generated with
+        :param seconds: time taken to generate the record
+        """
+        with self._lock:
+            average = self.latencies.get(recipe.key)
+            self.latencies[recipe.key] = (
+                seconds if average is None else average + self.smoothing * (seconds - average)
+            )
+
+    def latency(self, recipe: Recipe | None) -> float | None:
+        """
+        Expected latency of a recipe.
+
+        :param recipe: recipe for the record
+
+        :return: seconds, or None if unknown
+        """
+        if recipe is None:
+            return None
+
+        if recipe.cost is not None:
+            return recipe.cost
+
+        return self.latencies.get(recipe.key)
+
+    def classify(self, record: dict, recipe: Recipe | None) -> str | None:
+        """
+        Pick the pool for a record.
+
+        :param record: record from an input
+        :param recipe: recipe for the record
+
+        :return: pool name, or None for the default lanes
+        """
+        size = record.get("filesize", record.get("size"))
+        try:
+            size = int(size) if size is not None else None
+        except ValueError:
+            size = None
+
+        latency = self.latency(recipe)
+
+        for pool in self.pools:
+            if pool.min_size is not None and size is not None and size >= pool.min_size:
+                return pool.name
+
+            if pool.min_latency is not None and latency is not None and latency >= pool.min_latency:
+                return pool.name
+
+        return None
+
+    def assign(self, key: str, record: dict, recipe: Recipe | None) -> str | None:
+        """
+        Pick the pool for a record, keeping records for the same key in the
+        pool which already has records for it in flight. Each assigned record
+        must be released once it has been processed.
+
+        :param key: routing key, usually the uri
+        :param record: record from an input
+        :param recipe: recipe for the record
+
+        :return: pool name, or None for the default lanes
+        """
+        with self._lock:
+            if key in self.in_flight:
+                pool, count = self.in_flight[key]
+            else:
+                pool, count = self.classify(record, recipe), 0
+
+            self.in_flight[key] = (pool, count + 1)
+
+        return pool
+
+    def release(self, key: str) -> None:
+        """
+        Mark a record assigned with :py:meth:`assign` as processed.
+
+        :param key: routing key of the record
+        """
+        with self._lock:
+            pool, count = self.in_flight[key]
+
+            if count > 1:
+                self.in_flight[key] = (pool, count - 1)
+            else:
+                del self.in_flight[key]
+
+
+class _Stop:
+    """Marks the end of a lane's records."""
+
+
+class Lanes:
+    """
+    Hash partitioned worker threads which keep records with the same key in order.
+    """
+
+    def __init__(
+        self,
+        worker: Callable[[Any], None],
+        lanes: int,
+        max_size: int = 100,
+        name: str = "lanes",
+    ):
+        """
+        :param worker: called with each record on its lane's thread
+        :param lanes: number of lanes
+        :param max_size: maximum number of records queued on each lane
+        :param name: prefix for the lane metrics and thread names
+        """
+        self.worker = worker
+        self.name = name
+        self.error = None
+        self.queues = [Queue(maxsize=max_size) for _ in range(lanes)]
+        self.threads = [
+            threading.Thread(
+                target=self._work, args=(number,), name=f"{name}-{number}", daemon=True
+            )
+            for number in range(lanes)
+        ]
+
+        for thread in self.threads:
+            thread.start()
+
+    def lane(self, key: str) -> int:
+        """
+        Lane for a key. The hash is stable across processes.
+
+        :param key: routing key
+
+        :return: lane number
+        """
+        return zlib.crc32(key.encode("utf-8")) % len(self.queues)
+
+    def _raise(self) -> None:
+        if self.error is not None:
+            raise self.error
+
+    def _work(self, number: int) -> None:
+        lane_queue = self.queues[number]
+
+        while True:
+            record = lane_queue.get()
+
+            if record is _Stop:
+                return
+
+            try:
+                self.worker(record)
+
+            except Exception as error:
+                LOGGER.critical("%s-%s failed", self.name, number, exc_info=True)
+                self.error = error
+                return
+
+            METRICS.increment(f"{self.name}.{number}.processed")
+
+    def submit(self, key: str, record: Any) -> None:
+        """
+        Queue a record on the lane for its key, waiting while the lane is full.
+
+        :param key: routing key
+        :param record: record passed to the worker
+        """
+        number = self.lane(key)
+        lane_queue = self.queues[number]
+
+        while True:
+            self._raise()
+
+            try:
+                lane_queue.put(record, timeout=0.1)
+                break
+            except Full:
+                continue
+
+        METRICS.gauge(f"{self.name}.{number}.queued", lane_queue.qsize())
+
+    def close(self) -> None:
+        """
+        Wait for the queued records to be processed and stop the threads.
+        Errors raised by the worker are re-raised.
+        """
+        for thread, lane_queue in zip(self.threads, self.queues):
+            while thread.is_alive():
+                try:
+                    lane_queue.put(_Stop, timeout=0.1)
+                    break
+                except Full:
+                    continue
+
+        for thread in self.threads:
+            thread.join()
+
+        self._raise()
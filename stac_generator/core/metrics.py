@@ -0,0 +1,107 @@
+# encoding: utf-8
+"""
+Metrics
+-------
+
+Thread safe counters and gauges which plugins can use to report on their
+progress. The metrics are logged when the generator finishes and, if
+``metrics_interval`` is set in the generator configuration, periodically
+while it runs.
+
+"""
+__author__ = "Richard Smith"
+__date__ = "19 Oct 2026"
+__copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+__contact__ = "richard.d.smith@stfc.ac.uk"
+
+import logging
+import threading
+from collections import defaultdict
+
+LOGGER = logging.getLogger(__name__)
+
+
+class Metrics:
+    """
+    Registry of named counters and gauges.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = defaultdict(float)
+        self.gauges = {}
+        self._reporter = None
+
+    def increment(self, name: str, value: float = 1) -> None:
+        """
+        Increment a counter.
+
+        :param name: name of the counter
+        :param value: amount to increment by
+        """
+        with self._lock:
+            self.counters[name] += value
+
+    def gauge(self, name: str, value: float) -> None:
+        """
+        Set a gauge to its current value.
+
+        :param name: name of the gauge
+        :param value: current value
+        """
+        with self._lock:
+            self.gauges[name] = value
+
+    def snapshot(self) -> dict:
+        """
+        Get the current value of all metrics.
+
+        :return: dict of metric names to values
+        """
+        with self._lock:
+            return dict(self.counters) | self.gauges
+
+    def reset(self) -> None:
+        """
+        Clear all counters and gauges.
+        """
+        with self._lock:
+            self.counters.clear()
+            self.gauges.clear()
+
+    def log(self) -> None:
+        """
+        Log the current value of all metrics.
+        """
+        for name, value in sorted(self.snapshot().items()):
+            LOGGER.info("%s: %s", name, value)
+
+    def start_reporting(self, interval: float) -> None:
+        """
+        Log the metrics every ``interval`` seconds on a daemon thread.
+
+        :param interval: seconds between reports
+        """
+        if self._reporter:
+            return
+
+        stop = threading.Event()
+
+        def report():
+            while not stop.wait(interval):
+                self.log()
+
+        self._reporter = stop
+        threading.Thread(target=report, name="metrics", daemon=True).start()
+
+    def stop_reporting(self) -> None:
+        """
+        Stop the periodic reporting thread.
+        """
+        if self._reporter:
+            self._reporter.set()
+            self._reporter = None
+
+
+METRICS = Metrics()
@@ -0,0 +1,278 @@
+# encoding: utf-8
+"""
+Rate Limiter
+------------
+
+Token bucket limits for inputs which scan shared storage. Limits can be set
+on directory or page listings, objects and bytes per second. Inputs which
+are configured with the same ``name`` share one limiter, so the limit applies
+across all of their threads.
+
+If ``latency_threshold`` is set, the listing rate backs off whenever a
+listing takes longer than the threshold and recovers towards the configured
+rate while listings are fast.
+
+.. list-table::
+    :header-rows: 1
+
+    * - Option
+      - Value Type
+      - Description
+    * - ``name``
+      - ``string``
+      - Name of the shared limiter. Default: ``default``
+    * - ``listings_per_second``
+      - ``float``
+      - Maximum directory or page listings per second
+    * - ``objects_per_second``
+      - ``float``
+      - Maximum objects per second
+    * - ``bytes_per_second``
+      - ``float``
+      - Maximum bytes per second, for inputs which know object sizes
+    * - ``burst``
+      - ``float``
+      - Seconds worth of tokens which can be used at once. Default: ``1``
+    * - ``latency_threshold``
+      - ``float``
+      - Listing latency in seconds above which the listing rate backs off
+
+Example Configuration:
+    .. code-block:: yaml
+
+        inputs:
+            - method: file_system
+              path: /badc
+              rate_limit:
+                name: badc
+                listings_per_second: 200
+                objects_per_second: 5000
+                latency_threshold: 0.5
+
+Inputs sharing a ``name`` should use the same limits. The first input to
+use a name sets its limits and differing limits from later inputs are
+ignored with a warning.
+
+Each process has its own limiters, so divide the limits by the number of
+generator processes sharing the storage.
+
+"""
+__author__ = "Richard Smith"
+__date__ = "19 Oct 2026"
+__copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+__contact__ = "richard.d.smith@stfc.ac.uk"
+
+import logging
+import threading
+import time
+from collections.abc import Iterable, Iterator
+
+from pydantic import BaseModel, Field
+
+from stac_generator.core.metrics import METRICS
+
+LOGGER = logging.getLogger(__name__)
+
+
+class RateLimitConf(BaseModel):
+    """Rate limit config."""
+
+    name: str = Field(
+        default="default",
+        description="Name of the shared limiter.",
+    )
+    listings_per_second: float | None = Field(
+        default=None,
+        description="Maximum listings per second.",
+    )
+    objects_per_second: float | None = Field(
+        default=None,
+        description="Maximum objects per second.",
+    )
+    bytes_per_second: float | None = Field(
+        default=None,
+        description="Maximum bytes per second.",
+    )
+    burst: float = Field(
+        default=1.0,
+        description="Seconds worth of tokens which can be used at once.",
+    )
+    latency_threshold: float | None = Field(
+        default=None,
+        description="Listing latency above which the listing rate backs off.",
+    )
+    backoff: float = Field(
+        default=0.5,
+        description="Factor applied to the listing rate when latency is high.",
+    )
+    min_rate: float = Field(
+        default=1.0,
+        description="Minimum listing rate when backing off.",
+    )
+
+
+class TokenBucket:
+    """
+    Thread safe token bucket. Requests larger than the bucket are allowed
+    but put it into debt, so the average rate is still respected.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def set_rate(self, rate: float) -> None:
+        """
+        Change the refill rate.
+
+        :param rate: tokens per second
+        """
+        with self._lock:
+            self._refill()
+            self.rate = rate
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, tokens: float = 1) -> float:
+        """
+        Take tokens from the bucket, sleeping until they are available.
+
+        :param tokens: number of tokens required
+
+        :return: seconds spent waiting
+        """
+        with self._lock:
+            self._refill()
+            self.tokens -= tokens
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+        if wait:
+            time.sleep(wait)
+
+        return wait
+
+
+class RateLimiter:
+    """
+    Limits listings, objects and bytes per second. Use :py:meth:`get` to
+    retrieve the limiter shared by all inputs with the same name.
+    """
+
+    _registry = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, conf: RateLimitConf):
+        self.conf = conf
+        self.metric_prefix = f"rate_limit.{conf.name}"
+
+        self.listings = self._bucket(conf.listings_per_second)
+        self.objects = self._bucket(conf.objects_per_second)
+        self.bytes = self._bucket(conf.bytes_per_second)
+
+    @classmethod
+    def get(cls, conf: RateLimitConf) -> "RateLimiter":
+        """
+        Get the shared limiter for the configuration name. The limiter keeps
+        the configuration it was created with, so a different configuration
+        with the same name is logged and ignored.
+
+        :param conf: rate limit configuration
+
+        :return: shared rate limiter
+        """
+        with cls._registry_lock:
+            if conf.name not in cls._registry:
+                cls._registry[conf.name] = cls(conf)
+
+            limiter = cls._registry[conf.name]
+
+        if limiter.conf != conf:
+            LOGGER.warning(
+                "Rate limiter %s already exists with %s, ignoring %s",
+                conf.name,
+                limiter.conf,
+                conf,
+            )
+
+        return limiter
+
+    def _bucket(self, rate: float | None) -> TokenBucket | None:
+        if not rate:
+            return None
+
+        return TokenBucket(rate, max(1.0, rate * self.conf.burst))
+
+    def _acquire(self, bucket: TokenBucket | None, kind: str, tokens: float) -> None:
+        if bucket and tokens:
+            wait = bucket.acquire(tokens)
+
+            if wait:
+                METRICS.increment(f"{self.metric_prefix}.{kind}.wait_seconds", wait)
+
+        METRICS.increment(f"{self.metric_prefix}.{kind}", tokens)
+
+    def acquire_objects(self, count: int = 1, size: int = 0) -> None:
+        """
+        Wait until ``count`` objects totalling ``size`` bytes may be processed.
+
+        :param count: number of objects
+        :param size: total size of the objects in bytes
+        """
+        self._acquire(self.objects, "objects", count)
+        self._acquire(self.bytes, "bytes", size)
+
+    def record_latency(self, latency: float) -> None:
+        """
+        Adjust the listing rate based on the latency of a listing.
+
+        :param latency: seconds the listing took
+        """
+        if not (self.listings and self.conf.latency_threshold):
+            return
+
+        configured = self.conf.listings_per_second
+
+        if latency > self.conf.latency_threshold:
+            rate = max(self.conf.min_rate, self.listings.rate * self.conf.backoff)
+
+            if rate < self.listings.rate:
+                LOGGER.debug("Listing latency %.3fs, reducing rate to %.1f/s", latency, rate)
+
+        else:
+            # Recover additively towards the configured rate
+            rate = min(configured, self.listings.rate + configured * 0.05)
+
+        if rate != self.listings.rate:
+            self.listings.set_rate(rate)
+            METRICS.gauge(f"{self.metric_prefix}.listings_per_second", rate)
+
+    def iter_listings(self, listings: Iterable) -> Iterator:
+        """
+        Rate limit an iterator where each step performs a listing, such as
+        :py:func:`os.walk` or a paginator.
+
+        :param listings: iterable performing a listing per item
+
+        :return: the items of ``listings``
+        """
+        iterator = iter(listings)
+
+        while True:
+            self._acquire(self.listings, "listings", 1)
+
+            start = time.monotonic()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+
+            self.record_latency(time.monotonic() - start)
+
+            yield item
@@ -9,6 +9,7 @@ __license__ = "BSD - see LICENSE file in top-level package directory"
 __contact__ = "richard.d.smith@stfc.ac.uk"
 
 import collections
+import json
 import logging
 import re
 
@@ -21,6 +22,11 @@ from typing import Any, Dict, List, Optional, Union
 
 import yaml
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 from stac_generator.core.exceptions import NoPluginsError
 from stac_generator.core.handler_picker import HandlerPicker
 
@@ -105,6 +111,51 @@ class Stats:
             Etag=s3.get("Etag"),
         )
 
+    @classmethod
+    def from_boto_listing(cls, s3: dict) -> dict:
+        """
+        Stats from an object in a ``list_objects_v2`` response.
+
+        :param s3: object listing
+        """
+        last_modified = s3.get("LastModified")
+
+        return dict(
+            size=s3.get("Size"),
+            last_modified=last_modified.isoformat() if last_modified else None,
+            Etag=s3.get("ETag", "").strip('"') or None,
+        )
+
+
+def json_loads(data: bytes | str) -> Any:
+    """
+    Parse a JSON document, using `orjson <https://github.com/ijl/orjson>`_
+    when it is installed.
+
+    :param data: JSON document
+
+    :return: parsed document
+    """
+    if orjson:
+        return orjson.loads(data)
+
+    return json.loads(data)
+
+
+def json_dumps(data: Any) -> bytes:
+    """
+    Serialise a document as compact JSON, using `orjson <https://github.com/ijl/orjson>`_
+    when it is installed. Values which are not JSON types are converted with ``str``.
+
+    :param data: document
+
+    :return: UTF-8 encoded JSON
+    """
+    if orjson:
+        return orjson.dumps(data, default=str)
+
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+
 
 def load_plugins(plugins: list, entry_point: str) -> list:
     """
@@ -0,0 +1,90 @@
+# encoding: utf-8
+"""
+NDJSON
+------
+
+A bulk output which writes the generated metadata to standard out as
+newline delimited JSON, one compact document per line. Each batch of
+``cache_max_size`` documents is serialised and written in a single write,
+using `orjson <https://github.com/ijl/orjson>`_ when it is installed.
+
+Unlike ``standard_out_bulk`` the output can be piped into other tools, such
+as ``jq`` or another generator reading with the ``stdin`` input. Inputs
+which print a summary to standard out when they finish will add it to the
+stream, so pair it with inputs which log instead, such as ``stdin``.
+
+**Plugin name:** ``ndjson``
+
+.. list-table::
+    :header-rows: 1
+
+    * - Option
+      - Value Type
+      - Description
+    * - ``cache_max_size``
+      - ``int``
+      - Number of documents written at a time. Default: ``1000``
+
+Example configuration:
+    .. code-block:: yaml
+
+        outputs:
+            - method: ndjson
+              cache_max_size: 1000
+"""
+__author__ = "Richard Smith"
+__date__ = "19 Oct 2026"
+__copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+__contact__ = "richard.d.smith@stfc.ac.uk"
+
+import itertools
+import sys
+
+from pydantic import Field
+
+from stac_generator.core.bulk_output import BulkOutput, BulkOutputConf
+from stac_generator.core.utils import json_dumps
+
+
+class NDJSONConf(BulkOutputConf):
+    """NDJSON config model."""
+
+    cache_max_size: int = Field(
+        default=1000,
+        description="Number of documents written at a time.",
+    )
+
+
+class NDJSONBulkOutput(BulkOutput):
+    """
+    Writes batches of documents to standard out as newline delimited JSON.
+    """
+
+    config_class = NDJSONConf
+
+    def __init__(self, **kwargs):
+        self._counter = itertools.count()
+
+        super().__init__(**kwargs)
+
+    def data_to_cache(self, data: dict) -> dict:
+        """
+        Cache documents by id, or in arrival order if they do not have one.
+
+        :param data: data from processor to be output.
+        """
+        return {data.get("id", f"_{next(self._counter)}"): data}
+
+    def export(self, data_list: list) -> None:
+        """
+        Write the documents to standard out.
+
+        :param data_list: documents to write
+        """
+        if not data_list:
+            return
+
+        stream = sys.stdout.buffer
+        stream.write(b"".join(json_dumps(data) + b"\n" for data in data_list))
+        stream.flush()
@@ -8,6 +8,28 @@ to input the content from more than one place.
 Inputs are loaded as named entry points with the namespace:
 ``stac_generator.inputs``
 
+Any input can read ahead of processing by setting ``read_ahead``, a number
+of records, alongside its ``conf``. The input is then run on a background
+thread, which holds up to ``read_ahead`` records in a queue while the
+generator works on earlier ones, so listing and extraction overlap. Errors
+raised by the input are re-raised in the generator. The number of queued
+records is reported in the ``inputs.<class name>.read_ahead`` metric, which
+is sampled as records are queued and taken.
+
+``read_ahead`` works on the records an input yields. It is separate from the
+``prefetch`` options inside the ``conf`` of some inputs, which work on the
+source's pages: the number of result pages the Solr input fetches ahead, and
+whether the Elasticsearch aggregation input requests the next page in the
+background. The two can be combined.
+
+.. code-block:: yaml
+
+    inputs:
+        - method: solr
+          read_ahead: 1000
+          conf:
+            url: https://url.index-node.ac.uk/solr/files/select
+
 .. warning::
     Blocking input plugins will prevent others from being run. They are run
     sequentially. For example, with the :ref:`file system input plugin <stac_generator/inputs:File System Input>`, you
@@ -0,0 +1,240 @@
+# encoding: utf-8
+"""
+Elasticsearch Input
+-------------------
+
+Reads the documents stored in an `Elasticsearch index <https://www.elastic.co/>`_
+with a point in time and ``search_after``, re-emitting them as they are. The
+documents have already been generated, so the extraction methods are
+skipped and the bodies go straight to the mappings and outputs. Use it to
+reindex into a new index or output without re-extracting from source files.
+
+The point in time is split into ``slices`` which are read concurrently.
+Documents without an ``id`` are given the document ``_id``.
+
+**Plugin name:** ``elasticsearch``
+
+.. list-table::
+    :header-rows: 1
+
+    * - Option
+      - Value Type
+      - Description
+    * - ``index.name``
+      - ``string``
+      - ``REQUIRED`` Index to read
+    * - ``client_kwargs``
+      - ``dict``
+      - Connection kwargs passed to
+        `elasticsearch.Elasticsearch
+        <https://elasticsearch-py.readthedocs.io/en/7.10.0/api.html>`_
+    * - ``query``
+      - ``dict``
+      - Query restricting the documents read
+    * - ``source_includes``
+      - ``list``
+      - Fields of ``_source`` to read. Default: all fields
+    * - ``page_size``
+      - ``int``
+      - Number of documents per request. Default: ``1000``
+    * - ``slices``
+      - ``int``
+      - Number of slices of the point in time. Default: ``1``
+    * - ``threads``
+      - ``int``
+      - Number of slices read concurrently. Default: the number of slices
+    * - ``keep_alive``
+      - ``string``
+      - How long the point in time is kept between requests. Default: ``5m``
+
+Example Configuration:
+    .. code-block:: yaml
+
+        inputs:
+            - method: elasticsearch
+              index:
+                name: ceda-items
+              client_kwargs:
+                hosts: ['host1:9200','host2:9200']
+              source_includes:
+                - id
+                - type
+                - geometry
+                - properties
+              slices: 8
+
+"""
+__author__ = "Rhys Evans"
+__date__ = "19 Oct 2026"
+__copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+__contact__ = "rhys.r.evans@stfc.ac.uk"
+
+# Python imports
+import logging
+from collections.abc import Iterator
+from datetime import datetime
+
+# Thirdparty imports
+from elasticsearch import Elasticsearch
+from pydantic import BaseModel, Field
+
+# Package imports
+from stac_generator.core.concurrency import merge_iterators
+from stac_generator.core.input import Input
+from stac_generator.core.metrics import METRICS
+
+LOGGER = logging.getLogger(__name__)
+
+
+class ElasticsearchIndex(BaseModel):
+    """Elasticsearch index model."""
+
+    name: str = Field(
+        description="Name of index.",
+    )
+
+
+class ElasticsearchConf(BaseModel):
+    """Elasticsearch config model."""
+
+    index: ElasticsearchIndex = Field(
+        description="Elasticsearch index to read.",
+    )
+    client_kwargs: dict = Field(
+        default={},
+        description="Elasticsearch connection kwargs.",
+    )
+    query: dict = Field(
+        default={},
+        description="Elasticsearch search query.",
+    )
+    source_includes: list[str] = Field(
+        default=[],
+        description="Fields of the documents to read.",
+    )
+    page_size: int = Field(
+        default=1000,
+        description="Number of documents per request.",
+    )
+    slices: int = Field(
+        default=1,
+        description="Number of slices read concurrently.",
+    )
+    threads: int | None = Field(
+        default=None,
+        description="Number of slices read concurrently.",
+    )
+    keep_alive: str = Field(
+        default="5m",
+        description="Point in time keep alive.",
+    )
+    request_timeout: int = Field(
+        default=60,
+        description="Request timeout for search.",
+    )
+
+
+class ElasticsearchInput(Input):
+    """
+    Re-emits the documents stored in an index.
+    """
+
+    config_class = ElasticsearchConf
+
+    skip_extraction = True
+
+    def search_body(self, pit_id: str, slice_id: int, search_after: list | None = None) -> dict:
+        """
+        Build the search body for a page of a slice.
+
+        :param pit_id: point in time id
+        :param slice_id: slice number
+        :param search_after: sort values of the last document of the previous page
+
+        :return: search body
+        """
+        body = {
+            "size": self.conf.page_size,
+            "pit": {"id": pit_id, "keep_alive": self.conf.keep_alive},
+            "sort": [{"_shard_doc": "asc"}],
+            "track_total_hits": False,
+        }
+
+        if self.conf.query:
+            body["query"] = self.conf.query
+
+        if self.conf.source_includes:
+            body["_source"] = self.conf.source_includes
+
+        if self.conf.slices > 1:
+            body["slice"] = {"id": slice_id, "max": self.conf.slices}
+
+        if search_after:
+            body["search_after"] = search_after
+
+        return body
+
+    def documents(self, es_client: Elasticsearch, pit_id: str, slice_id: int) -> Iterator[dict]:
+        """
+        Read the documents in a slice.
+
+        :param es_client: Elasticsearch client
+        :param pit_id: point in time id
+        :param slice_id: slice number
+
+        :return: documents
+        """
+        search_after = None
+
+        while True:
+            result = es_client.search(
+                body=self.search_body(pit_id, slice_id, search_after),
+                request_timeout=self.conf.request_timeout,
+            )
+            METRICS.increment("elasticsearch.pages")
+
+            hits = result["hits"]["hits"]
+            if not hits:
+                return
+
+            for hit in hits:
+                document = hit["_source"]
+                document.setdefault("id", hit["_id"])
+
+                yield document
+
+            # The point in time id may change between requests
+            pit_id = result.get("pit_id", pit_id)
+            search_after = hits[-1]["sort"]
+
+    def run(self):
+        start = datetime.now()
+        total_generated = 0
+
+        es_client = Elasticsearch(**self.conf.client_kwargs)
+
+        pit_id = es_client.open_point_in_time(
+            index=self.conf.index.name, keep_alive=self.conf.keep_alive
+        )["id"]
+
+        try:
+            slices = (
+                self.documents(es_client, pit_id, slice_id) for slice_id in range(self.conf.slices)
+            )
+
+            if (self.conf.threads or self.conf.slices) > 1:
+                documents = merge_iterators(slices, workers=self.conf.threads or self.conf.slices)
+
+            else:
+                documents = (document for documents in slices for document in documents)
+
+            for document in documents:
+                yield document
+                total_generated += 1
+
+        finally:
+            es_client.close_point_in_time(body={"id": pit_id})
+
+        end = datetime.now()
+        print(f"Processed {total_generated} elasticsearch documents in {end-start}")
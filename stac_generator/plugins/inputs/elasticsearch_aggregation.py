@@ -1,12 +1,12 @@
 # encoding: utf-8
 """
-Elasticsearch Input
--------------------
+Elasticsearch Aggregation Input
+-------------------------------
 
-Uses an `Elasticsearch index <https://www.elastic.co/>`_
-as a source for file objects.
+Uses a composite aggregation over an `Elasticsearch index <https://www.elastic.co/>`_
+as a source for file objects, emitting one record per unique uri.
 
-**Plugin name:** ``elasticsearch``
+**Plugin name:** ``elasticsearch_aggregation``
 
 .. list-table::
     :header-rows: 1
@@ -14,32 +14,63 @@ as a source for file objects.
     * - Option
       - Value Type
       - Description
-    * - ``id``
+    * - ``index.name``
       - ``string``
-      - ``REQUIRED`` The property which contains the URI of the object that
-        is to be created.
-    * - ``connection_kwargs``
+      - ``REQUIRED`` Index to aggregate
+    * - ``uri_term``
+      - ``string``
+      - Keyword field holding the uri. Default: ``uri.keyword``
+    * - ``client_kwargs``
       - ``dict``
       - Connection kwargs passed to
         `elasticsearch.Elasticsearch
         <https://elasticsearch-py.readthedocs.io/en/7.10.0/api.html>`_
-    * - ``search_kwargs``
+    * - ``extra_terms``
+      - ``list``
+      - Extra keyword fields added to the aggregation and the records
+    * - ``query``
       - ``dict``
-      - Optional search kwargs passed to
-        `elasticsearch.Elasticsearch
-        <https://elasticsearch-py.readthedocs.io/en/v8.8.1/api.html>`_
-
+      - Query restricting the documents aggregated
+    * - ``page_size``
+      - ``int``
+      - Number of buckets per page. Default: ``100``
+    * - ``partitions``
+      - ``int``
+      - Split the uris into this many partitions by a hash of the uri.
+        Default: ``1``
+    * - ``partition_ranges``
+      - ``list``
+      - Split the uris into partitions by ranges of ``uri_term``, given as
+        `range query <https://www.elastic.co/guide/en/elasticsearch/reference/7.17/query-dsl-range-query.html>`_
+        parameters. Used instead of ``partitions``
+    * - ``threads``
+      - ``int``
+      - Number of partitions paged concurrently. Default: the number of partitions
+    * - ``prefetch``
+      - ``bool``
+      - Request the next page of a partition while the current page is
+        being processed. Default: ``False``
+
+Composite aggregation sources do not support ``include`` partitions, so
+hash partitions filter the query with a script. Ranges are cheaper for the
+cluster when the uris are spread evenly over known prefixes.
 
 Example Configuration:
     .. code-block:: yaml
 
-        name: elasticsearch
-        id_term: item_id
-        connection_kwargs:
-          index: ceda-index
-          hosts: ['host1:9200','host2:9200']
-          request_timeout: 60
-
+        inputs:
+            - method: elasticsearch_aggregation
+              index:
+                name: ceda-index
+              client_kwargs:
+                hosts: ['host1:9200','host2:9200']
+              page_size: 1000
+              partition_ranges:
+                - lt: /badc/cmip6
+                - gte: /badc/cmip6
+                  lt: /neodc
+                - gte: /neodc
+              prefetch: true
 
 """
 __author__ = "Rhys Evans"
@@ -49,6 +80,8 @@ __license__ = "BSD - see LICENSE file in top-level package directory"
 __contact__ = "rhys.r.evans@stfc.ac.uk"
 # Python imports
 import logging
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 # Thirdparty imports
@@ -57,7 +90,9 @@ from extraction_methods.core.types import KeyOutputKey
 from pydantic import BaseModel, Field
 
 # Package imports
+from stac_generator.core.concurrency import merge_iterators
 from stac_generator.core.input import Input
+from stac_generator.core.metrics import METRICS
 
 LOGGER = logging.getLogger(__name__)
 
@@ -100,77 +135,196 @@ class ElasticsearchConf(BaseModel):
         default=60,
         description="Request timeout for search.",
     )
+    page_size: int = Field(
+        default=100,
+        description="Number of buckets per page.",
+    )
+    partitions: int = Field(
+        default=1,
+        description="Number of hash partitions of the uris.",
+    )
+    partition_ranges: list[dict] = Field(
+        default=[],
+        description="Range query parameters for each partition of the uris.",
+    )
+    threads: int | None = Field(
+        default=None,
+        description="Number of partitions paged concurrently.",
+    )
+    prefetch: bool = Field(
+        default=False,
+        description="Request the next page while the current page is processed.",
+    )
 
 
 class ElasticsearchAggregationInput(Input):
     """
-    Performs an os.walk to provide a stream of paths for procesing.
+    Pages a composite aggregation of the uris in an index.
     """
 
     config_class = ElasticsearchConf
 
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        self.id_term = kwargs["id_term"]
-        self.index = kwargs["index"]
+    def partition_filters(self) -> list[dict | None]:
+        """
+        Filters splitting the uris into partitions.
+
+        :return: filter for each partition, or None for a single partition
+        """
+        if self.conf.partition_ranges:
+            return [
+                {"range": {self.conf.uri_term: partition_range}}
+                for partition_range in self.conf.partition_ranges
+            ]
+
+        if self.conf.partitions > 1:
+            return [
+                {
+                    "script": {
+                        "script": {
+                            "source": (
+                                "doc[params.field].size() > 0 && Math.floorMod("
+                                "doc[params.field].value.hashCode(), params.partitions)"
+                                " == params.partition"
+                            ),
+                            "params": {
+                                "field": self.conf.uri_term,
+                                "partitions": self.conf.partitions,
+                                "partition": partition,
+                            },
+                        }
+                    }
+                }
+                for partition in range(self.conf.partitions)
+            ]
 
-        self.search_kwargs = kwargs.get("search_kwargs")
+        return [None]
 
-    def run(self):
-        start = datetime.now()
-        total_generated = 0
+    def search_body(self, partition_filter: dict | None, after: dict | None = None) -> dict:
+        """
+        Build the search body for a page of a partition.
 
-        es_client = Elasticsearch(**self.conf.client_kwargs)
+        :param partition_filter: filter for the partition
+        :param after: ``after_key`` of the previous page
 
-        body = {
-            "query": self.conf.query,
-            "aggs": {
-                "bucket": {
-                    "composite": {
-                        "sources": [
-                            {
-                                "uri": {
-                                    "terms": {"field": {self.conf.uri_term}},
-                                }
-                            },
-                            {
-                                "recipe_path": {
-                                    "terms": {"field": "recipe_path.keyword"},
-                                }
-                            },
-                        ],
-                        "size": 100,
-                    }
-                }
-            },
-            "size": 0,
-        }
+        :return: search body
+        """
+        sources = [
+            {"uri": {"terms": {"field": self.conf.uri_term}}},
+            {"recipe_path": {"terms": {"field": "recipe_path.keyword"}}},
+        ]
 
         for extra_term in self.conf.extra_terms:
-            body["bucket"]["composite"][extra_term.key] = {
-                "terms": {"field": f"{extra_term.key}"},
-            }
+            sources.append({extra_term.key: {"terms": {"field": extra_term.key}}})
+
+        composite = {"sources": sources, "size": self.conf.page_size}
+        if after:
+            composite["after"] = after
+
+        body = {"aggs": {"bucket": {"composite": composite}}, "size": 0}
+
+        if partition_filter:
+            body["query"] = {"bool": {"filter": [partition_filter]}}
+
+            if self.conf.query:
+                body["query"]["bool"]["must"] = [self.conf.query]
 
-        while True:
-            result = es_client.search(
-                index=self.index, body=body, request_timeout=self.conf.request_timeout
-            )
+        elif self.conf.query:
+            body["query"] = self.conf.query
 
-            aggregation = result["aggregations"]["bucket"]
+        return body
 
-            for bucket in aggregation["buckets"]:
+    def search(self, es_client: Elasticsearch, body: dict) -> dict:
+        """
+        Request a page of the aggregation.
+
+        :param es_client: Elasticsearch client
+        :param body: search body
+
+        :return: composite aggregation result
+        """
+        result = es_client.search(
+            index=self.conf.index.name, body=body, request_timeout=self.conf.request_timeout
+        )
+        METRICS.increment("elasticsearch_aggregation.pages")
+
+        return result["aggregations"]["bucket"]
+
+    def pages(self, es_client: Elasticsearch, partition_filter: dict | None) -> Iterator[list]:
+        """
+        Page through the aggregation for a partition.
+
+        :param es_client: Elasticsearch client
+        :param partition_filter: filter for the partition
+
+        :return: buckets of each page
+        """
+        if not self.conf.prefetch:
+            after = None
+
+            while True:
+                aggregation = self.search(es_client, self.search_body(partition_filter, after))
+                yield aggregation["buckets"]
+
+                if "after_key" not in aggregation:
+                    return
+
+                after = aggregation["after_key"]
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(self.search, es_client, self.search_body(partition_filter))
+
+            while future:
+                aggregation = future.result()
+
+                future = None
+                if "after_key" in aggregation:
+                    future = executor.submit(
+                        self.search,
+                        es_client,
+                        self.search_body(partition_filter, aggregation["after_key"]),
+                    )
+
+                yield aggregation["buckets"]
+
+    def records(self, es_client: Elasticsearch, partition_filter: dict | None) -> Iterator[dict]:
+        """
+        Records for the uris in a partition.
+
+        :param es_client: Elasticsearch client
+        :param partition_filter: filter for the partition
+
+        :return: records
+        """
+        for buckets in self.pages(es_client, partition_filter):
+            for bucket in buckets:
                 output = {"uri": bucket["key"]["uri"]}
 
                 for extra_term in self.conf.extra_terms:
                     output[extra_term.output_key] = bucket["key"][extra_term.key]
 
                 yield output
-                total_generated += 1
 
-            if "after_key" not in aggregation.keys():
-                break
+    def run(self):
+        start = datetime.now()
+        total_generated = 0
+
+        es_client = Elasticsearch(**self.conf.client_kwargs)
+
+        partition_filters = self.partition_filters()
+        threads = self.conf.threads or len(partition_filters)
+        partitions = (
+            self.records(es_client, partition_filter) for partition_filter in partition_filters
+        )
+
+        if threads > 1:
+            records = merge_iterators(partitions, workers=threads)
+
+        else:
+            records = (record for partition in partitions for record in partition)
 
-            body["aggs"]["bucket"]["composite"]["after"] = aggregation["after_key"]
+        for record in records:
+            yield record
+            total_generated += 1
 
         end = datetime.now()
         print(f"Processed {total_generated} elasticsearch records in {end-start}")
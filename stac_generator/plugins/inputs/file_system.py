@@ -23,6 +23,27 @@ each file to the asset generator
     * - ``filters``
       - :ref:`Filters <stac_generator/filters:filters>`
       - Optional filters
+    * - ``granularity``
+      - ``string``
+      - ``file`` (default) to emit a record per file or ``directory`` to emit
+        a record per matching directory
+    * - ``depth``
+      - ``int``
+      - Directory mode: emit directories at this depth below ``path``
+    * - ``directory_regex``
+      - ``string``
+      - Directory mode: emit directories whose path matches this regex
+    * - ``stats``
+      - ``bool``
+      - Directory mode: include size and modification time of member files
+    * - ``recursive_files``
+      - ``bool``
+      - Directory mode: list the files anywhere below a matched directory,
+        rather than only those directly inside it. Default: ``False``
+    * - ``rate_limit``
+      - :py:mod:`Rate limit <stac_generator.core.rate_limiter>`
+      - Optional limits on directory listings, files and bytes per second.
+        Bytes are only limited in directory mode with ``stats``
 
 Example Configuration:
     .. code-block:: yaml
@@ -31,6 +52,26 @@ Example Configuration:
             - method: file_system
               path: test_directory
 
+Example Directory Configuration:
+    .. code-block:: yaml
+
+        inputs:
+            - method: file_system
+              path: test_directory
+              granularity: directory
+              directory_regex: '\\.zarr$'
+              stats: true
+
+In directory mode each record contains the directory ``uri``, the ``files``
+directly inside it, and their ``total_files`` (and ``total_size`` if
+``stats`` is set). The walk does not descend below a matched directory, so
+a zarr store with many chunks stays one small record.
+
+With ``recursive_files``, each matched directory is walked on its own and
+``files``, ``total_files`` and ``total_size`` cover every file below it, as
+paths relative to the directory. The record then holds every file name, so
+only use it for directories with a modest number of files.
+
 """
 __author__ = "Richard Smith"
 __date__ = "02 Jun 2021"
@@ -41,12 +82,15 @@ __contact__ = "richard.d.smith@stfc.ac.uk"
 
 import logging
 import os
+import re
 from datetime import datetime
+from typing import Literal
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 from tqdm import tqdm
 
 from stac_generator.core.input import Input
+from stac_generator.core.rate_limiter import RateLimitConf, RateLimiter
 
 logger = logging.getLogger(__name__)
 
@@ -61,6 +105,37 @@ class FileSystemConf(BaseModel):
         default={},
         description="os walk kwargs.",
     )
+    granularity: Literal["file", "directory"] = Field(
+        default="file",
+        description="Emit a record per file or per matching directory.",
+    )
+    depth: int | None = Field(
+        default=None,
+        description="Depth below path at which directories are emitted.",
+    )
+    directory_regex: str | None = Field(
+        default=None,
+        description="Regex for directories to be emitted.",
+    )
+    stats: bool = Field(
+        default=False,
+        description="Include member file stats in directory records.",
+    )
+    recursive_files: bool = Field(
+        default=False,
+        description="List every file below matched directories.",
+    )
+    rate_limit: RateLimitConf = Field(
+        default=RateLimitConf(),
+        description="Listing, file and byte rate limits.",
+    )
+
+    @model_validator(mode="after")
+    def check_directory_rule(self):
+        """Directory granularity needs a rule to decide which directories to emit."""
+        if self.granularity == "directory" and self.depth is None and self.directory_regex is None:
+            raise ValueError("Directory granularity requires depth or directory_regex")
+        return self
 
 
 class FileSystemInput(Input):
@@ -70,16 +145,127 @@ class FileSystemInput(Input):
 
     config_class = FileSystemConf
 
-    def run(self):
-        total_files = 0
-        start = datetime.now()
-        for root, _, files in tqdm(os.walk(self.conf.path, **self.conf.kwargs)):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+        self.rate_limiter = RateLimiter.get(self.conf.rate_limit)
+
+    def match_directory(self, path: str, depth: int) -> bool:
+        """
+        Check whether a directory should be emitted as a single record.
+
+        :param path: directory path
+        :param depth: depth of the directory below the root path
+        """
+        if self.conf.depth is not None and depth >= self.conf.depth:
+            return True
+
+        return bool(self.conf.directory_regex and re.search(self.conf.directory_regex, path))
+
+    def subdirectory_files(self, path: str, dirs: list) -> list:
+        """
+        Walk the subdirectories of a matched directory for their files.
+
+        :param path: directory path
+        :param dirs: names of the subdirectories
+
+        :return: file paths relative to the directory
+        """
+        files = []
+
+        for directory in dirs:
+            walk = os.walk(os.path.join(path, directory), **self.conf.kwargs)
+
+            for root, _, names in self.rate_limiter.iter_listings(walk):
+                relative = os.path.relpath(root, path)
+                files.extend(os.path.join(relative, name) for name in names)
+
+        return files
+
+    def directory_record(self, path: str, files: list) -> dict:
+        """
+        Build the record for a matched directory.
+
+        :param path: directory path
+        :param files: paths of the member files, relative to the directory
+        """
+        output = {"uri": path, "total_files": len(files)}
+
+        if not self.conf.stats:
+            output["files"] = files
+            return output
+
+        output["files"] = []
+        total_size = 0
+        for file in files:
+            stat = os.stat(os.path.join(path, file))
+            output["files"].append(
+                {
+                    "name": file,
+                    "size": stat.st_size,
+                    "last_modified": datetime.fromtimestamp(stat.st_mtime).isoformat(),
+                }
+            )
+            total_size += stat.st_size
+
+        output["total_size"] = total_size
+        return output
+
+    def run_directories(self):
+        """
+        Walk the root path, emitting a record per matched directory. The walk
+        does not descend into matched directories, which are only walked on
+        their own with ``recursive_files``.
+        """
+        root_path = os.path.abspath(self.conf.path)
+        root_depth = root_path.rstrip(os.sep).count(os.sep)
+        kwargs = self.conf.kwargs | {"topdown": True}
+
+        for root, dirs, files in self.rate_limiter.iter_listings(os.walk(root_path, **kwargs)):
+            depth = root.rstrip(os.sep).count(os.sep) - root_depth
+
+            if self.match_directory(root, depth):
+                logger.debug("Input processing: %s", root)
+
+                if self.conf.recursive_files:
+                    files = files + self.subdirectory_files(root, dirs)
+
+                # Prune the walk below matched directories
+                dirs[:] = []
+
+                record = self.directory_record(root, sorted(files))
+                self.rate_limiter.acquire_objects(size=record.get("total_size", 0))
+
+                yield record
+
+    def run_files(self):
+        """
+        Walk the root path, emitting a record per file.
+        """
+        walk = os.walk(self.conf.path, **self.conf.kwargs)
+
+        for root, _, files in self.rate_limiter.iter_listings(walk):
             for file in files:
                 filename = os.path.abspath(os.path.join(root, file))
                 logger.debug("Input processing: %s", filename)
 
+                self.rate_limiter.acquire_objects()
+
                 yield {"uri": filename}
-                total_files += 1
+
+    def run(self):
+        total = 0
+        start = datetime.now()
+
+        records = (
+            self.run_directories() if self.conf.granularity == "directory" else self.run_files()
+        )
+
+        for record in tqdm(records):
+            yield record
+            total += 1
 
         end = datetime.now()
-        print(f"Processed {total_files} files from {self.conf.path} in {end-start}")
+        print(
+            f"Processed {total} {self.conf.granularity} records from {self.conf.path} in {end-start}"
+        )
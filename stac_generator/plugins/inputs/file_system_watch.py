@@ -0,0 +1,262 @@
+# encoding: utf-8
+"""
+File System Watch Input
+-----------------------
+
+Watches paths on the file system using `inotify <https://man7.org/linux/man-pages/man7/inotify.7.html>`_
+and submits files to the generator once they have settled, i.e. no create,
+write or move events have been seen for them within the debounce window.
+
+Requires the ``file-system-watch`` extra (`inotify_simple <https://inotify-simple.readthedocs.io/>`_)
+and a Linux host.
+
+**Plugin name:** ``file_system_watch``
+
+.. list-table::
+    :header-rows: 1
+
+    * - Option
+      - Value Type
+      - Description
+    * - ``paths``
+      - ``list``
+      - ``REQUIRED`` The root paths to watch recursively
+    * - ``debounce``
+      - ``float``
+      - Seconds without events before a file is considered settled. Default: ``5``
+    * - ``reconcile``
+      - ``bool``
+      - Submit files already present under the paths at startup. Default: ``true``
+    * - ``poll_interval``
+      - ``float``
+      - Maximum seconds to wait for events before checking for settled files. Default: ``1``
+
+Example Configuration:
+    .. code-block:: yaml
+
+        inputs:
+            - method: file_system_watch
+              paths:
+                - /landing/area
+              debounce: 10
+
+If the inotify event queue overflows, watches are re-registered and any file
+changed since the last successful read is submitted again.
+
+"""
+__author__ = "Richard Smith"
+__date__ = "19 Oct 2026"
+__copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+__contact__ = "richard.d.smith@stfc.ac.uk"
+
+import logging
+import os
+import time
+from collections.abc import Iterator
+
+from inotify_simple import INotify, flags
+from pydantic import BaseModel, Field
+
+from stac_generator.core.input import Input
+
+logger = logging.getLogger(__name__)
+
+WATCH_FLAGS = (
+    flags.CREATE
+    | flags.MODIFY
+    | flags.CLOSE_WRITE
+    | flags.MOVED_TO
+    | flags.MOVED_FROM
+    | flags.DELETE
+)
+
+UPDATE_FLAGS = flags.CREATE | flags.MODIFY | flags.CLOSE_WRITE | flags.MOVED_TO
+
+REMOVE_FLAGS = flags.DELETE | flags.MOVED_FROM
+
+# Allowance for coarse file system timestamps when reconciling
+TIMESTAMP_SLACK = 1.0
+
+
+class FileSystemWatchConf(BaseModel):
+    """File system watch config."""
+
+    paths: list[str] = Field(
+        description="Root paths to watch.",
+    )
+    debounce: float = Field(
+        default=5.0,
+        description="Seconds without events before a file is settled.",
+    )
+    reconcile: bool = Field(
+        default=True,
+        description="Submit existing files at startup.",
+    )
+    poll_interval: float = Field(
+        default=1.0,
+        description="Maximum seconds to wait for events.",
+    )
+
+
+class FileSystemWatchInput(Input):
+    """
+    Watches the file system to provide a stream of settled files for processing.
+    """
+
+    config_class = FileSystemWatchConf
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+        self.inotify = None
+        self.watches = {}
+        self.pending = {}
+
+    def add_watches(self, path: str) -> Iterator[str]:
+        """
+        Recursively watch a directory.
+
+        :param path: directory to watch
+
+        :return: files found under the directory
+        """
+        for root, _, files in os.walk(path):
+            try:
+                wd = self.inotify.add_watch(root, WATCH_FLAGS)
+            except OSError as error:
+                logger.warning("Unable to watch %s: %s", root, error)
+                continue
+
+            self.watches[wd] = root
+
+            for file in files:
+                yield os.path.join(root, file)
+
+    def remove_watches(self, path: str) -> None:
+        """
+        Stop watching a directory and everything beneath it.
+
+        :param path: directory to stop watching
+        """
+        for wd, watched_path in list(self.watches.items()):
+            if watched_path == path or watched_path.startswith(path + os.sep):
+                self.watches.pop(wd)
+                try:
+                    self.inotify.rm_watch(wd)
+                except OSError:
+                    # Watch was already removed by the kernel
+                    pass
+
+    def reset(self) -> Iterator[str]:
+        """
+        (Re)create the inotify instance and register watches on all roots.
+
+        :return: files found under the roots
+        """
+        if self.inotify:
+            self.inotify.close()
+
+        self.inotify = INotify()
+        self.watches = {}
+
+        for path in self.conf.paths:
+            yield from self.add_watches(os.path.abspath(path))
+
+    def reconcile(self, since: float) -> None:
+        """
+        Recover after an event queue overflow by re-registering the watches
+        and queuing any file changed since the last successful read.
+
+        :param since: time of the last successful read
+        """
+        logger.warning("Inotify queue overflowed, reconciling changes since %s", since)
+
+        for filename in self.reset():
+            try:
+                stat = os.stat(filename)
+            except FileNotFoundError:
+                continue
+
+            # ctime is updated by renames as well as writes
+            if max(stat.st_mtime, stat.st_ctime) >= since - TIMESTAMP_SLACK:
+                self.pending[filename] = time.monotonic()
+
+    def handle_event(self, event) -> None:
+        """
+        Update the pending files with an inotify event.
+
+        :param event: inotify event
+        """
+        if event.mask & flags.IGNORED:
+            self.watches.pop(event.wd, None)
+            return
+
+        root = self.watches.get(event.wd)
+        if root is None:
+            return
+
+        path = os.path.join(root, event.name)
+
+        if event.mask & flags.ISDIR:
+            if event.mask & (flags.CREATE | flags.MOVED_TO):
+                # Files may have been written before the watch was registered
+                for filename in self.add_watches(path):
+                    self.pending[filename] = time.monotonic()
+
+            elif event.mask & flags.MOVED_FROM:
+                self.remove_watches(path)
+
+        elif event.mask & UPDATE_FLAGS:
+            self.pending[path] = time.monotonic()
+
+        elif event.mask & REMOVE_FLAGS:
+            self.pending.pop(path, None)
+
+    def settled(self) -> Iterator[str]:
+        """
+        Pop the pending files which have had no events within the debounce window.
+
+        :return: settled files
+        """
+        cutoff = time.monotonic() - self.conf.debounce
+
+        for filename, last_event in list(self.pending.items()):
+            if last_event <= cutoff:
+                del self.pending[filename]
+
+                if os.path.isfile(filename):
+                    yield filename
+
+    def run(self):
+        start_time = time.time()
+        existing = list(self.reset())
+
+        logger.info("Watching %s directories under %s", len(self.watches), self.conf.paths)
+
+        if self.conf.reconcile:
+            for filename in existing:
+                yield {"uri": filename}
+
+        timeout = int(self.conf.poll_interval * 1000)
+
+        read_time = start_time
+        try:
+            while True:
+                # Events lost to an overflow happened after the previous read
+                previous_read_time, read_time = read_time, time.time()
+                events = self.inotify.read(timeout=timeout)
+
+                if any(event.mask & flags.Q_OVERFLOW for event in events):
+                    self.reconcile(previous_read_time)
+
+                else:
+                    for event in events:
+                        self.handle_event(event)
+
+                for filename in self.settled():
+                    logger.debug("Input processing: %s", filename)
+                    yield {"uri": filename}
+
+        finally:
+            self.inotify.close()
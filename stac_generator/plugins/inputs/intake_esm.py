@@ -35,6 +35,19 @@ as a source for file objects.
     * - ``skip``
       - ``int``
       - Optional value to skip the first n rows
+    * - ``chunk_size``
+      - ``int``
+      - Number of rows read from the catalog CSV at a time. When set and
+        there are no ``search_kwargs``, the CSV is read directly in chunks
+        so the whole catalog is never held in memory
+
+When the CSV is read in chunks, the ``read_csv_kwargs``,
+``columns_with_iterables`` and ``storage_options`` in ``catalog_kwargs`` are
+applied to each chunk as intake-esm would, so iterable columns are parsed
+with ``ast.literal_eval``.
+
+Only the ``uri_term`` and ``extra_terms`` columns are read, and records are
+built a column at a time rather than row by row.
 
 
 Example Configuration:
@@ -52,11 +65,17 @@ __license__ = "BSD - see LICENSE file in top-level package directory"
 __contact__ = "richard.d.smith@stfc.ac.uk"
 
 # Python imports
+import ast
+import json
 import logging
+import posixpath
+from collections.abc import Iterator
 from datetime import datetime
 
 # Thirdparty imports
+import fsspec
 import intake
+import pandas as pd
 from extraction_methods.core.types import KeyOutputKey
 from pydantic import BaseModel, Field
 
@@ -91,6 +110,10 @@ class IntakeESMConf(BaseModel):
         default={},
         description="search kwargs.",
     )
+    chunk_size: int | None = Field(
+        default=None,
+        description="Number of catalog rows read at a time.",
+    )
 
 
 class IntakeESMInput(Input):
@@ -100,9 +123,77 @@ class IntakeESMInput(Input):
 
     config_class = IntakeESMConf
 
-    def run(self):
-        total_files = 0
-        start = datetime.now()
+    @property
+    def columns(self) -> list[str]:
+        """
+        Catalog columns needed for the records.
+        """
+        return list(
+            dict.fromkeys([self.conf.uri_term] + [term.key for term in self.conf.extra_terms])
+        )
+
+    @property
+    def start(self) -> int:
+        """
+        First row emitted. Rows up to and including ``skip`` are skipped.
+        """
+        return max(self.conf.skip + 1, 0)
+
+    def catalog_file(self) -> str | None:
+        """
+        Path of the catalog CSV from the ESM collection description.
+
+        :return: path, or None if the catalog is embedded in the description
+        """
+        storage_options = self.conf.catalog_kwargs.get("storage_options", {})
+
+        with fsspec.open(self.conf.url, "rt", **storage_options) as reader:
+            catalog_file = json.load(reader).get("catalog_file")
+
+        if catalog_file and "://" not in catalog_file and not posixpath.isabs(catalog_file):
+            catalog_file = posixpath.join(posixpath.dirname(self.conf.url), catalog_file)
+
+        return catalog_file
+
+    def read_csv_kwargs(self) -> dict:
+        """
+        Keyword arguments for reading the catalog CSV in chunks, with
+        converters for the ``columns_with_iterables``.
+        """
+        kwargs = dict(self.conf.catalog_kwargs.get("read_csv_kwargs", {}))
+        converters = dict(kwargs.get("converters", {}))
+
+        for column in self.conf.catalog_kwargs.get("columns_with_iterables", []):
+            converters.setdefault(column, ast.literal_eval)
+
+        if converters:
+            kwargs["converters"] = converters
+
+        if "storage_options" in self.conf.catalog_kwargs:
+            kwargs["storage_options"] = self.conf.catalog_kwargs["storage_options"]
+
+        return kwargs
+
+    def frames(self) -> Iterator[pd.DataFrame]:
+        """
+        Read the needed columns of the catalog rows after ``skip``.
+
+        :return: dataframes of at most ``chunk_size`` rows
+        """
+        catalog_file = (
+            self.catalog_file() if self.conf.chunk_size and not self.conf.search_kwargs else None
+        )
+
+        if catalog_file:
+            LOGGER.info("Reading catalog %s in chunks", catalog_file)
+            yield from pd.read_csv(
+                catalog_file,
+                usecols=self.columns,
+                skiprows=range(1, self.start + 1),
+                chunksize=self.conf.chunk_size,
+                **self.read_csv_kwargs(),
+            )
+            return
 
         LOGGER.info("Opening catalog %s", self.conf.url)
         catalog = intake.open_esm_datastore(self.conf.url, **self.conf.catalog_kwargs)
@@ -113,19 +204,38 @@ class IntakeESMInput(Input):
 
         LOGGER.info("Found %s items", len(catalog.df))
 
-        count = 0
-        for _, row in catalog.df.iterrows():
-            if count > self.conf.skip:
-                output = {"uri": getattr(row, self.conf.uri_term)}
-                LOGGER.debug("Input processing: %s", output["uri"])
+        df = catalog.df.iloc[self.start :][self.columns]
+        chunk_size = self.conf.chunk_size or len(df) or 1
+
+        for offset in range(0, len(df), chunk_size):
+            yield df.iloc[offset : offset + chunk_size]
+
+    def records(self, df: pd.DataFrame) -> Iterator[dict]:
+        """
+        Build the records for a dataframe a column at a time.
 
-                for extra_term in self.conf.extra_terms:
-                    output[extra_term.output_key] = getattr(row, extra_term.key)
+        :param df: catalog rows
+
+        :return: records
+        """
+        keys = ["uri"] + [term.output_key for term in self.conf.extra_terms]
+        columns = [df[self.conf.uri_term].tolist()] + [
+            df[term.key].tolist() for term in self.conf.extra_terms
+        ]
+
+        for values in zip(*columns):
+            yield dict(zip(keys, values))
+
+    def run(self):
+        total_files = 0
+        start = datetime.now()
+
+        for df in self.frames():
+            for output in self.records(df):
+                LOGGER.debug("Input processing: %s", output["uri"])
 
                 yield output
                 total_files += 1
 
-            count += 1
-
         end = datetime.now()
         print(f"Processed {total_files} files from {self.conf.url} in {end-start}")
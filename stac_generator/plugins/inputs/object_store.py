@@ -30,6 +30,44 @@ asset generator
     * - ``delimiter``
       - ``string``
       - Group items after delimiter into one object
+    * - ``rate_limit``
+      - :py:mod:`Rate limit <stac_generator.core.rate_limiter>`
+      - Optional limits on listing pages, objects and bytes per second
+    * - ``client_name``
+      - ``string``
+      - Name of the client referenced in the records. Default: the ``url``
+    * - ``max_pool_connections``
+      - ``int``
+      - Maximum connections pooled by each client. Default: ``10``
+    * - ``threads``
+      - ``int``
+      - Number of shards listed concurrently. Default: ``1``
+    * - ``shard_delimiter``
+      - ``string``
+      - Split each bucket into shards on the common prefixes found with this
+        delimiter. Default: ``/``
+    * - ``shard_depth``
+      - ``int``
+      - Number of ``shard_delimiter`` levels to split on. Default: ``1``
+    * - ``shard_characters``
+      - ``string``
+      - Split each bucket into key ranges starting at each of these
+        characters after the prefix, instead of using the delimiter
+    * - ``granularity``
+      - ``string``
+      - ``object`` (default) to emit a record per object or ``store`` to emit
+        a record per zarr store or reference file
+    * - ``store_markers``
+      - ``list``
+      - Store mode: object names which mark a zarr store root.
+        Default: ``[.zmetadata, .zgroup, .zarray, zarr.json]``
+    * - ``reference_suffixes``
+      - ``list``
+      - Store mode: suffixes of kerchunk reference files, such as ``.json``.
+        Default: ``[]``, no reference files
+    * - ``marker_content``
+      - ``bool``
+      - Store mode: read and attach the JSON content of the markers
 
 Example Configuration:
     .. code-block:: yaml
@@ -46,6 +84,47 @@ Example Configuration:
                 prefix: directory_or_file
                 delimiter: .zarr/
 
+Example Sharded Configuration:
+    .. code-block:: yaml
+
+        inputs:
+            - method: object_store
+                url: https://cedadev-o.s3-ext.jc.rl.ac.uk
+                buckets:
+                  - my_bucket
+                threads: 16
+                shard_depth: 2
+
+Example Store Configuration:
+    .. code-block:: yaml
+
+        inputs:
+            - method: object_store
+                url: https://cedadev-o.s3-ext.jc.rl.ac.uk
+                buckets:
+                  - cmip6
+                granularity: store
+                reference_suffixes:
+                  - .json
+                threads: 8
+
+In store mode the bucket is walked with ``/`` delimiter listings. A prefix
+containing one of the ``store_markers`` is emitted as one record, with the
+listing stats of its ``markers``, and is not listed any further. Reference
+files found on the way, with one of the ``reference_suffixes``, are emitted
+as records of their own with ``store_type`` set to ``reference``. Other
+objects are ignored.
+
+Each record contains the object ``uri`` and the ``size``, ``last_modified``
+and ``Etag`` from the listing, so extraction methods do not need to request
+them again. The ``client`` in each record is a
+:py:class:`~stac_generator.core.clients.ClientReference`, which the generator
+resolves to a client in the process running the extraction methods.
+
+Shards are only listed concurrently when ``threads`` is greater than 1. Each
+thread uses its own client and the records from all shards are merged into
+one stream, so their order is not preserved.
+
 """
 __author__ = "Rhys Evans"
 __date__ = "02 Jun 2021"
@@ -54,14 +133,22 @@ __license__ = "BSD - see LICENSE file in top-level package directory"
 __contact__ = "rhys.r.evans@stfc.ac.uk"
 
 
+import json
 import logging
+import threading
+from collections.abc import Iterator
+from typing import Literal
 
 import boto3
-from extraction_methods.core.types import KeyOutputKey
+from botocore.config import Config
 from pydantic import BaseModel, Field
 
 # Package imports
+from stac_generator.core.clients import CLIENTS
+from stac_generator.core.concurrency import merge_iterators
 from stac_generator.core.input import Input
+from stac_generator.core.rate_limiter import RateLimitConf, RateLimiter
+from stac_generator.core.utils import Stats
 
 LOGGER = logging.getLogger(__name__)
 
@@ -73,51 +160,387 @@ class ObjectStoreConf(BaseModel):
         description="URL of datastore.",
     )
     buckets: list[str] = Field(
-        default=-1,
-        description="Number of rows to skip.",
+        default=[],
+        description="Buckets to scan, all buckets if empty.",
     )
     prefix: str = Field(
-        description="URL of datastore.",
+        default="",
+        description="Prefix of objects to scan.",
     )
     delimiter: str = Field(
-        description="URL of datastore.",
+        default="",
+        description="Delimiter to group objects by.",
     )
     session_kwargs: dict = Field(
         default={},
         description="session kwargs.",
     )
+    rate_limit: RateLimitConf = Field(
+        default=RateLimitConf(),
+        description="Listing, object and byte rate limits.",
+    )
+    client_name: str | None = Field(
+        default=None,
+        description="Name of the client referenced in records.",
+    )
+    max_pool_connections: int = Field(
+        default=10,
+        description="Maximum connections pooled by each client.",
+    )
+    threads: int = Field(
+        default=1,
+        description="Number of shards listed concurrently.",
+    )
+    shard_delimiter: str = Field(
+        default="/",
+        description="Delimiter used to find shard prefixes.",
+    )
+    shard_depth: int = Field(
+        default=1,
+        description="Number of delimiter levels to shard on.",
+    )
+    shard_characters: str | None = Field(
+        default=None,
+        description="Characters to split the key range on.",
+    )
+    granularity: Literal["object", "store"] = Field(
+        default="object",
+        description="Emit a record per object or per store.",
+    )
+    store_markers: list[str] = Field(
+        default=[".zmetadata", ".zgroup", ".zarray", "zarr.json"],
+        description="Object names marking a store root.",
+    )
+    reference_suffixes: list[str] = Field(
+        default=[],
+        description="Suffixes of reference files.",
+    )
+    marker_content: bool = Field(
+        default=False,
+        description="Attach the JSON content of store markers.",
+    )
 
 
 class ObjectStoreInput(Input):
-    """ """
+    """
+    Lists the objects in an object store to provide a stream of objects for processing.
+    """
 
     config_class = ObjectStoreConf
 
-    def run(self):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+        self.rate_limiter = RateLimiter.get(self.conf.rate_limit)
+        self._local = threading.local()
+
+        self.client_reference = CLIENTS.register(
+            self.conf.client_name or self.conf.url, self.create_client
+        )
 
+    def create_client(self):
+        """
+        Create a new S3 client with its own session.
+        """
         session = boto3.session.Session(**self.conf.session_kwargs)
-        s3 = session.resource(
+
+        return session.client(
             "s3",
             endpoint_url=self.conf.url,
+            config=Config(max_pool_connections=self.conf.max_pool_connections),
         )
 
-        buckets = (
-            [s3.Bucket(bucket) for bucket in self.conf.buckets]
-            if self.conf.buckets
-            else s3.buckets.all()
+    @property
+    def client(self):
+        """
+        S3 client for the current thread. Sessions are not thread safe, so
+        each thread creates and then reuses its own.
+        """
+        if not hasattr(self._local, "client"):
+            self._local.client = self.create_client()
+
+        return self._local.client
+
+    def list_pages(self, bucket: str, prefix: str, **kwargs) -> Iterator[dict]:
+        """
+        Rate limited listing of a prefix.
+
+        :param bucket: bucket name
+        :param prefix: key prefix
+        :param kwargs: additional ``list_objects_v2`` parameters
+
+        :return: listing pages
+        """
+        paginator = self.client.get_paginator("list_objects_v2")
+
+        yield from self.rate_limiter.iter_listings(
+            paginator.paginate(Bucket=bucket, Prefix=prefix, **kwargs)
         )
 
+    def list_objects(
+        self, bucket: str, prefix: str, start_after: str = "", end: str | None = None
+    ) -> Iterator[dict]:
+        """
+        List the objects in a shard.
+
+        :param bucket: bucket name
+        :param prefix: key prefix
+        :param start_after: only list keys after this key
+        :param end: only list keys up to and including this key
+
+        :return: object listings
+        """
+        kwargs = {}
+        if self.conf.delimiter:
+            kwargs["Delimiter"] = self.conf.delimiter
+        if start_after:
+            kwargs["StartAfter"] = start_after
+
+        for page in self.list_pages(bucket, prefix, **kwargs):
+            for obj in page.get("Contents", []):
+                # Keys are listed in order, so the shard is finished
+                if end is not None and obj["Key"] > end:
+                    return
+
+                self.rate_limiter.acquire_objects(size=obj.get("Size", 0))
+
+                yield obj
+
+    def delimiter_shards(self, bucket: str, prefix: str, depth: int) -> Iterator[dict]:
+        """
+        Split a prefix into shards on its common prefixes. Objects directly
+        under the prefix form a shard of their own.
+
+        :param bucket: bucket name
+        :param prefix: key prefix
+        :param depth: number of delimiter levels left to split on
+
+        :return: shard descriptions
+        """
+        if depth <= 0:
+            yield {"prefix": prefix}
+            return
+
+        yield {"prefix": prefix, "level": True}
+
+        for page in self.list_pages(bucket, prefix, Delimiter=self.conf.shard_delimiter):
+            for common_prefix in page.get("CommonPrefixes", []):
+                yield from self.delimiter_shards(bucket, common_prefix["Prefix"], depth - 1)
+
+    def character_shards(self, prefix: str) -> Iterator[dict]:
+        """
+        Split a prefix into key ranges at each of the configured characters.
+
+        :param prefix: key prefix
+
+        :return: shard descriptions
+        """
+        bounds = [prefix + character for character in sorted(self.conf.shard_characters)]
+
+        for start_after, end in zip([""] + bounds, bounds + [None]):
+            yield {"prefix": prefix, "start_after": start_after, "end": end}
+
+    def list_shard(
+        self,
+        bucket: str,
+        prefix: str,
+        start_after: str = "",
+        end: str | None = None,
+        level: bool = False,
+    ) -> Iterator[dict]:
+        """
+        List the objects of a shard.
+
+        :param bucket: bucket name
+        :param prefix: key prefix
+        :param start_after: only list keys after this key
+        :param end: only list keys up to and including this key
+        :param level: only list the objects directly under the prefix
+
+        :return: object listings
+        """
+        if not level:
+            yield from self.list_objects(bucket, prefix, start_after, end)
+            return
+
+        for page in self.list_pages(bucket, prefix, Delimiter=self.conf.shard_delimiter):
+            for obj in page.get("Contents", []):
+                self.rate_limiter.acquire_objects(size=obj.get("Size", 0))
+
+                yield obj
+
+    def shards(self, bucket: str) -> Iterator[dict]:
+        """
+        Split a bucket into shards to be listed concurrently.
+
+        :param bucket: bucket name
+
+        :return: shard descriptions
+        """
+        if self.conf.shard_characters:
+            return self.character_shards(self.conf.prefix)
+
+        return self.delimiter_shards(bucket, self.conf.prefix, self.conf.shard_depth)
+
+    def list_bucket(self, bucket: str) -> Iterator[dict]:
+        """
+        List all objects in a bucket, concurrently if configured.
+
+        :param bucket: bucket name
+
+        :return: object listings
+        """
+        if self.conf.threads <= 1:
+            yield from self.list_objects(bucket, self.conf.prefix)
+            return
+
+        shards = list(self.shards(bucket))
+        LOGGER.info("Listing %s shards of %s on %s threads", len(shards), bucket, self.conf.threads)
+
+        yield from merge_iterators(
+            (self.list_shard(bucket, **shard) for shard in shards),
+            workers=self.conf.threads,
+        )
+
+    def store_level(self, bucket: str, prefix: str) -> tuple[dict, list, list]:
+        """
+        List one ``/`` level of a prefix for store markers.
+
+        :param bucket: bucket name
+        :param prefix: key prefix
+
+        :return: markers, reference file listings and common prefixes
+        """
+        markers = {}
+        references = []
+        prefixes = []
+
+        for page in self.list_pages(bucket, prefix, Delimiter="/"):
+            for obj in page.get("Contents", []):
+                name = obj["Key"][len(prefix) :]
+
+                if name in self.conf.store_markers:
+                    markers[name] = Stats.from_boto_listing(obj)
+
+                    if self.conf.marker_content:
+                        response = self.client.get_object(Bucket=bucket, Key=obj["Key"])
+                        markers[name]["content"] = json.loads(response["Body"].read())
+
+                elif name.endswith(tuple(self.conf.reference_suffixes)):
+                    references.append(obj)
+
+            prefixes.extend(
+                common_prefix["Prefix"] for common_prefix in page.get("CommonPrefixes", [])
+            )
+
+        return markers, references, prefixes
+
+    def store_record(self, bucket: str, prefix: str, markers: dict) -> dict:
+        """
+        Build the record for a store.
+
+        :param bucket: bucket name
+        :param prefix: store root prefix
+        :param markers: store markers found under the prefix
+        """
+        self.rate_limiter.acquire_objects()
+
+        return {
+            "uri": f"{self.conf.url}/{bucket}/{prefix.rstrip('/')}",
+            "store_type": "zarr",
+            "markers": markers,
+            "client": self.client_reference,
+        }
+
+    def reference_record(self, bucket: str, obj: dict) -> dict:
+        """
+        Build the record for a reference file.
+
+        :param bucket: bucket name
+        :param obj: object listing
+        """
+        self.rate_limiter.acquire_objects(size=obj.get("Size", 0))
+
+        return self.object_record(bucket, obj) | {"store_type": "reference"}
+
+    def list_stores(self, bucket: str, prefix: str) -> Iterator[dict]:
+        """
+        Walk a prefix for stores, without listing below a store root.
+
+        :param bucket: bucket name
+        :param prefix: key prefix
+
+        :return: store and reference records
+        """
+        markers, references, prefixes = self.store_level(bucket, prefix)
+
+        if markers:
+            yield self.store_record(bucket, prefix, markers)
+            return
+
+        for reference in references:
+            yield self.reference_record(bucket, reference)
+
+        for sub_prefix in prefixes:
+            yield from self.list_stores(bucket, sub_prefix)
+
+    def store_records(self, bucket: str) -> Iterator[dict]:
+        """
+        Records for all stores in a bucket, walking the top level prefixes
+        concurrently if configured.
+
+        :param bucket: bucket name
+
+        :return: store and reference records
+        """
+        markers, references, prefixes = self.store_level(bucket, self.conf.prefix)
+
+        if markers:
+            yield self.store_record(bucket, self.conf.prefix, markers)
+            return
+
+        for reference in references:
+            yield self.reference_record(bucket, reference)
+
+        stores = (self.list_stores(bucket, prefix) for prefix in prefixes)
+
+        if self.conf.threads <= 1:
+            for store in stores:
+                yield from store
+
+            return
+
+        yield from merge_iterators(stores, workers=self.conf.threads)
+
+    def object_record(self, bucket: str, obj: dict) -> dict:
+        """
+        Build the record for an object.
+
+        :param bucket: bucket name
+        :param obj: object listing
+        """
+        return {
+            "uri": f"{self.conf.url}/{bucket}/{obj['Key']}",
+            **Stats.from_boto_listing(obj),
+            "client": self.client_reference,
+        }
+
+    def run(self):
+        buckets = self.conf.buckets or [
+            bucket["Name"] for bucket in self.client.list_buckets()["Buckets"]
+        ]
+
         for bucket in buckets:
-            total_files = 0
+            total = 0
 
-            for obj in bucket.objects.filter(
-                Prefix=self.conf.prefix, Delimiter=self.conf.delimiter
-            ):
+            if self.conf.granularity == "store":
+                records = self.store_records(bucket)
 
-                yield {
-                    "uri": f"{self.conf.url}/{bucket.name}/{obj.key}",
-                    "client": s3.meta.client,
-                }
-                total_files += 1
+            else:
+                records = (self.object_record(bucket, obj) for obj in self.list_bucket(bucket))
+
+            for record in records:
+                yield record
+                total += 1
 
-            LOGGER.info("Processed %s files from %s", total_files, bucket)
+            LOGGER.info("Processed %s %s records from %s", total, self.conf.granularity, bucket)
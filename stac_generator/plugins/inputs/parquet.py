@@ -0,0 +1,276 @@
+# encoding: utf-8
+"""
+Parquet Input
+-------------
+
+Streams a listing stored as `Parquet <https://parquet.apache.org/>`_ or
+Arrow IPC files, such as a robinhood, S3 inventory or Spark export, using
+`pyarrow datasets <https://arrow.apache.org/docs/python/dataset.html>`_.
+
+Only the ``uri_term`` and ``extra_terms`` columns are read. ``filters`` are
+pushed down to the scan, so row groups whose statistics cannot match are
+skipped without being read. Records are built from each record batch a
+column at a time, and at most ``batch_readahead`` batches are held in memory
+for each of ``fragment_readahead`` files.
+
+**Plugin name:** ``parquet``
+
+.. list-table::
+    :header-rows: 1
+
+    * - Option
+      - Value Type
+      - Description
+    * - ``path``
+      - ``string``
+      - ``REQUIRED`` Path to a file or directory of files
+    * - ``format``
+      - ``string``
+      - ``parquet`` or ``ipc`` for Arrow IPC (Feather) files. Default: ``parquet``
+    * - ``partitioning``
+      - ``string``
+      - Partitioning of a directory of files, such as ``hive``
+    * - ``uri_term``
+      - ``string``
+      - Column to use as the uri. Default: ``uri``
+    * - ``extra_terms``
+      - ``list``
+      - Columns to add to the records
+    * - ``filters``
+      - ``list``
+      - Filters on the rows, each with a ``key``, ``op`` and ``value``. ``op``
+        is one of ``==``, ``!=``, ``<``, ``<=``, ``>``, ``>=``, ``in``,
+        ``not in`` or ``prefix``. Values for timestamp and date columns can
+        be given as ISO 8601 strings
+    * - ``batch_size``
+      - ``int``
+      - Maximum number of rows in a record batch. Default: ``65536``
+    * - ``batch_readahead``
+      - ``int``
+      - Number of batches read ahead in each file. Default: ``4``
+    * - ``fragment_readahead``
+      - ``int``
+      - Number of files read ahead. Default: ``2``
+
+Example Configuration:
+    .. code-block:: yaml
+
+        inputs:
+            - method: parquet
+              path: /inventory/cmip6/
+              uri_term: path
+              extra_terms:
+                - key: size
+                  output_key: size
+              filters:
+                - key: path
+                  op: prefix
+                  value: /badc/cmip6/data/CMIP6/CMIP/
+                - key: size
+                  op: ">="
+                  value: 1048576
+                - key: mtime
+                  op: ">="
+                  value: "2024-01-01T00:00:00"
+
+"""
+__author__ = "Richard Smith"
+__date__ = "19 Oct 2026"
+__copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+__contact__ = "richard.d.smith@stfc.ac.uk"
+
+import logging
+import operator
+from collections.abc import Iterator
+from datetime import date, datetime
+from functools import reduce
+from typing import Any, Literal
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+from extraction_methods.core.types import KeyOutputKey
+from pydantic import BaseModel, Field
+
+from stac_generator.core.input import Input
+
+LOGGER = logging.getLogger(__name__)
+
+OPERATORS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+
+class ParquetFilter(BaseModel):
+    """Parquet row filter."""
+
+    key: str = Field(
+        description="Column to filter on.",
+    )
+    op: Literal["==", "!=", "<", "<=", ">", ">=", "in", "not in", "prefix"] = Field(
+        description="Comparison operator.",
+    )
+    value: Any = Field(
+        description="Value to compare with.",
+    )
+
+
+class ParquetConf(BaseModel):
+    """Parquet config."""
+
+    path: str = Field(
+        description="Path to a file or directory of files.",
+    )
+    format: Literal["parquet", "ipc"] = Field(
+        default="parquet",
+        description="File format.",
+    )
+    partitioning: str | None = Field(
+        default=None,
+        description="Partitioning of a directory of files.",
+    )
+    uri_term: str = Field(
+        default="uri",
+        description="Column to use as uri.",
+    )
+    extra_terms: list[KeyOutputKey] = Field(
+        default=[],
+        description="List of extra attributes.",
+    )
+    filters: list[ParquetFilter] = Field(
+        default=[],
+        description="Filters on the rows.",
+    )
+    batch_size: int = Field(
+        default=64 * 1024,
+        description="Maximum number of rows in a record batch.",
+    )
+    batch_readahead: int = Field(
+        default=4,
+        description="Number of batches read ahead in each file.",
+    )
+    fragment_readahead: int = Field(
+        default=2,
+        description="Number of files read ahead.",
+    )
+
+
+class ParquetInput(Input):
+    """
+    Streams the rows of Parquet or Arrow IPC files by record batch.
+    """
+
+    config_class = ParquetConf
+
+    @staticmethod
+    def scalar(value: Any, data_type: pa.DataType) -> Any:
+        """
+        Convert an ISO 8601 string for a timestamp or date column.
+
+        :param value: configured value
+        :param data_type: type of the column
+
+        :return: value to compare the column with
+        """
+        if not isinstance(value, str):
+            return value
+
+        if pa.types.is_timestamp(data_type):
+            value = datetime.fromisoformat(value)
+
+            # Columns without a time zone are compared with naive values
+            if data_type.tz is None:
+                return value.replace(tzinfo=None)
+
+            return pa.scalar(value, type=data_type)
+
+        if pa.types.is_date(data_type):
+            return date.fromisoformat(value)
+
+        return value
+
+    def expression(self, dataset: ds.Dataset) -> ds.Expression | None:
+        """
+        Build the scan filter from the configured filters.
+
+        :param dataset: dataset to be scanned
+
+        :return: filter expression, or None to read every row
+        """
+        expressions = []
+
+        for row_filter in self.conf.filters:
+            field = ds.field(row_filter.key)
+            data_type = dataset.schema.field(row_filter.key).type
+
+            if row_filter.op == "prefix":
+                prefix = row_filter.value
+
+                # Every row matches an empty prefix
+                if not prefix:
+                    continue
+
+                # A range rather than starts_with, so row group statistics are used
+                expressions.append(
+                    (field >= prefix) & (field < prefix[:-1] + chr(ord(prefix[-1]) + 1))
+                )
+
+            elif row_filter.op in ("in", "not in"):
+                values = [self.scalar(value, data_type) for value in row_filter.value]
+                expression = field.isin(values)
+                expressions.append(expression if row_filter.op == "in" else ~expression)
+
+            else:
+                expressions.append(
+                    OPERATORS[row_filter.op](field, self.scalar(row_filter.value, data_type))
+                )
+
+        return reduce(operator.and_, expressions) if expressions else None
+
+    def records(self, batch: pa.RecordBatch) -> Iterator[dict]:
+        """
+        Build the records for a record batch a column at a time.
+
+        :param batch: record batch with the uri and extra term columns
+
+        :return: records
+        """
+        keys = ["uri"] + [term.output_key for term in self.conf.extra_terms]
+        columns = [batch.column(self.conf.uri_term).to_pylist()] + [
+            batch.column(term.key).to_pylist() for term in self.conf.extra_terms
+        ]
+
+        for values in zip(*columns):
+            yield dict(zip(keys, values))
+
+    def run(self):
+        start = datetime.now()
+        total_generated = 0
+
+        dataset = ds.dataset(
+            self.conf.path, format=self.conf.format, partitioning=self.conf.partitioning
+        )
+        columns = list(
+            dict.fromkeys([self.conf.uri_term] + [term.key for term in self.conf.extra_terms])
+        )
+
+        LOGGER.info("Reading %s files from %s", len(dataset.files), self.conf.path)
+
+        for batch in dataset.to_batches(
+            columns=columns,
+            filter=self.expression(dataset),
+            batch_size=self.conf.batch_size,
+            batch_readahead=self.conf.batch_readahead,
+            fragment_readahead=self.conf.fragment_readahead,
+        ):
+            for output in self.records(batch):
+                yield output
+                total_generated += 1
+
+        end = datetime.now()
+        print(f"Processed {total_generated} {self.conf.format} records in {end-start}")
@@ -40,6 +40,82 @@ TODO: Make the callback more flexible (open to collaboration)
     * - ``queues``
       - ``list``
       - ``REQUIRED`` Queue parameters. `queues`_
+    * - ``prefetch_count``
+      - ``int``
+      - Number of unacknowledged messages the broker will deliver. Default: ``1``
+    * - ``ack_batch_size``
+      - ``int``
+      - Number of messages acknowledged together with ``multiple=True``. Default: ``1``
+    * - ``flush_interval``
+      - ``float``
+      - Seconds without new messages before the bulk outputs are flushed and
+        the processed messages acknowledged. Default: ``1``
+    * - ``consumers``
+      - ``int``
+      - Number of consumer threads, each with its own connection. Default: ``1``
+    * - ``work_queue_size``
+      - ``int``
+      - Maximum number of records buffered between the consumers and the
+        generator. Default: ``consumers * prefetch_count``
+    * - ``reconnect_delay``
+      - ``float``
+      - Seconds a consumer waits before reconnecting. Default: ``5``
+    * - ``message_formats``
+      - ``list``
+      - Formats tried in order to decode messages: ``json``, ``literal``
+        (a python dictionary) or ``colon`` (the legacy ``:`` separated
+        format). Default: ``[json]``
+    * - ``format_header``
+      - ``string``
+      - Message header naming the format of the message. Messages naming a
+        format which is not in ``message_formats`` are invalid. Default: ``format``
+    * - ``log_sample``
+      - ``int``
+      - Log one in this many messages at ``INFO``, the rest at ``DEBUG``. Default: ``1000``
+    * - ``coalesce_window``
+      - ``float``
+      - Seconds after the first event for a uri in which later events are
+        merged into it. Default: ``0``, no coalescing
+    * - ``action_key``
+      - ``string``
+      - Message key holding the event action. Default: ``action``
+    * - ``delete_actions``
+      - ``list``
+      - Actions which are passed on straight away. Default: ``[DELETE]``
+    * - ``delete_recipe_path``
+      - ``string``
+      - Recipe path set on records for delete actions, so they are
+        generated with a removal recipe
+
+Messages are only acknowledged once their records have been written by the
+outputs, including any bulk outputs holding them in their cache, so delivery
+is at least once. When the ``prefetch_count`` window is full, or no message
+arrives for ``flush_interval`` seconds, the bulk outputs are flushed so the
+window can be acknowledged. With the generator's ``lanes``, records may
+still be processing when the window fills, so the flush happens once the
+lanes have processed every message in the window. Set ``prefetch_count`` to at least the
+``cache_max_size`` of the bulk outputs to export full caches.
+
+Messages with an ``application/json`` content type, or a format header, are
+decoded with that format only. A format header can only select one of the
+configured ``message_formats``, so legacy formats stay opt in. JSON is parsed with
+`orjson <https://github.com/ijl/orjson>`_ when the ``fast-json`` extra is
+installed. Counts of received, invalid and decoded messages by format are
+kept in the metrics.
+
+Deposit systems often publish several events per file. With a
+``coalesce_window``, events for a uri are held until the window after its
+first event has passed, then a single record is generated for the latest
+event and all of the merged messages are acknowledged together once it is
+written. Delete actions are not held. They replace any pending event for
+the uri and are passed on straight away.
+
+Each consumer thread decodes its deliveries and puts the records on a shared
+work queue, which the generator reads from. A consumer which loses its
+connection reconnects on its own; its unacknowledged messages are
+redelivered by the broker and any of its records still on the work queue
+are dropped. Metrics are kept for each consumer under
+``rabbitmq.consumer.<number>``.
 
 
 exchange
@@ -112,6 +188,9 @@ Example Configuration:
                     routing_key: my.routing.key
                   consume_kwargs:
                     auto_ack: false
+              prefetch_count: 1000
+              ack_batch_size: 100
+              consumers: 4
 
 
 """
@@ -124,9 +203,14 @@ __contact__ = "richard.d.smith@stfc.ac.uk"
 # Python imports
 import ast
 import functools
-import json
+import itertools
 import logging
-from collections import namedtuple
+import threading
+import time
+from collections import deque, namedtuple
+from collections.abc import Callable, Iterator
+from queue import Empty, Full, Queue
+from typing import Literal
 
 # Third-party imports
 import pika
@@ -134,9 +218,21 @@ from extraction_methods.core.types import KeyOutputKey
 from pydantic import BaseModel, Field
 
 from stac_generator.core.input import Input
+from stac_generator.core.metrics import METRICS
+from stac_generator.core.utils import json_loads
 
 LOGGER = logging.getLogger(__name__)
 
+# A record with its event action and the (tracker, delivery tag) pairs to acknowledge
+Delivery = namedtuple("Delivery", ["record", "action", "acks", "received"])
+
+MessageFormat = Literal["json", "literal", "colon"]
+
+# Message formats named by the content type property
+CONTENT_TYPES = {
+    "application/json": "json",
+}
+
 
 class RabbitMQConnection(BaseModel):
     """RabbitMQ Connection model."""
@@ -169,7 +265,7 @@ class RabbitMQExchange(BaseModel):
         default="topic",
         description="RabbitMQ exchange type.",
     )
-    kwargs: str = Field(
+    kwargs: dict = Field(
         default={},
         description="RabbitMQ exchange kwargs.",
     )
@@ -216,17 +312,289 @@ class RabbitMQConf(BaseModel):
         default=[],
         description="List of extra attributes.",
     )
+    prefetch_count: int = Field(
+        default=1,
+        description="Number of unacknowledged messages the broker will deliver.",
+    )
+    ack_batch_size: int = Field(
+        default=1,
+        description="Number of messages acknowledged together.",
+    )
+    flush_interval: float = Field(
+        default=1.0,
+        description="Seconds without messages before outputs are flushed.",
+    )
+    consumers: int = Field(
+        default=1,
+        description="Number of consumer threads.",
+    )
+    work_queue_size: int | None = Field(
+        default=None,
+        description="Maximum number of records buffered for the generator.",
+    )
+    reconnect_delay: float = Field(
+        default=5.0,
+        description="Seconds to wait before reconnecting.",
+    )
+    message_formats: list[MessageFormat] = Field(
+        default=["json"],
+        description="Message formats to try, in order.",
+    )
+    format_header: str = Field(
+        default="format",
+        description="Message header naming the message format.",
+    )
+    log_sample: int = Field(
+        default=1000,
+        ge=1,
+        description="Log one in this many messages at INFO.",
+    )
+    coalesce_window: float = Field(
+        default=0.0,
+        description="Seconds in which events for the same uri are merged.",
+    )
+    action_key: str = Field(
+        default="action",
+        description="Message key holding the event action.",
+    )
+    delete_actions: list[str] = Field(
+        default=["DELETE"],
+        description="Actions which are passed on without coalescing.",
+    )
+    delete_recipe_path: str | None = Field(
+        default=None,
+        description="Recipe path used for delete actions.",
+    )
+
+
+class AckTracker:
+    """
+    Tracks the deliveries on a channel so they can be acknowledged in
+    batches with ``multiple=True``. A delivery is acknowledged once it, and
+    every delivery before it, has been processed and flushed.
+    """
+
+    def __init__(
+        self,
+        connection: pika.BlockingConnection,
+        channel: pika.channel.Channel,
+        metric_prefix: str = "rabbitmq",
+    ):
+        self.connection = connection
+        self.channel = channel
+        self.metric_prefix = metric_prefix
+        self.closed = False
+        self.outstanding = deque()
+        self.completed = set()
+        self.flushed = set()
+        self.watermark = 0
+        self.ackable = 0
+        self._lock = threading.Lock()
+
+    @property
+    def unacknowledged(self) -> int:
+        """
+        Number of deliveries which have not been acknowledged.
+        """
+        return len(self.outstanding) + self.ackable
+
+    @property
+    def unprocessed(self) -> int:
+        """
+        Number of deliveries which have not been processed.
+        """
+        with self._lock:
+            return len(self.outstanding) - len(self.completed) - len(self.flushed)
+
+    def delivered(self, delivery_tag: int) -> None:
+        """
+        Record a delivery.
+
+        :param delivery_tag: delivery tag of the message
+        """
+        with self._lock:
+            self.outstanding.append(delivery_tag)
+
+    def complete(self, delivery_tag: int) -> None:
+        """
+        Mark a delivery as processed, so it can be acknowledged after the next flush.
+
+        :param delivery_tag: delivery tag of the message
+        """
+        with self._lock:
+            self.completed.add(delivery_tag)
+
+    def flush(self) -> None:
+        """
+        Mark the processed deliveries as flushed and advance the watermark
+        over the deliveries which can now be acknowledged.
+        """
+        with self._lock:
+            self.flushed |= self.completed
+            self.completed = set()
+
+            while self.outstanding and self.outstanding[0] in self.flushed:
+                self.watermark = self.outstanding.popleft()
+                self.flushed.discard(self.watermark)
+                self.ackable += 1
+
+    def acknowledge(self, batch_size: int = 1) -> int:
+        """
+        Acknowledge every delivery up to the watermark, if there are at
+        least ``batch_size`` of them.
+
+        :param batch_size: minimum number of deliveries to acknowledge
+
+        :return: number of deliveries acknowledged
+        """
+        with self._lock:
+            count = self.ackable
+
+            if self.closed or not count or count < batch_size:
+                return 0
+
+            self.ackable = 0
+            delivery_tag = self.watermark
+
+        cb = functools.partial(RabbitMQInput._acknowledge_message, self.channel, delivery_tag, True)
+
+        try:
+            self.connection.add_callback_threadsafe(cb)
+
+        except pika.exceptions.ConnectionWrongStateError:
+            # The broker redelivers the messages of a closed connection
+            return 0
+
+        METRICS.increment(f"{self.metric_prefix}.acknowledged", count)
+
+        return count
+
+
+class RabbitMQConsumer(threading.Thread):
+    """
+    Consumes from the queues on its own connection and puts the records on
+    the input's work queue, reconnecting when the connection is lost.
+    """
+
+    def __init__(self, rabbit_input: "RabbitMQInput", number: int):
+        super().__init__(name=f"rabbitmq-consumer-{number}", daemon=True)
+        self.input = rabbit_input
+        self.metric_prefix = f"rabbitmq.consumer.{number}"
+        self.tracker = None
+        self.deliveries = deque()
+        self.stop = threading.Event()
+
+    def callback(
+        self,
+        ch: pika.channel.Channel,
+        method: pika.frame.Method,
+        properties: pika.frame.Header,
+        body: bytes,
+    ) -> None:
+        """
+        Decode a delivery and buffer its record until the work queue has space.
+        """
+        METRICS.increment(f"{self.metric_prefix}.received")
+
+        self.tracker.delivered(method.delivery_tag)
+        delivery = self.input.record(self.tracker, method.delivery_tag, body, properties)
+
+        if delivery is not None:
+            self.deliveries.append(delivery)
+
+    def consume(self) -> None:
+        """
+        Move deliveries to the work queue, servicing the connection in
+        between so heartbeats and acknowledgements are sent.
+        """
+        work_queue = self.input.work_queue
+
+        while not self.stop.is_set():
+            self.tracker.connection.process_data_events(time_limit=0.1 if self.deliveries else 1)
+
+            while self.deliveries and not self.stop.is_set():
+                try:
+                    work_queue.put(self.deliveries[0], timeout=0.1)
+                except Full:
+                    break
+
+                self.deliveries.popleft()
+
+    def close(self) -> None:
+        """
+        Close the current connection and drop its buffered deliveries. The
+        broker redelivers its unacknowledged messages.
+        """
+        self.deliveries.clear()
+
+        if self.tracker is None:
+            return
+
+        tracker, self.tracker = self.tracker, None
+        tracker.closed = True
+
+        try:
+            if tracker.connection.is_open:
+                tracker.connection.close()
+
+        except pika.exceptions.AMQPError as e:
+            LOGGER.debug("%s error closing connection", self.name, exc_info=e)
+
+    def run(self) -> None:
+        while not self.stop.is_set():
+            try:
+                self.tracker = self.input._connect(self.callback, self.metric_prefix)
+                LOGGER.info("%s READY", self.name)
+                self.consume()
+
+            except pika.exceptions.AMQPConnectionError as e:
+                # Log problem
+                LOGGER.error("%s connection lost, reconnecting", self.name, exc_info=e)
+
+            except Exception as e:
+                LOGGER.critical(e, exc_info=True)
+
+            finally:
+                # Closed before reconnecting, so a lost connection is not left open
+                self.close()
+
+            # Consuming only stops without an error when the input is stopped
+            if not self.stop.is_set():
+                METRICS.increment(f"{self.metric_prefix}.reconnects")
+                self.stop.wait(self.input.conf.reconnect_delay)
 
 
 class RabbitMQInput(Input):
+    """
+    Consumes file events from RabbitMQ queues.
+    """
 
     config_class = RabbitMQConf
 
+    consumers: list[RabbitMQConsumer] = []
+
+    @staticmethod
+    def decode_json(body: bytes) -> dict:
+        """
+        Decode a JSON message.
+
+        :param body: message body
+        """
+        return json_loads(body)
+
     @staticmethod
-    def decode_message(body: bytes) -> dict:
+    def decode_literal(body: bytes) -> dict:
         """
-        Takes the message and turns into a dictionary.
-        String message format when split on :
+        Decode a message which is a python dictionary literal.
+
+        :param body: message body
+        """
+        return ast.literal_eval(body.decode("utf-8"))
+
+    @staticmethod
+    def decode_colon(body: bytes) -> dict:
+        """
+        Decode a legacy message, which is split on ``:``.
             date_hour = split_line[0]
             min = split_line[1]
             sec = split_line[2]
@@ -235,44 +603,88 @@ class RabbitMQInput(Input):
             filesize = split_line[5]
             message = ":".join(split_line[6:])
 
-        :param body: Message body, either a json string or text
+        :param body: message body
+        """
+        split_line = body.decode("utf-8").strip().split(":")
+
+        return {
+            "datetime": ":".join(split_line[:3]),
+            "uri": split_line[3],
+            "action": split_line[4],
+            "filesize": split_line[5],
+            "message": ":".join(split_line[6:]),
+        }
 
+    def message_format(self, properties: pika.spec.BasicProperties | None) -> str | None:
         """
+        Format named by the message's content type or format header.
 
-        # Decode the byte string to utf-8
-        body = body.decode("utf-8")
+        :param properties: message properties
 
-        LOGGER.info("RabbitMQ message recieved: %s", body)
+        :return: format, or None to try each of the configured formats
 
-        try:
-            msg = json.loads(body)
+        :raises ValueError: if the header names a format which is not configured
+        """
+        if properties is None:
+            return None
+
+        if properties.content_type in CONTENT_TYPES:
+            return CONTENT_TYPES[properties.content_type]
+
+        if properties.headers and self.conf.format_header in properties.headers:
+            message_format = properties.headers[self.conf.format_header]
+
+            if message_format not in self.conf.message_formats:
+                raise ValueError(f"Message format not enabled: {message_format}")
+
+            return message_format
+
+        return None
 
-        except json.JSONDecodeError:
+    def decode_message(
+        self, body: bytes, properties: pika.spec.BasicProperties | None = None
+    ) -> dict:
+        """
+        Takes the message and turns into a dictionary. The format comes from
+        the message properties, otherwise each of the configured
+        ``message_formats`` is tried in turn.
+
+        :param body: message body
+        :param properties: message properties
+
+        :return: message
+        """
+        message_format = self.message_format(properties)
+        formats = [message_format] if message_format else self.conf.message_formats
+
+        for message_format in formats[:-1]:
             try:
-                msg = ast.literal_eval(body)
+                msg = getattr(self, f"decode_{message_format}")(body)
+                break
 
-            except (ValueError, SyntaxError):
-                # Assume the message is in the old format and split on :
-                split_line = body.strip().split(":")
+            except (ValueError, SyntaxError, IndexError):
+                continue
+
+        else:
+            message_format = formats[-1]
+            msg = getattr(self, f"decode_{message_format}")(body)
 
-                msg = {
-                    "datetime": ":".join(split_line[:3]),
-                    "uri": split_line[3],
-                    "action": split_line[4],
-                    "filesize": split_line[5],
-                    "message": ":".join(split_line[6:]),
-                }
+        METRICS.increment(f"rabbitmq.format.{message_format}")
 
         if "uri" not in msg:
             msg["uri"] = msg["filepath"]
 
         return msg
 
-    def _connect(self) -> pika.channel.Channel:
+    def _connect(self, callback: Callable, metric_prefix: str) -> AckTracker:
         """
-        Start Pika connection to server. This is run in each thread.
+        Start Pika connection to server and consume from the queues. This is
+        run in each consumer thread.
+
+        :param callback: message callback
+        :param metric_prefix: prefix for the consumer's metrics
 
-        :return: pika channel
+        :return: tracker for the deliveries on the new channel
         """
 
         # Create the credentials object
@@ -290,49 +702,61 @@ class RabbitMQInput(Input):
             )
         )
 
-        # Create a new channel
-        channel = connection.channel()
+        try:
+            # Create a new channel
+            channel = connection.channel()
 
-        channel.exchange_declare(
-            exchange=self.conf.exchange.name,
-            exchange_type=self.conf.exchange.type,
-            **self.conf.exchange.kwargs,
-        )
-        channel.basic_qos(prefetch_count=1)
+            channel.exchange_declare(
+                exchange=self.conf.exchange.name,
+                exchange_type=self.conf.exchange.type,
+                **self.conf.exchange.kwargs,
+            )
+            channel.basic_qos(prefetch_count=self.conf.prefetch_count)
 
-        # Declare queue and bind queue to the dest exchange
-        for queue in self.conf.queues:
-            channel.queue_declare(queue=queue.name, **queue.declare_kwargs)
+            tracker = AckTracker(connection, channel, metric_prefix)
 
-            channel.queue_bind(
-                exchange=self.conf.exchange.name, queue=queue.name, **queue.bind_kwargs
-            )
+            # Declare queue and bind queue to the dest exchange
+            for queue in self.conf.queues:
+                channel.queue_declare(queue=queue.name, **queue.declare_kwargs)
 
-            # Set callback
-            callback = functools.partial(self.callback, connection=connection)
-            channel.basic_consume(
-                queue=queue.name, on_message_callback=callback, **queue.consume_kwargs
-            )
+                channel.queue_bind(
+                    exchange=self.conf.exchange.name, queue=queue.name, **queue.bind_kwargs
+                )
+
+                # Set callback
+                channel.basic_consume(
+                    queue=queue.name, on_message_callback=callback, **queue.consume_kwargs
+                )
 
-        return channel
+        except Exception:
+            # Don't leave a half set up connection open when reconnecting
+            if connection.is_open:
+                connection.close()
+
+            raise
+
+        return tracker
 
     @staticmethod
-    def _acknowledge_message(channel: pika.channel.Channel, delivery_tag: str):
+    def _acknowledge_message(
+        channel: pika.channel.Channel, delivery_tag: int, multiple: bool = False
+    ):
         """
         Acknowledge message
 
         :param channel: Channel which message came from
         :param delivery_tag: Message id
+        :param multiple: also acknowledge every earlier message on the channel
         """
 
-        LOGGER.debug("Acknowledging message: %s", delivery_tag)
+        LOGGER.debug("Acknowledging message: %s multiple: %s", delivery_tag, multiple)
         if channel.is_open:
-            channel.basic_ack(delivery_tag)
+            channel.basic_ack(delivery_tag, multiple=multiple)
 
     def acknowledge_message(
         self,
         channel: pika.channel.Channel,
-        delivery_tag: str,
+        delivery_tag: int,
         connection: pika.connection.Connection,
     ):
         """
@@ -346,56 +770,192 @@ class RabbitMQInput(Input):
         cb = functools.partial(self._acknowledge_message, channel, delivery_tag)
         connection.add_callback_threadsafe(cb)
 
-    def callback(
+    def record(
         self,
-        ch: pika.channel.Channel,
-        method: pika.frame.Method,
-        properties: pika.frame.Header,
+        tracker: AckTracker,
+        delivery_tag: int,
         body: bytes,
-        connection: pika.connection.Connection,
-    ) -> None:
+        properties: pika.spec.BasicProperties | None = None,
+    ) -> Delivery | None:
+        """
+        Build the record for a delivery.
+
+        :param tracker: tracker for the delivery's channel
+        :param delivery_tag: delivery tag of the message
+        :param body: message body
+        :param properties: message properties
 
-        # Get message
+        :return: delivery, or None if the message is not compliant
+        """
+        received = next(self.received)
+
+        # Get message and extract uri
         try:
-            message = self.decode_message(body)
+            message = self.decode_message(body, properties)
+            output = {"uri": message["uri"]}
+
+            for extra_term in self.conf.extra_terms:
+                output[extra_term.output_key] = message[extra_term.key]
 
-        except IndexError:
+        except (ValueError, SyntaxError, IndexError, KeyError, TypeError):
             # Acknowledge message if the message is not compliant
-            LOGGER.error("Unable to decode input message: %s", body)
-            self.acknowledge_message(ch, method.delivery_tag, connection)
-            return
+            METRICS.increment("rabbitmq.invalid")
 
-        # Extract uri
-        output = {"uri": message["uri"]}
+            if received % self.conf.log_sample == 0 or LOGGER.isEnabledFor(logging.DEBUG):
+                LOGGER.error("Unable to decode input message: %s", body)
 
-        for extra_term in self.conf.extra_terms:
-            output[extra_term.output_key] = message[extra_term.key]
+            tracker.complete(delivery_tag)
+            return None
 
-        LOGGER.info("Input processing: %s message: %s", message["uri"], message)
+        action = message.get(self.conf.action_key)
+        if action in self.conf.delete_actions and self.conf.delete_recipe_path:
+            output["recipe_path"] = self.conf.delete_recipe_path
 
-        yield output
-        self.acknowledge_message(ch, method.delivery_tag, connection)
+        if received % self.conf.log_sample == 0:
+            LOGGER.info("Input processing: %s message: %s", message["uri"], message)
+        else:
+            LOGGER.debug("Input processing: %s message: %s", message["uri"], message)
 
-    def run(self):
+        return Delivery(output, action, [(tracker, delivery_tag)], time.monotonic())
+
+    def processed(self, body: dict) -> None:
+        for tracker, delivery_tag in self.in_flight.pop(id(body), []):
+            tracker.complete(delivery_tag)
+
+    def flushed(self) -> None:
+        for tracker in self.trackers():
+            tracker.flush()
+
+            # A full window is acknowledged whatever its size, or no more messages arrive
+            full = tracker.unacknowledged >= self.conf.prefetch_count
+            tracker.acknowledge(1 if full else self.conf.ack_batch_size)
+
+    def flush_due(self) -> bool:
+        """
+        The broker has filled a prefetch window and every delivery in it has
+        been processed, so no more messages arrive until it is acknowledged.
+        """
+        return any(
+            tracker.unacknowledged >= self.conf.prefetch_count and not tracker.unprocessed
+            for tracker in self.trackers()
+        )
+
+    def trackers(self) -> list[AckTracker]:
+        """
+        Trackers for the consumers' current connections.
+        """
+        return [tracker for consumer in self.consumers if (tracker := consumer.tracker)]
+
+    def request_flush(self) -> None:
+        """
+        Ask the generator to flush the outputs, then acknowledge everything
+        which was flushed.
+        """
+        if not any(tracker.unacknowledged for tracker in self.trackers()):
+            return
+
+        if self.flush_outputs:
+            self.flush_outputs()
+
+        for tracker in self.trackers():
+            tracker.flush()
+            tracker.acknowledge()
+
+    def coalesce(self) -> Iterator[Delivery | None]:
+        """
+        Read deliveries from the work queue. Within ``coalesce_window``
+        seconds of the first event for a uri, later events replace it and
+        their acknowledgements are merged. Delete actions are passed on
+        straight away, replacing any pending event.
+
+        :return: deliveries, or None when the work queue is idle
+        """
+        window = self.conf.coalesce_window
+        pending = {}
 
         while True:
-            channel = self._connect()
+            timeout = self.conf.flush_interval
+            if pending:
+                first = next(iter(pending.values()))
+                timeout = min(timeout, max(0.0, first.received + window - time.monotonic()))
 
             try:
-                LOGGER.info("READY")
-                yield from channel.start_consuming()
+                delivery = self.work_queue.get(timeout=timeout)
 
-            except KeyboardInterrupt:
-                channel.stop_consuming()
-                break
+            except Empty:
+                delivery = None
 
-            except pika.exceptions.StreamLostError as e:
-                # Log problem
-                LOGGER.error("Connection lost, reconnecting", exc_info=e)
+            if delivery and not window:
+                yield delivery
                 continue
 
-            except Exception as e:
-                LOGGER.critical(e, exc_info=True)
+            if delivery:
+                uri = delivery.record["uri"]
 
-                channel.stop_consuming()
-                break
+                if uri in pending:
+                    METRICS.increment("rabbitmq.coalesced")
+                    previous = pending[uri]
+                    delivery = delivery._replace(
+                        acks=previous.acks + delivery.acks, received=previous.received
+                    )
+
+                if delivery.action in self.conf.delete_actions:
+                    pending.pop(uri, None)
+                    yield delivery
+
+                else:
+                    # Replacing a key keeps its place, so pending stays in window order
+                    pending[uri] = delivery
+
+            now = time.monotonic()
+            expired = []
+            for uri, pending_delivery in pending.items():
+                if pending_delivery.received + window > now:
+                    break
+
+                expired.append(uri)
+
+            for uri in expired:
+                yield pending.pop(uri)
+
+            if delivery is None and not expired:
+                yield None
+
+    def run(self):
+        self.in_flight = {}
+        self.received = itertools.count(1)
+        self.work_queue = Queue(
+            maxsize=self.conf.work_queue_size or self.conf.consumers * self.conf.prefetch_count
+        )
+        self.consumers = [RabbitMQConsumer(self, number) for number in range(self.conf.consumers)]
+
+        for consumer in self.consumers:
+            consumer.start()
+
+        try:
+            for delivery in self.coalesce():
+                if delivery is None:
+                    self.request_flush()
+                    continue
+
+                # Messages from a lost connection are redelivered on the new one
+                acks = [(tracker, tag) for tracker, tag in delivery.acks if not tracker.closed]
+                if not acks:
+                    continue
+
+                self.in_flight[id(delivery.record)] = acks
+                yield delivery.record
+
+                # The broker waits for acknowledgements once the prefetch window is full
+                if self.work_queue.empty() and any(
+                    tracker.unacknowledged >= self.conf.prefetch_count
+                    for tracker in self.trackers()
+                ):
+                    self.request_flush()
+
+        finally:
+            for consumer in self.consumers:
+                consumer.stop.set()
+
+            for consumer in self.consumers:
+                consumer.join()
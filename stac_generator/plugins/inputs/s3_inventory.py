@@ -0,0 +1,277 @@
+# encoding: utf-8
+"""
+S3 Inventory Input
+------------------
+
+Reads an `S3 Inventory <https://docs.aws.amazon.com/AmazonS3/latest/userguide/storage-inventory.html>`_
+report from local copies of its ``manifest.json`` and data files, submitting
+each object to the generator. This avoids paging through the bucket listing.
+
+Records have the same shape as the :ref:`object store input <stac_generator/inputs:Object Store Input>`.
+``CSV`` reports are read with the standard library, ``Parquet`` reports
+require `pyarrow <https://arrow.apache.org/docs/python/>`_.
+
+**Plugin name:** ``s3_inventory``
+
+.. list-table::
+    :header-rows: 1
+
+    * - Option
+      - Value Type
+      - Description
+    * - ``manifest``
+      - ``string``
+      - ``REQUIRED`` Path to the ``manifest.json`` of the report
+    * - ``url``
+      - ``string``
+      - ``REQUIRED`` URL of the S3 endpoint, used to build the record ``uri``
+    * - ``data_root``
+      - ``string``
+      - Local directory the data file keys in the manifest are relative to.
+        By default the files are expected in the ``data`` directory of the
+        inventory configuration, alongside the manifest's directory
+    * - ``prefix``
+      - ``string``
+      - Only objects with this prefix are emitted
+    * - ``suffixes``
+      - ``list``
+      - Only objects with one of these suffixes are emitted
+    * - ``threads``
+      - ``int``
+      - Number of data files read concurrently. Default: ``1``
+    * - ``client_name``
+      - ``string``
+      - Name of a registered client to reference in the records, such as
+        the ``client_name`` of an ``object_store`` input
+
+Example Configuration:
+    .. code-block:: yaml
+
+        inputs:
+            - method: s3_inventory
+              manifest: /inventory/my_bucket/all-objects/2024-01-01T01-00Z/manifest.json
+              url: https://cedadev-o.s3-ext.jc.rl.ac.uk
+              prefix: CMIP6/
+              suffixes:
+                - .nc
+              threads: 8
+
+"""
+__author__ = "Rhys Evans"
+__date__ = "19 Oct 2026"
+__copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+__contact__ = "rhys.r.evans@stfc.ac.uk"
+
+import csv
+import gzip
+import json
+import logging
+import os
+from collections.abc import Iterator
+from datetime import datetime
+from urllib.parse import unquote
+
+from pydantic import BaseModel, Field
+
+# Package imports
+from stac_generator.core.clients import ClientReference
+from stac_generator.core.concurrency import merge_iterators
+from stac_generator.core.input import Input
+
+LOGGER = logging.getLogger(__name__)
+
+# Parquet reports use snake case names for the CSV schema fields
+PARQUET_COLUMNS = {
+    "Bucket": "bucket",
+    "Key": "key",
+    "Size": "size",
+    "LastModifiedDate": "last_modified_date",
+    "ETag": "e_tag",
+}
+
+
+class S3InventoryConf(BaseModel):
+    """S3 Inventory config."""
+
+    manifest: str = Field(
+        description="Path to the inventory manifest.json.",
+    )
+    url: str = Field(
+        description="URL of the S3 endpoint.",
+    )
+    data_root: str | None = Field(
+        default=None,
+        description="Directory the data file keys are relative to.",
+    )
+    prefix: str = Field(
+        default="",
+        description="Prefix of objects to emit.",
+    )
+    suffixes: list[str] = Field(
+        default=[],
+        description="Suffixes of objects to emit.",
+    )
+    threads: int = Field(
+        default=1,
+        description="Number of data files read concurrently.",
+    )
+    client_name: str | None = Field(
+        default=None,
+        description="Name of a registered client to reference.",
+    )
+
+
+class S3InventoryInput(Input):
+    """
+    Streams the objects listed in an S3 Inventory report.
+    """
+
+    config_class = S3InventoryConf
+
+    def data_path(self, key: str) -> str:
+        """
+        Local path of an inventory data file.
+
+        :param key: key of the data file in the manifest
+        """
+        if self.conf.data_root:
+            return os.path.join(self.conf.data_root, key)
+
+        manifest_dir = os.path.dirname(os.path.abspath(self.conf.manifest))
+
+        return os.path.join(os.path.dirname(manifest_dir), "data", os.path.basename(key))
+
+    def keep(self, key: str) -> bool:
+        """
+        Check an object key against the prefix and suffix filters.
+
+        :param key: object key
+        """
+        return key.startswith(self.conf.prefix) and (
+            not self.conf.suffixes or key.endswith(tuple(self.conf.suffixes))
+        )
+
+    def record(self, bucket: str, key: str, size, last_modified, etag: str | None) -> dict:
+        """
+        Build a record in the same shape as the object store input.
+
+        :param bucket: bucket name
+        :param key: object key
+        :param size: object size
+        :param last_modified: last modified date
+        :param etag: object ETag
+        """
+        if isinstance(last_modified, datetime):
+            last_modified = last_modified.isoformat()
+
+        output = {
+            "uri": f"{self.conf.url}/{bucket}/{key}",
+            "size": int(size) if size not in (None, "") else None,
+            "last_modified": last_modified or None,
+            "Etag": etag.strip('"') if etag else None,
+        }
+
+        if self.conf.client_name:
+            output["client"] = ClientReference(self.conf.client_name)
+
+        return output
+
+    def read_csv(self, path: str, schema: list[str]) -> Iterator[dict]:
+        """
+        Read a gzipped CSV inventory data file.
+
+        :param path: local path of the data file
+        :param schema: column names from the manifest
+
+        :return: records
+        """
+        columns = {name: schema.index(name) for name in PARQUET_COLUMNS if name in schema}
+
+        def column(row: list, name: str):
+            return row[columns[name]] if name in columns else None
+
+        with gzip.open(path, "rt", encoding="utf-8", newline="") as reader:
+            for row in csv.reader(reader):
+                # Keys in CSV reports are URL encoded
+                key = unquote(row[columns["Key"]])
+
+                if not self.keep(key):
+                    continue
+
+                yield self.record(
+                    row[columns["Bucket"]],
+                    key,
+                    column(row, "Size"),
+                    column(row, "LastModifiedDate"),
+                    column(row, "ETag"),
+                )
+
+    def read_parquet(self, path: str) -> Iterator[dict]:
+        """
+        Read a Parquet inventory data file by record batch.
+
+        :param path: local path of the data file
+
+        :return: records
+        """
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(path)
+        columns = [
+            column for column in PARQUET_COLUMNS.values() if column in parquet_file.schema.names
+        ]
+
+        for batch in parquet_file.iter_batches(columns=columns):
+            batch = batch.to_pydict()
+            empty = [None] * len(batch["key"])
+
+            for bucket, key, size, last_modified, etag in zip(
+                batch["bucket"],
+                batch["key"],
+                batch.get("size", empty),
+                batch.get("last_modified_date", empty),
+                batch.get("e_tag", empty),
+            ):
+                if self.keep(key):
+                    yield self.record(bucket, key, size, last_modified, etag)
+
+    def run(self):
+        start = datetime.now()
+        total_generated = 0
+
+        with open(self.conf.manifest, "r", encoding="utf-8") as reader:
+            manifest = json.load(reader)
+
+        file_format = manifest["fileFormat"].lower()
+        paths = [self.data_path(data_file["key"]) for data_file in manifest["files"]]
+
+        LOGGER.info(
+            "Reading %s %s inventory files for %s",
+            len(paths),
+            manifest["fileFormat"],
+            manifest.get("sourceBucket"),
+        )
+
+        if file_format == "csv":
+            schema = [name.strip() for name in manifest["fileSchema"].split(",")]
+            readers = (self.read_csv(path, schema) for path in paths)
+
+        elif file_format == "parquet":
+            readers = (self.read_parquet(path) for path in paths)
+
+        else:
+            raise ValueError(f"Unsupported inventory format: {manifest['fileFormat']}")
+
+        if self.conf.threads > 1:
+            records = merge_iterators(readers, workers=self.conf.threads)
+
+        else:
+            records = (record for reader in readers for record in reader)
+
+        for record in records:
+            yield record
+            total_generated += 1
+
+        end = datetime.now()
+        print(f"Processed {total_generated} inventory records in {end-start}")
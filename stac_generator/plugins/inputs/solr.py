@@ -5,6 +5,18 @@ Solr Input
 Uses a Solr index node for a source for file
 objects.
 
+Pages are read with a cursor over a keep-alive session. The next page is
+fetched on a background thread while the current one is processed, with
+at most ``prefetch`` pages held in memory. Only the ``id`` and the fields
+named in ``extra_terms`` are requested, unless ``params.fl`` is set.
+
+Large cores can be split into partitions with ``partition_queries`` or
+``hash_partitions``, each read with its own cursor concurrently. The
+partitions must not overlap, or documents are emitted more than once. With
+a ``cursor_file`` the cursor of each partition is saved once its page has
+been processed. Finished partitions are skipped on restart, so remove the
+file to harvest again from the start.
+
 **Plugin name:** ``solr``
 
 .. list-table::
@@ -13,12 +25,40 @@ objects.
     * - Option
       - Value Type
       - Description
-    * - ``index_node``
+    * - ``url``
       - string
-      - ``REQUIRED`` Solr index
-    * - ``search_params``
+      - ``REQUIRED`` URL of the Solr select endpoint
+    * - ``params``
       - dict
       - request params to send to Solr
+    * - ``extra_terms``
+      - list
+      - Fields of the Solr documents to add to the records
+    * - ``prefetch``
+      - int
+      - Number of pages fetched ahead of processing. Default: ``2``
+    * - ``timeout``
+      - int
+      - Request timeout in seconds. Default: ``60``
+    * - ``partition_queries``
+      - list
+      - Filter queries splitting the results into disjoint partitions, such
+        as ``data_node:esgf.ceda.ac.uk``, which are harvested concurrently
+    * - ``hash_partitions``
+      - int
+      - Split the results into this many partitions by a hash of
+        ``hash_key`` instead. Default: ``0``
+    * - ``hash_key``
+      - string
+      - Field hashed for ``hash_partitions``. Default: ``id``
+    * - ``threads``
+      - int
+      - Number of partitions harvested concurrently. Default: the number
+        of partitions
+    * - ``cursor_file``
+      - string
+      - JSON file the cursor mark of each partition is saved to, so an
+        interrupted harvest restarts where it stopped
 
 
 Example Configuration:
@@ -26,10 +66,13 @@ Example Configuration:
 
         inputs:
             - method: solr
-              index_node: url.index-node.ac.uk
-              search_params:
+              url: https://url.index-node.ac.uk/solr/files/select
+              params:
                 q: "facet: value"
                 rows: 10000
+              extra_terms:
+                - key: size
+                  output_key: size
 """
 
 __author__ = "Mahir Rahman"
@@ -38,15 +81,18 @@ __copyright__ = "Copyright 2022 United Kingdom Research and Innovation"
 __license__ = "BSD - see LICENSE file in top-level package directory"
 __contact__ = "kazi.mahir@stfc.ac.uk"
 
+import json
 import logging
-import sys
+import os
 
 import requests
 from extraction_methods.core.types import KeyOutputKey
 from pydantic import BaseModel, Field
 
 # Package imports
+from stac_generator.core.concurrency import merge_iterators
 from stac_generator.core.input import Input
+from stac_generator.core.metrics import METRICS
 
 LOGGER = logging.getLogger(__name__)
 
@@ -78,6 +124,10 @@ class SolarParams(BaseModel):
         default="*",
         description="cursor mark.",
     )
+    fl: str | None = Field(
+        default=None,
+        description="Fields to return. Default: the id and extra terms.",
+    )
 
 
 class SolrConf(BaseModel):
@@ -93,39 +143,179 @@ class SolrConf(BaseModel):
         default=[],
         description="List of extra attributes.",
     )
+    prefetch: int = Field(
+        default=2,
+        description="Number of pages fetched ahead of processing.",
+    )
+    timeout: int = Field(
+        default=60,
+        description="Request timeout in seconds.",
+    )
+    partition_queries: list[str] = Field(
+        default=[],
+        description="Filter queries for disjoint partitions harvested concurrently.",
+    )
+    hash_partitions: int = Field(
+        default=0,
+        description="Number of hash partitions harvested concurrently.",
+    )
+    hash_key: str = Field(
+        default="id",
+        description="Field hashed to split the hash partitions.",
+    )
+    threads: int | None = Field(
+        default=None,
+        description="Number of partitions harvested concurrently.",
+    )
+    cursor_file: str | None = Field(
+        default=None,
+        description="File the partition cursor marks are saved to for restart.",
+    )
 
 
 class SolrInput(Input):
 
     config_class = SolrConf
 
+    def request_params(self) -> dict:
+        """
+        Solr request params, limiting the returned fields to those used.
+        """
+        params = self.conf.params.model_dump()
+
+        if params["fl"] is None:
+            params["fl"] = ",".join(
+                dict.fromkeys(["id"] + [term.key for term in self.conf.extra_terms])
+            )
+
+        return params
+
+    def partitions(self) -> list[str | None]:
+        """
+        Filter queries splitting the results into disjoint partitions.
+
+        :return: filter query for each partition, None for the whole query
+        """
+        if self.conf.partition_queries:
+            return self.conf.partition_queries
+
+        if self.conf.hash_partitions > 1:
+            return [
+                f"{{!hash workers={self.conf.hash_partitions} worker={worker} "
+                f"keys={self.conf.hash_key}}}"
+                for worker in range(self.conf.hash_partitions)
+            ]
+
+        return [None]
+
+    def load_cursors(self) -> dict:
+        """
+        Cursor marks saved by a previous harvest. Finished partitions have a
+        cursor of None.
+        """
+        if not self.conf.cursor_file or not os.path.exists(self.conf.cursor_file):
+            return {}
+
+        with open(self.conf.cursor_file, "r", encoding="utf-8") as reader:
+            return json.load(reader)
+
+    def save_cursors(self, cursors: dict) -> None:
+        """
+        Save the cursor marks of the partitions, replacing the file atomically.
+
+        :param cursors: cursor mark for each partition
+        """
+        tmp_path = f"{self.conf.cursor_file}.tmp"
+
+        with open(tmp_path, "w", encoding="utf-8") as writer:
+            json.dump(cursors, writer, indent=2)
+
+        os.replace(tmp_path, self.conf.cursor_file)
+
+    def pages(self, params: dict, partition: str | None, cursor: str):
+        """
+        Iterate through the pages of a partition of the Solr response with a cursor.
+
+        :param params: request params
+        :param partition: filter query for the partition
+        :param cursor: cursor mark to start from
+
+        :return: partition, documents in the page and cursor mark of the next page,
+            which is None once the partition is finished
+        """
+        params = params | {"cursorMark": cursor}
+        if partition is not None:
+            params["fq"] = partition
+
+        n = 0
+        with requests.Session() as session:
+            while True:
+                try:
+                    resp = session.get(self.conf.url, params=params, timeout=self.conf.timeout)
+                    resp.raise_for_status()
+                except requests.exceptions.ConnectionError as e:
+                    LOGGER.error("Failed to establish connection to %s:\n%s", self.conf.url, e)
+                    raise
+
+                resp = resp.json()
+                docs = resp["response"]["docs"]
+                METRICS.increment("solr.pages")
+
+                n += len(docs)
+                LOGGER.info("%s: %s/%s\n", partition or "*", n, resp["response"]["numFound"])
+
+                # The cursor stops moving at the end of the results
+                if not docs or resp["nextCursorMark"] == params["cursorMark"]:
+                    yield partition, docs, None
+                    break
+
+                # Return the list of files to the for loop and continue paginating
+                yield partition, docs, resp["nextCursorMark"]
+
+                LOGGER.info("Next cursormark at position %s", n)
+
+                # Change the search params to get next page.
+                params["cursorMark"] = resp["nextCursorMark"]
+
     def iter_docs(self):
         """
         Core loop to iterate through the Solr response.
         """
-        n = 0
-        while True:
-            try:
-                resp = requests.get(self.conf.url, self.conf.params.dict())
-            except requests.exceptions.ConnectionError as e:
-                LOGGER.error("Failed to establish connection to %s:\n%s", self.conf.url, e)
-                sys.exit(1)
+        params = self.request_params()
+        cursors = self.load_cursors()
 
-            resp = resp.json()
-            docs = resp["response"]["docs"]
+        partitions = [
+            partition
+            for partition in self.partitions()
+            if cursors.get(partition or "*", params["cursorMark"]) is not None
+        ]
 
-            # Return the list of files to the for loop and continue paginating
-            yield from docs
+        if not partitions:
+            LOGGER.info("All partitions in %s are finished", self.conf.cursor_file)
+            return
+
+        pages = (
+            self.pages(params, partition, cursors.get(partition or "*", params["cursorMark"]))
+            for partition in partitions
+        )
 
-            n += len(docs)
-            LOGGER.info("%s/%s\n", n, resp["response"]["numFound"])
-            if not docs:
-                LOGGER.error("no docs found")
-                break
-            LOGGER.info("Next cursormark at position %s", n)
+        threads = self.conf.threads or len(partitions)
+        if threads > 1 or self.conf.prefetch > 0:
+            pages = merge_iterators(
+                pages, workers=threads, max_size=max(self.conf.prefetch, threads)
+            )
+
+        else:
+            pages = (page for partition_pages in pages for page in partition_pages)
+
+        for partition, docs, cursor in pages:
+            yield from docs
 
-            # Change the search params to get next page.
-            self.conf.params.cursorMark = resp["nextCursorMark"]
+            # Only saved once the page has been consumed, so a restart
+            # repeats rather than skips documents
+            if self.conf.cursor_file:
+                cursors[partition or "*"] = cursor
+                self.save_cursors(cursors)
 
     def run(self):
         for doc in self.iter_docs():
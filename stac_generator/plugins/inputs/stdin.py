@@ -0,0 +1,150 @@
+# encoding: utf-8
+"""
+Standard In Input
+-----------------
+
+Reads newline delimited records from standard in, so the generator can be
+used as a filter in a shell pipeline. Each line is either a uri or a JSON
+document. Standard in is read in large blocks and split into lines, rather
+than line by line.
+
+A listing can be sharded across several generators with standard tools:
+
+.. code-block:: bash
+
+    find /badc/cmip6 -name '*.nc' | parallel --pipe -j 8 stac_generator conf.yaml
+
+**Plugin name:** ``stdin``
+
+.. list-table::
+    :header-rows: 1
+
+    * - Option
+      - Value Type
+      - Description
+    * - ``format``
+      - ``string``
+      - ``uri``, ``json`` or ``auto`` to treat lines starting with ``{`` as
+        JSON and others as uris. Default: ``auto``
+    * - ``uri_term``
+      - ``string``
+      - Key of the uri in JSON lines. Default: ``uri``
+    * - ``extra_terms``
+      - ``list``
+      - Keys of JSON lines to add to the records
+    * - ``buffer_size``
+      - ``int``
+      - Maximum number of bytes read at a time. Default: ``1048576``
+
+Example Configuration:
+    .. code-block:: yaml
+
+        inputs:
+            - method: stdin
+              format: uri
+
+"""
+__author__ = "Richard Smith"
+__date__ = "19 Oct 2026"
+__copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+__contact__ = "richard.d.smith@stfc.ac.uk"
+
+import logging
+import sys
+from collections.abc import Iterator
+from datetime import datetime
+from typing import BinaryIO, Literal
+
+from extraction_methods.core.types import KeyOutputKey
+from pydantic import BaseModel, Field
+
+from stac_generator.core.input import Input
+from stac_generator.core.utils import json_loads
+
+LOGGER = logging.getLogger(__name__)
+
+
+class StdinConf(BaseModel):
+    """Standard in config."""
+
+    format: Literal["auto", "uri", "json"] = Field(
+        default="auto",
+        description="Format of the lines.",
+    )
+    uri_term: str = Field(
+        default="uri",
+        description="Attribute to use as uri in JSON lines.",
+    )
+    extra_terms: list[KeyOutputKey] = Field(
+        default=[],
+        description="List of extra attributes of JSON lines.",
+    )
+    buffer_size: int = Field(
+        default=1024 * 1024,
+        description="Maximum number of bytes read at a time.",
+    )
+
+
+class StdinInput(Input):
+    """
+    Streams newline delimited uris or JSON documents from standard in.
+    """
+
+    config_class = StdinConf
+
+    def lines(self, reader: BinaryIO) -> Iterator[bytes]:
+        """
+        Split a stream into lines, reading whatever is available up to
+        ``buffer_size`` bytes at a time.
+
+        :param reader: binary stream
+
+        :return: lines without the line endings
+        """
+        read = getattr(reader, "read1", reader.read)
+        remainder = b""
+
+        while block := read(self.conf.buffer_size):
+            lines = (remainder + block).split(b"\n")
+            remainder = lines.pop()
+
+            yield from lines
+
+        if remainder:
+            yield remainder
+
+    def record(self, line: bytes) -> dict:
+        """
+        Build a record from a line.
+
+        :param line: uri or JSON document
+
+        :return: record
+        """
+        if self.conf.format == "uri" or (self.conf.format == "auto" and line[:1] != b"{"):
+            return {"uri": line.decode("utf-8")}
+
+        data = json_loads(line)
+        output = {"uri": data[self.conf.uri_term]}
+
+        for extra_term in self.conf.extra_terms:
+            output[extra_term.output_key] = data[extra_term.key]
+
+        return output
+
+    def run(self):
+        start = datetime.now()
+        total_generated = 0
+
+        for line in self.lines(sys.stdin.buffer):
+            line = line.strip()
+
+            if not line:
+                continue
+
+            yield self.record(line)
+            total_generated += 1
+
+        end = datetime.now()
+        LOGGER.info("Processed %s standard in records in %s", total_generated, end - start)
@@ -5,6 +5,16 @@ Text File
 Takes file or directory path, uses the dictionary
 in the file(s) to pass into the extractor.
 
+Each line of the file(s) is a JSON document. Files are split into chunks of
+``chunk_size`` bytes which are read concurrently on ``threads`` threads, so
+records from different chunks are interleaved.
+
+Records with a uri which has already been seen are dropped. By default the
+uris are remembered as 8 byte hashes, see :py:mod:`stac_generator.core.dedupe`.
+For very large listings ``dedupe: bloom`` bounds the memory used instead,
+dropping around ``bloom_error_rate`` of the unique uris once
+``bloom_capacity`` uris have been read.
+
 **Plugin name:** ``text_file``
 
 .. list-table::
@@ -13,29 +23,55 @@ in the file(s) to pass into the extractor.
     * - Option
       - Value Type
       - Description
-    * - ``filepath``
+    * - ``path``
       - ``string``
       - ``REQUIRED`` the path to input file(s)
+    * - ``uri_term``
+      - ``string``
+      - Key of the uri in the documents. Default: ``uri``
+    * - ``extra_terms``
+      - ``list``
+      - Keys of the documents to add to the records
+    * - ``threads``
+      - ``int``
+      - Number of chunks read concurrently. Default: ``1``
+    * - ``chunk_size``
+      - ``int``
+      - Size of the chunks in bytes. Default: ``67108864``
+    * - ``dedupe``
+      - ``string``
+      - ``exact``, ``bloom`` or ``none``. Default: ``exact``
+    * - ``bloom_capacity``
+      - ``int``
+      - Expected number of unique uris for ``bloom``. Default: ``100000000``
+    * - ``bloom_error_rate``
+      - ``float``
+      - Fraction of unique uris dropped at capacity for ``bloom``. Default: ``0.001``
 
 Example Configuration:
     .. code-block:: yaml
 
         inputs:
             - method: text_file
-              filepath: input_file(s)_location
+              path: input_file(s)_location
+              threads: 8
 
 """
 
-import json
-import traceback
+import os
+from collections.abc import Iterator
 from datetime import datetime
 from os import listdir
 from os.path import isdir, isfile, join
+from typing import Literal
 
 from extraction_methods.core.types import KeyOutputKey
 from pydantic import BaseModel, Field
 
+from stac_generator.core.concurrency import merge_iterators
+from stac_generator.core.dedupe import BloomFilter, HashSet
 from stac_generator.core.input import Input
+from stac_generator.core.utils import json_loads
 
 
 class TextFileConf(BaseModel):
@@ -52,6 +88,26 @@ class TextFileConf(BaseModel):
         default=[],
         description="List of extra attributes.",
     )
+    threads: int = Field(
+        default=1,
+        description="Number of chunks read concurrently.",
+    )
+    chunk_size: int = Field(
+        default=64 * 1024 * 1024,
+        description="Size of the chunks in bytes.",
+    )
+    dedupe: Literal["exact", "bloom", "none"] = Field(
+        default="exact",
+        description="How uris which have already been seen are dropped.",
+    )
+    bloom_capacity: int = Field(
+        default=100_000_000,
+        description="Expected number of unique uris for the bloom filter.",
+    )
+    bloom_error_rate: float = Field(
+        default=0.001,
+        description="False positive rate of the bloom filter.",
+    )
 
 
 class TextFileInput(Input):
@@ -62,6 +118,59 @@ class TextFileInput(Input):
 
     config_class = TextFileConf
 
+    def chunks(self, file_list: list[str]) -> list[tuple[str, int, int]]:
+        """
+        Split the files into byte ranges.
+
+        :param file_list: paths of the files
+
+        :return: path, start and end of each chunk
+        """
+        chunks = []
+        for file in file_list:
+            size = os.path.getsize(file)
+
+            for start in range(0, max(size, 1), self.conf.chunk_size):
+                chunks.append((file, start, min(start + self.conf.chunk_size, size)))
+
+        return chunks
+
+    def read_chunk(self, file: str, start: int, end: int) -> Iterator[dict]:
+        """
+        Read the records of the lines starting in a chunk.
+
+        :param file: path of the file
+        :param start: first byte of the chunk
+        :param end: byte after the chunk
+
+        :return: records
+        """
+        with open(file, "rb") as f:
+            position = start
+
+            # The line running into the chunk belongs to the previous one
+            if start > 0:
+                f.seek(start - 1)
+                position += len(f.readline()) - 1
+
+            while position < end:
+                line = f.readline()
+                if not line:
+                    break
+
+                position += len(line)
+
+                if not line.strip():
+                    continue
+
+                data = json_loads(line)
+                output = {"uri": data[self.conf.uri_term]}
+
+                for extra_term in self.conf.extra_terms:
+                    output[extra_term.output_key] = data[extra_term.key]
+
+                yield output
+
     def run(self):
 
         if isdir(self.conf.path):
@@ -76,24 +185,26 @@ class TextFileInput(Input):
 
         start = datetime.now()
         total_generated = 0
-        unique_lines = set()
 
-        for file in file_list:
-            with (
-                open(file, "r", encoding="utf-8") as f,
-            ):
-                for line in f:
-                    if line not in unique_lines:
-                        unique_lines.add(line)
+        if self.conf.dedupe == "bloom":
+            seen = BloomFilter(self.conf.bloom_capacity, self.conf.bloom_error_rate)
+        elif self.conf.dedupe == "exact":
+            seen = HashSet()
+        else:
+            seen = None
+
+        readers = (self.read_chunk(*chunk) for chunk in self.chunks(file_list))
 
-                        data = json.loads(line)
-                        output = {"uri": data[self.conf.uri_term]}
+        if self.conf.threads > 1:
+            records = merge_iterators(readers, workers=self.conf.threads)
 
-                        for extra_term in self.conf.extra_terms:
-                            output[extra_term.output_key] = data[extra_term.key]
+        else:
+            records = (record for reader in readers for record in reader)
 
-                        yield output
-                        total_generated += 1
+        for output in records:
+            if seen is None or seen.add(output["uri"]):
+                yield output
+                total_generated += 1
 
         end = datetime.now()
-        print(f"Processed {total_generated} elasticsearch records in {end-start}")
+        print(f"Processed {total_generated} text file records in {end-start}")
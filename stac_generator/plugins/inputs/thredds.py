@@ -14,18 +14,43 @@ as a source.
     * - Option
       - Value Type
       - Description
-    * - ``uri``
+    * - ``url``
       - ``string``
-      - ``REQUIRED`` The URL to a Thredds Data Server.
-    * - ``object_path_attr``
+      - ``REQUIRED`` The URL of a catalog on a Thredds Data Server.
+    * - ``uri_term``
       - ``string``
-      - ``REQUIRED`` The column header which contains the URI to
-        the file object.
-    * - ``catalog_kwargs``
-      - ``dict``
-      - Optional kwargs to pass to
-        `siphon.catalog.TDSCatalog
-        <https://unidata.github.io/siphon/latest/api/catalog.html#siphon.catalog.TDSCatalog>`_
+      - ``REQUIRED`` Attribute of the
+        `siphon.catalog.Dataset <https://unidata.github.io/siphon/latest/api/catalog.html#siphon.catalog.Dataset>`_
+        to use as the uri, such as ``access_urls.OPENDAP``
+    * - ``extra_terms``
+      - ``list``
+      - Extra dataset attributes to add to the records
+    * - ``depth``
+      - ``int``
+      - Maximum depth of catalog references to follow. Default: ``1000``
+    * - ``threads``
+      - ``int``
+      - Number of catalogs fetched concurrently. Default: ``1``
+    * - ``cache_path``
+      - ``string``
+      - Directory to cache catalog XML in. Cached catalogs are revalidated
+        with their ``ETag`` or ``Last-Modified`` header, so a re-crawl only
+        downloads the catalogs which have changed
+    * - ``streaming``
+      - ``bool``
+      - Parse catalogs incrementally, emitting each dataset as soon as it is
+        read. Use for very large catalogs. Default: ``False``
+
+Streamed datasets have the ``name``, ``id``, ``url_path`` and
+``access_urls`` attributes of a siphon dataset. Each is freed once its
+record is emitted, so memory stays flat however many datasets a catalog
+lists. ``latest.xml`` resolver datasets are not resolved when streaming.
+With a ``cache_path``, each catalog is written to the cache as it downloads
+and parsed from the cache file, so it is never held in memory either.
+
+Catalogs are fetched over one keep-alive session, and the datasets of each
+catalog are emitted as soon as it arrives, so the order of records across
+catalogs is not fixed when ``threads`` is more than ``1``.
 
 
 Example Configuration with OPENDAP:
@@ -33,16 +58,18 @@ Example Configuration with OPENDAP:
 
         inputs:
             - method: thredds
-              uri: test-url
-              object_path_attr: access_urls.OPENDAP
+              url: https://data.ceda.ac.uk/thredds/catalog.xml
+              uri_term: access_urls.OPENDAP
+              threads: 8
+              cache_path: /tmp/thredds-cache
 
 Example Configuration with NCML:
     .. code-block:: yaml
 
         inputs:
             - name: thredds
-              uri: test-url
-              object_path_attr: access_urls.NCML
+              url: https://data.ceda.ac.uk/thredds/catalog.xml
+              uri_term: access_urls.NCML
 
 """
 __author__ = "Mathieu Provencher"
@@ -51,20 +78,33 @@ __copyright__ = "Copyright 2021 Computer Research Institute of Montreal"
 __license__ = "BSD - see LICENSE file in top-level package directory"
 __contact__ = "mathieu.provencher@crim.ca"
 
+import hashlib
+import json
 import logging
+import os
+import threading
 
 # Python imports
-from collections.abc import Iterator
+from collections import deque
+from collections.abc import Callable, Iterator
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime
+from queue import Empty, Full, Queue
+from typing import Any, BinaryIO
+from urllib.parse import urljoin, urlparse
+from xml.etree.ElementTree import iterparse
 
+import requests
 from extraction_methods.core.types import KeyOutputKey
 from pydantic import BaseModel, Field
+from requests.adapters import HTTPAdapter
 
 # Thirdparty imports
 from siphon.catalog import CaseInsensitiveDict, TDSCatalog
 
 # Package imports
 from stac_generator.core.input import Input
+from stac_generator.core.metrics import METRICS
 
 logger = logging.getLogger(__name__)
 
@@ -86,6 +126,198 @@ class ThreddsConf(BaseModel):
         default=[],
         description="List of extra attributes.",
     )
+    threads: int = Field(
+        default=1,
+        description="Number of catalogs fetched concurrently.",
+    )
+    cache_path: str | None = Field(
+        default=None,
+        description="Directory to cache catalog XML in.",
+    )
+    streaming: bool = Field(
+        default=False,
+        description="Parse catalogs incrementally.",
+    )
+
+
+class CachingSession(requests.Session):
+    """
+    Session which keeps a disk cache of responses, revalidated with their
+    ``ETag`` or ``Last-Modified`` header.
+    """
+
+    def __init__(self, cache_path: str | None = None, pool_size: int = 10):
+        super().__init__()
+        self.cache_path = cache_path
+
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.mount("http://", adapter)
+        self.mount("https://", adapter)
+
+    def _cache_file(self, url: str) -> str:
+        return os.path.join(self.cache_path, hashlib.sha1(url.encode("utf-8")).hexdigest())
+
+    def _revalidate(self, url: str, **kwargs) -> tuple[requests.Response, dict]:
+        """
+        Request a URL, sending the validators of its cached copy.
+
+        :param url: URL to request
+        :param kwargs: kwargs passed to :py:meth:`requests.Session.get`
+
+        :return: response and the metadata of the cached copy
+        """
+        try:
+            with open(f"{self._cache_file(url)}.json", "r", encoding="utf-8") as reader:
+                cached = json.load(reader)
+        except (FileNotFoundError, ValueError):
+            cached = {}
+
+        headers = kwargs.pop("headers", None) or {}
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+        return super().get(url, headers=headers, **kwargs), cached
+
+    def _store(self, url: str, response: requests.Response, chunks: Iterator[bytes]) -> bool:
+        """
+        Write a response body to the cache if it has a validator.
+
+        :param url: URL requested
+        :param response: response for the URL
+        :param chunks: body of the response
+
+        :return: whether the body was cached
+        """
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+
+        if not (response.ok and (etag or last_modified)):
+            return False
+
+        cache_file = self._cache_file(url)
+        os.makedirs(self.cache_path, exist_ok=True)
+
+        # Write then rename so readers never see a partial catalog
+        tmp_file = f"{cache_file}.{os.getpid()}.{threading.get_ident()}"
+        with open(tmp_file, "wb") as writer:
+            for chunk in chunks:
+                writer.write(chunk)
+        os.replace(tmp_file, cache_file)
+
+        with open(tmp_file, "w", encoding="utf-8") as writer:
+            json.dump(
+                {
+                    "etag": etag,
+                    "last_modified": last_modified,
+                    "content_type": response.headers.get("Content-Type", ""),
+                },
+                writer,
+            )
+        os.replace(tmp_file, f"{cache_file}.json")
+
+        return True
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        if not self.cache_path:
+            return super().get(url, **kwargs)
+
+        response, cached = self._revalidate(url, **kwargs)
+
+        if response.status_code == 304 and cached:
+            try:
+                with open(self._cache_file(url), "rb") as reader:
+                    content = reader.read()
+            except FileNotFoundError:
+                # Lost the body, fetch it again
+                return super().get(url, **kwargs)
+
+            METRICS.increment("thredds.cache_hits")
+            response.status_code = 200
+            response.headers["Content-Type"] = cached.get("content_type", "")
+            response._content = content
+            return response
+
+        METRICS.increment("thredds.cache_misses")
+        self._store(url, response, [response.content])
+
+        return response
+
+    def open(self, url: str) -> tuple[BinaryIO, str]:
+        """
+        Open a URL for reading without holding its body in memory. With a
+        cache, the body is streamed to the cache file, which is then read.
+
+        :param url: URL to open
+
+        :return: binary file object and the final URL after redirects
+        """
+        if self.cache_path:
+            response, cached = self._revalidate(url, stream=True)
+            cache_file = self._cache_file(url)
+
+            if response.status_code == 304 and cached and os.path.exists(cache_file):
+                # Read the empty body so the connection goes back to the pool
+                response.content
+                METRICS.increment("thredds.cache_hits")
+                return open(cache_file, "rb"), response.url
+
+            METRICS.increment("thredds.cache_misses")
+
+            if response.status_code == 304:
+                response.content
+                response = super().get(url, stream=True)
+
+        else:
+            response = super().get(url, stream=True)
+
+        response.raise_for_status()
+
+        if self.cache_path and self._store(
+            url, response, response.iter_content(chunk_size=1024 * 1024)
+        ):
+            return open(self._cache_file(url), "rb"), response.url
+
+        response.raw.decode_content = True
+        return response.raw, response.url
+
+
+class SessionCatalog(TDSCatalog):
+    """
+    TDSCatalog fetched with a shared session, rather than a new session per catalog.
+    """
+
+    def __init__(self, catalog_url: str, session: requests.Session):
+        self._shared_session = session
+        super().__init__(catalog_url)
+
+    @property
+    def session(self) -> requests.Session:
+        return self._shared_session
+
+    @session.setter
+    def session(self, value: requests.Session) -> None:
+        # TDSCatalog creates its own session, which is ignored
+        pass
+
+    def __del__(self):
+        # The shared session is closed by the input, not by each catalog
+        pass
+
+
+class StreamedDataset:
+    """
+    Dataset read from a streamed catalog.
+    """
+
+    __slots__ = ("name", "id", "url_path", "access_urls")
+
+    def __init__(self, name: str, id: str | None, url_path: str, access_urls: CaseInsensitiveDict):
+        self.name = name
+        self.id = id
+        self.url_path = url_path
+        self.access_urls = access_urls
 
 
 class ThreddsInput(Input):
@@ -95,38 +327,249 @@ class ThreddsInput(Input):
 
     config_class = ThreddsConf
 
-    def walk_tds(self, catalog: TDSCatalog, depth: int) -> Iterator:
+    def fetch(self, url: str, depth: int) -> tuple[TDSCatalog, int]:
+        """
+        Fetch and parse a catalog.
+
+        :param url: catalog URL
+        :param depth: remaining depth below the catalog
+
+        :return: catalog and its remaining depth
+        """
+        METRICS.increment("thredds.catalogs")
+
+        return SessionCatalog(url, self.session), depth
+
+    def crawl(self, url: str, depth: int) -> Iterator:
+        """
+        Crawl a THREDDS data catalog, fetching child catalogs concurrently
+        and yielding the datasets of each catalog as it arrives.
+
+        :param url: URL of the root catalog
+        :param depth: Maximum recursive depth.
+        """
+        # Catalog references waiting for a free thread, so only a bounded
+        # number of fetches are queued on the pool
+        waiting = deque([(url, depth)])
+        running = set()
+
+        with ThreadPoolExecutor(max_workers=self.conf.threads) as executor:
+            try:
+                while waiting or running:
+                    while waiting and len(running) < self.conf.threads:
+                        running.add(executor.submit(self.fetch, *waiting.popleft()))
+
+                    done, running = wait(running, return_when=FIRST_COMPLETED)
+
+                    for future in done:
+                        catalog, remaining = future.result()
+
+                        if remaining > 0:
+                            waiting.extend(
+                                (ref.href, remaining - 1) for ref in catalog.catalog_refs.values()
+                            )
+
+                        yield from catalog.datasets.items()
+
+            finally:
+                for future in running:
+                    future.cancel()
+
+    def parse_stream(self, url: str) -> Iterator[tuple[str, Any]]:
         """
-        Return a generator walking a THREDDS data catalog for datasets.
+        Incrementally parse a catalog, freeing each dataset element once it is read.
+
+        :param url: catalog URL
+
+        :return: ``("dataset", dataset)`` and ``("ref", url)`` items in document order
+        """
+        source, final_url = self.session.open(url)
+        METRICS.increment("thredds.catalogs")
+
+        with source:
+            yield from self.parse(source, url, final_url)
+
+    def parse(self, source: BinaryIO, url: str, final_url: str) -> Iterator[tuple[str, Any]]:
+        """
+        Incrementally parse catalog XML.
+
+        :param source: catalog XML
+        :param url: catalog URL, which catalog references are relative to
+        :param final_url: URL the catalog was served from after redirects
+
+        :return: ``("dataset", dataset)`` and ``("ref", url)`` items in document order
+        """
+        url_parts = urlparse(final_url)
+        server_url = f"{url_parts.scheme}://{url_parts.netloc}"
+
+        # service name: list of (service type, base)
+        services = {}
+        # Elements and, for datasets, their context: own and inherited
+        # service name and access elements
+        elements = []
+        datasets = []
+        catalog_service = None
+
+        for event, element in iterparse(source, events=("start", "end")):
+            tag = element.tag.rpartition("}")[2]
+
+            if event == "start":
+                elements.append(element)
+
+                if tag == "dataset":
+                    inherited = datasets[-1]["inherited"] if datasets else catalog_service
+                    datasets.append({"service": None, "inherited": inherited, "access": {}})
+
+                continue
+
+            elements.pop()
+            parent = elements[-1] if elements else None
+            parent_tag = parent.tag.rpartition("}")[2] if parent is not None else None
+
+            if tag == "service" and parent_tag != "service":
+                subservices = [
+                    child for child in element if child.tag.rpartition("}")[2] == "service"
+                ]
+
+                for service in subservices or [element]:
+                    services[service.attrib["name"]] = [
+                        (service.attrib["serviceType"], service.attrib["base"])
+                    ]
+
+                if subservices:
+                    services[element.attrib["name"]] = [
+                        (service.attrib["serviceType"], service.attrib["base"])
+                        for service in subservices
+                    ]
+
+            elif tag == "serviceName":
+                service_name = (element.text or "").strip()
+                inherited = parent_tag == "metadata" and parent.attrib.get("inherited") == "true"
+
+                if not datasets:
+                    if inherited:
+                        catalog_service = service_name
 
-        :param cat: THREDDS catalog.
+                elif parent_tag == "dataset":
+                    datasets[-1]["service"] = service_name
+
+                elif inherited:
+                    datasets[-1]["inherited"] = service_name
+
+            elif tag == "access" and datasets:
+                datasets[-1]["access"][element.attrib["serviceName"]] = element.attrib["urlPath"]
+
+            elif tag == "catalogRef":
+                yield "ref", urljoin(url, element.attrib["{http://www.w3.org/1999/xlink}href"])
+
+            elif tag == "dataset":
+                context = datasets.pop()
+                url_path = element.attrib.get("urlPath")
+
+                if url_path:
+                    access_urls = CaseInsensitiveDict({})
+                    service_name = context["service"] or context["inherited"]
+
+                    for service_type, base in services.get(service_name, []):
+                        if service_type != "Resolver":
+                            access_urls[service_type] = urljoin(urljoin(server_url, base), url_path)
+
+                    for service_name, access_path in context["access"].items():
+                        for service_type, base in services.get(service_name, []):
+                            access_urls[service_type] = urljoin(
+                                urljoin(server_url, base), access_path
+                            )
+
+                    yield "dataset", StreamedDataset(
+                        element.attrib["name"], element.attrib.get("ID"), url_path, access_urls
+                    )
+
+            if tag in ("dataset", "catalogRef") and parent is not None:
+                # Free the element so memory stays flat for long catalogs
+                parent.remove(element)
+
+    def stream(self, url: str, depth: int) -> Iterator:
+        """
+        Crawl a THREDDS data catalog, parsing each catalog incrementally on
+        the thread pool and yielding its datasets as they are read.
+
+        :param url: URL of the root catalog
         :param depth: Maximum recursive depth.
         """
-        yield from catalog.datasets.items()
+        results = Queue(maxsize=1000)
+        stop = threading.Event()
+
+        def put(item) -> bool:
+            while not stop.is_set():
+                try:
+                    results.put(item, timeout=0.1)
+                    return True
+                except Full:
+                    continue
+
+            return False
 
-        if depth > 0:
-            for _, ref in catalog.catalog_refs.items():
-                child = ref.follow()
-                yield from self.walk_tds(catalog=child, depth=depth - 1)
+        def parse(catalog_url: str, remaining: int) -> None:
+            try:
+                for kind, item in self.parse_stream(catalog_url):
+                    if kind == "ref" and remaining <= 0:
+                        continue
 
-    def get_sub_attr(self, obj: object, path: str):
+                    if not put((kind, item, remaining - 1)):
+                        return
+
+            except Exception as error:
+                put(("error", error, None))
+
+            finally:
+                put(("done", None, None))
+
+        with ThreadPoolExecutor(max_workers=self.conf.threads) as executor:
+            executor.submit(parse, url, depth)
+            running = 1
+
+            try:
+                while running:
+                    try:
+                        kind, item, remaining = results.get(timeout=0.1)
+                    except Empty:
+                        continue
+
+                    if kind == "dataset":
+                        yield item.name, item
+
+                    elif kind == "ref":
+                        executor.submit(parse, item, remaining)
+                        running += 1
+
+                    elif kind == "error":
+                        raise item
+
+                    else:
+                        running -= 1
+
+            finally:
+                stop.set()
+                executor.shutdown(wait=True, cancel_futures=True)
+
+    @staticmethod
+    def accessor(path: str) -> Callable[[object], Any]:
         """
-        Returns a child or sub-child attribute of a dict object.
+        Compile an attribute path into a function returning the attribute,
+        so the path is only split once.
 
-        :param obj: Object
         :param path: 'attr1.attr2.etc'
-        :return: obj.attr1.attr2.etc
+        :return: function returning obj.attr1.attr2.etc
         """
         attrs = path.split(".")
 
-        for attr in attrs:
-            if isinstance(obj, CaseInsensitiveDict):
-                obj = obj[attr]
-                continue
+        def get(obj: object) -> Any:
+            for attr in attrs:
+                obj = obj[attr] if isinstance(obj, dict) else getattr(obj, attr)
 
-            obj = getattr(obj, attr)
+            return obj
 
-        return obj
+        return get
 
     def run(self):
         """
@@ -136,16 +579,28 @@ class ThreddsInput(Input):
         total_generated = 0
         start = datetime.now()
 
-        catalog = TDSCatalog(self.conf.url, **self.conf.thredds_kwargs)
+        self.session = CachingSession(self.conf.cache_path, pool_size=self.conf.threads)
+
+        uri = self.accessor(self.conf.uri_term)
+        extra_terms = [
+            (extra_term.output_key, self.accessor(extra_term.key))
+            for extra_term in self.conf.extra_terms
+        ]
+
+        crawl = self.stream if self.conf.streaming else self.crawl
+
+        try:
+            for _, dataset in crawl(self.conf.url, depth=self.conf.depth):
+                output = {"uri": uri(dataset)}
 
-        for _, dataset in self.walk_tds(catalog=catalog, depth=self.conf.depth):
-            output = {"uri": self.get_sub_attr(dataset, self.conf.uri_term)}
+                for output_key, accessor in extra_terms:
+                    output[output_key] = accessor(dataset)
 
-            for extra_term in self.conf.extra_terms:
-                output[extra_term.output_key] = self.get_sub_attr(dataset, extra_term.key)
+                yield output
+                total_generated += 1
 
-            yield output
-            total_generated += 1
+        finally:
+            self.session.close()
 
         end = datetime.now()
         print(f"Processed {total_generated} records from {self.conf.url} in {end - start}")
@@ -0,0 +1,262 @@
+# encoding: utf-8
+"""
+
+"""
+__author__ = "Richard Smith"
+__date__ = "19 Oct 2026"
+__copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+__contact__ = "richard.d.smith@stfc.ac.uk"
+
+import pickle
+import threading
+import time
+
+import pytest
+
+from stac_generator.core.baker import Recipe
+from stac_generator.core.block_cache import BlockCache, BlockCacheConf
+from stac_generator.core.clients import ClientReference, ClientRegistry
+from stac_generator.core.concurrency import merge_iterators
+from stac_generator.core.dedupe import BloomFilter, HashSet
+from stac_generator.core.generator import Generator
+from stac_generator.core.input import Input
+from stac_generator.core.lanes import LaneClassifier, LanePoolConf, Lanes
+from stac_generator.core.metrics import METRICS
+
+
+class ListInput(Input):
+    """Yields numbered records, noting the thread they were read on."""
+
+    def __init__(self, count: int = 0, fail: bool = False, records: list | None = None, **kwargs):
+        super().__init__(**kwargs)
+        self.records = records or [{"uri": f"/data/{n}.nc"} for n in range(count)]
+        self.fail = fail
+        self.threads = set()
+
+    def run(self):
+        for record in self.records:
+            self.threads.add(threading.current_thread().name)
+            yield record
+
+        if self.fail:
+            raise RuntimeError("listing failed")
+
+
+def test_client_references_resolve_once_per_process():
+    registry = ClientRegistry()
+    created = []
+
+    reference = registry.register("store", lambda: created.append(object()) or created[-1])
+    body = {"uri": "s3://bucket/key", "client": reference}
+
+    assert pickle.loads(pickle.dumps(body)) == body
+
+    first, references = registry.resolve(body)
+    second, _ = registry.resolve(body)
+
+    assert references == {"client": ClientReference("store")}
+    assert first["client"] is second["client"] is created[0]
+    assert body["client"] == "store"
+
+
+def test_block_cache_coalesces_and_reuses_blocks(tmp_path, monkeypatch):
+    path = tmp_path / "data.nc"
+    path.write_bytes(bytes(range(256)) * 4)
+
+    cache = BlockCache(
+        BlockCacheConf(block_size=64, read_ahead=1, disk_path=str(tmp_path / "cache"))
+    )
+    fetches = []
+    fetch = cache.fetch
+    monkeypatch.setattr(cache, "fetch", lambda *args: fetches.append(args[1:3]) or fetch(*args))
+
+    assert cache.read(str(path), 10, 100, size=1024) == path.read_bytes()[10:110]
+    assert fetches == [(0, 191)]
+
+    with cache.open(str(path), size=1024) as reader:
+        reader.seek(60)
+        assert reader.read(100) == path.read_bytes()[60:160]
+
+    assert len(fetches) == 1
+
+    cache.memory.clear()
+    assert cache.read(str(path), 0, 64) == path.read_bytes()[:64]
+    assert len(fetches) == 1
+
+
+def test_lanes_keep_order_per_key():
+    processed = []
+    threads = {}
+
+    def worker(record):
+        uri, event = record
+        # Slow records must not let later events for the uri overtake them
+        time.sleep(0.01 if event == "delete" else 0)
+        processed.append(record)
+        threads.setdefault(uri, set()).add(threading.current_thread().name)
+
+    lanes = Lanes(worker, 4)
+    for n in range(20):
+        for event in ("delete", "create"):
+            lanes.submit(f"file_{n}.nc", (f"file_{n}.nc", event))
+    lanes.close()
+
+    assert len(processed) == 40
+    for n in range(20):
+        events = [event for uri, event in processed if uri == f"file_{n}.nc"]
+        assert events == ["delete", "create"]
+
+    assert all(len(names) == 1 for names in threads.values())
+    assert len(set.union(*threads.values())) > 1
+
+
+def test_lanes_raise_worker_errors():
+    def worker(record):
+        raise ValueError(record)
+
+    lanes = Lanes(worker, 2)
+    lanes.submit("a", "a")
+
+    with pytest.raises(ValueError):
+        lanes.close()
+
+
+def test_lane_classifier_uses_size_cost_and_latency():
+    classifier = LaneClassifier(
+        [
+            LanePoolConf(name="large", min_size=1000),
+            LanePoolConf(name="slow", min_latency=10),
+        ]
+    )
+    recipe = Recipe(type="item")
+    annotated = Recipe(type="item", cost=60)
+
+    assert classifier.classify({"uri": "a", "filesize": "5000"}, recipe) == "large"
+    assert classifier.classify({"uri": "a", "size": 10}, annotated) == "slow"
+    assert classifier.classify({"uri": "a", "size": 10}, recipe) is None
+
+    classifier.record_latency(recipe, 20)
+    assert classifier.classify({"uri": "a"}, recipe) == "slow"
+
+    # The cost hint does not change the recipe key
+    assert annotated.key == Recipe(type="item").key
+
+
+def test_lane_classifier_pins_uris_in_flight():
+    classifier = LaneClassifier([LanePoolConf(name="large", min_size=1000)])
+
+    assert classifier.assign("a", {"uri": "a"}, None) is None
+    assert classifier.assign("a", {"uri": "a", "size": 5000}, None) is None
+    assert classifier.assign("b", {"uri": "b", "size": 5000}, None) == "large"
+
+    classifier.release("a")
+    assert classifier.assign("a", {"uri": "a", "size": 5000}, None) is None
+
+    classifier.release("a")
+    classifier.release("a")
+    assert classifier.assign("a", {"uri": "a", "size": 5000}, None) == "large"
+
+
+def test_generator_lanes_keep_order_across_pools():
+    generator = Generator.__new__(Generator)
+    generator.conf = {"lanes": 2}
+    generator.lane_pools = [LanePoolConf(name="large", lanes=2, min_size=1000)]
+    generator.lane_classifier = LaneClassifier(generator.lane_pools)
+    generator.recipe = lambda record, required=True: None
+
+    processed = []
+
+    def process_record(input_plugin, record):
+        # Deletes are slow, so a re-create in another pool would overtake them
+        if record["action"] == "delete":
+            time.sleep(0.05)
+        processed.append((record["uri"], record["action"]))
+
+    generator.process_record = process_record
+
+    records = []
+    for n in range(5):
+        records.append({"uri": f"/data/{n}.nc", "action": "delete"})
+        records.append({"uri": f"/data/{n}.nc", "action": "create", "size": 5000})
+
+    generator.run_lanes(ListInput(records=records))
+
+    for n in range(5):
+        uri = f"/data/{n}.nc"
+        assert [action for key, action in processed if key == uri] == ["delete", "create"]
+
+    assert generator.lane_classifier.in_flight == {}
+
+
+def test_dedupe_hash_set_and_bloom_filter():
+    keys = [f"/badc/cmip6/file{n}.nc" for n in range(5000)]
+
+    hash_set = HashSet(capacity=16)
+    assert all(hash_set.add(key) for key in keys)
+    assert not any(hash_set.add(key) for key in keys)
+    assert len(hash_set) == 5000
+
+    bloom = BloomFilter(capacity=5000, error_rate=0.01)
+    added = sum(bloom.add(key) for key in keys)
+    assert added > 5000 * 0.98
+    assert not any(bloom.add(key) for key in keys)
+    assert len(bloom.bits) < 5000 * 2
+
+
+def test_generator_reads_inputs_ahead_on_a_thread():
+    generator = Generator.__new__(Generator)
+
+    on_demand = ListInput(5)
+    assert [record["uri"] for record in generator.records(on_demand)] == [
+        f"/data/{n}.nc" for n in range(5)
+    ]
+    assert on_demand.threads == {threading.current_thread().name}
+
+    read_ahead = ListInput(50, read_ahead=10)
+    assert [record["uri"] for record in generator.records(read_ahead)] == [
+        f"/data/{n}.nc" for n in range(50)
+    ]
+    assert threading.current_thread().name not in read_ahead.threads
+
+    with pytest.raises(RuntimeError, match="listing failed"):
+        list(generator.records(ListInput(5, fail=True, read_ahead=2)))
+
+    for read_ahead in (-1, True, "10"):
+        with pytest.raises(ValueError):
+            ListInput(5, read_ahead=read_ahead)
+
+
+def test_merge_iterators_closes_generators():
+    closed = []
+
+    def numbers(name):
+        try:
+            yield from range(100)
+        finally:
+            closed.append(name)
+
+    # Held here, so they are not closed by being garbage collected
+    generators = [numbers("a"), numbers("b")]
+
+    merged = merge_iterators(generators, workers=2, max_size=1)
+    next(merged)
+    merged.close()
+
+    assert sorted(closed) == ["a", "b"]
+
+
+def test_read_ahead_gauge_shows_a_full_queue():
+    generator = Generator.__new__(Generator)
+    METRICS.gauge("inputs.ListInput.read_ahead", 0)
+
+    records = generator.records(ListInput(50, read_ahead=10))
+    next(records)
+
+    # The consumer is busy, so the queue fills up behind it
+    deadline = time.monotonic() + 5
+    while METRICS.snapshot()["inputs.ListInput.read_ahead"] < 10:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+    records.close()
@@ -0,0 +1,1264 @@
+# encoding: utf-8
+"""
+
+"""
+__author__ = "Richard Smith"
+__date__ = "19 Oct 2026"
+__copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+__contact__ = "richard.d.smith@stfc.ac.uk"
+
+import gzip
+import io
+import itertools
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+from pydantic import ValidationError
+
+from stac_generator.plugins.inputs.file_system import FileSystemInput
+
+
+@pytest.fixture
+def dataset_tree(tmp_path):
+    for version in ["v1", "v2"]:
+        store = tmp_path / "dataset" / version / "data.zarr"
+        (store / "tas").mkdir(parents=True)
+        (store / ".zgroup").write_text("{}")
+        (store / "tas" / "0.0").write_text("chunk")
+
+    (tmp_path / "dataset" / "README").write_text("readme")
+
+    return tmp_path
+
+
+def test_file_system_files(dataset_tree):
+    file_input = FileSystemInput(conf={"path": str(dataset_tree)})
+
+    uris = [record["uri"] for record in file_input.run()]
+
+    assert len(uris) == 5
+
+
+def test_file_system_directory_regex(dataset_tree):
+    file_input = FileSystemInput(
+        conf={
+            "path": str(dataset_tree),
+            "granularity": "directory",
+            "directory_regex": r"\.zarr$",
+            "stats": True,
+        }
+    )
+
+    records = sorted(file_input.run(), key=lambda record: record["uri"])
+
+    assert [record["uri"] for record in records] == [
+        str(dataset_tree / "dataset" / "v1" / "data.zarr"),
+        str(dataset_tree / "dataset" / "v2" / "data.zarr"),
+    ]
+    assert records[0]["total_files"] == 1
+    assert records[0]["total_size"] == 2
+    assert [file["name"] for file in records[0]["files"]] == [".zgroup"]
+
+    file_input = FileSystemInput(conf=file_input.conf.model_dump() | {"recursive_files": True})
+    records = sorted(file_input.run(), key=lambda record: record["uri"])
+
+    assert records[0]["total_files"] == 2
+    assert records[0]["total_size"] == 7
+    assert [file["name"] for file in records[0]["files"]] == [".zgroup", "tas/0.0"]
+
+
+def test_file_system_directory_depth(dataset_tree):
+    file_input = FileSystemInput(
+        conf={"path": str(dataset_tree), "granularity": "directory", "depth": 1}
+    )
+
+    records = list(file_input.run())
+
+    assert len(records) == 1
+    assert records[0]["files"] == ["README"]
+
+    file_input = FileSystemInput(
+        conf={
+            "path": str(dataset_tree),
+            "granularity": "directory",
+            "depth": 1,
+            "recursive_files": True,
+        }
+    )
+
+    records = list(file_input.run())
+
+    assert records[0]["total_files"] == 5
+    assert records[0]["files"] == [
+        "README",
+        "v1/data.zarr/.zgroup",
+        "v1/data.zarr/tas/0.0",
+        "v2/data.zarr/.zgroup",
+        "v2/data.zarr/tas/0.0",
+    ]
+
+
+def test_file_system_directory_requires_rule(dataset_tree):
+    with pytest.raises(ValueError):
+        FileSystemInput(conf={"path": str(dataset_tree), "granularity": "directory"})
+
+
+def test_file_system_watch_settled_files(tmp_path):
+    pytest.importorskip("inotify_simple")
+    from stac_generator.plugins.inputs.file_system_watch import FileSystemWatchInput
+
+    (tmp_path / "existing.nc").write_text("data")
+
+    watch_input = FileSystemWatchInput(
+        conf={"paths": [str(tmp_path)], "debounce": 0.1, "poll_interval": 0.05}
+    )
+    records = watch_input.run()
+
+    assert next(records)["uri"] == str(tmp_path / "existing.nc")
+
+    (tmp_path / "new").mkdir()
+    (tmp_path / "new" / "arrived.nc").write_text("data")
+    (tmp_path / "new" / "arrived.nc").write_text("more data")
+
+    assert next(records)["uri"] == str(tmp_path / "new" / "arrived.nc")
+    assert not watch_input.pending
+
+    records.close()
+
+
+@pytest.fixture
+def metrics():
+    from stac_generator.core.metrics import METRICS
+
+    METRICS.reset()
+    yield METRICS
+    METRICS.reset()
+
+
+def test_rate_limiter_shared_and_limits(dataset_tree, metrics):
+    conf = {"path": str(dataset_tree), "rate_limit": {"name": "test", "objects_per_second": 50}}
+    first = FileSystemInput(conf=conf)
+    second = FileSystemInput(conf=conf)
+
+    assert first.rate_limiter is second.rate_limiter
+
+    start = time.monotonic()
+    records = list(first.run()) + list(second.run())
+
+    # 10 files at 50/s with a burst of 50 only needs the initial tokens
+    assert len(records) == 10
+    assert time.monotonic() - start < 1
+    assert metrics.snapshot()["rate_limit.test.objects"] == 10
+
+
+def test_rate_limiter_conflicting_conf(caplog):
+    from stac_generator.core.rate_limiter import RateLimitConf, RateLimiter
+
+    limiter = RateLimiter.get(RateLimitConf(name="conflict", objects_per_second=10))
+    assert RateLimiter.get(RateLimitConf(name="conflict", objects_per_second=10)) is limiter
+    assert not caplog.records
+
+    assert RateLimiter.get(RateLimitConf(name="conflict", objects_per_second=20)) is limiter
+    assert limiter.conf.objects_per_second == 10
+    assert "already exists" in caplog.text
+
+
+class FakeS3Client:
+    """
+    S3 client listing a fixed set of keys, a few objects or common prefixes per page.
+    """
+
+    def __init__(self, keys: list[str], page_size: int = 2):
+        self.keys = sorted(keys)
+        self.page_size = page_size
+
+    def get_paginator(self, operation_name):
+        return self
+
+    def paginate(self, Bucket, Prefix="", Delimiter="", StartAfter=""):
+        contents, prefixes = [], []
+
+        for key in self.keys:
+            if not key.startswith(Prefix) or key <= StartAfter:
+                continue
+
+            rest = key[len(Prefix) :]
+            if Delimiter and Delimiter in rest:
+                common_prefix = Prefix + rest[: rest.index(Delimiter) + len(Delimiter)]
+                if common_prefix not in prefixes:
+                    prefixes.append(common_prefix)
+
+            else:
+                contents.append({"Key": key, "Size": len(key), "ETag": '"etag"'})
+
+        for start in range(0, max(len(contents), len(prefixes), 1), self.page_size):
+            yield {
+                "Contents": contents[start : start + self.page_size],
+                "CommonPrefixes": [
+                    {"Prefix": prefix} for prefix in prefixes[start : start + self.page_size]
+                ],
+            }
+
+    def get_object(self, Bucket, Key):
+        return {"Body": io.BytesIO(json.dumps({"key": Key}).encode())}
+
+
+@pytest.fixture
+def object_store(monkeypatch):
+    from stac_generator.plugins.inputs.object_store import ObjectStoreInput
+
+    keys = [
+        "top.nc",
+        "CMIP6/a.nc",
+        "CMIP6/CMIP/b.nc",
+        "CMIP6/CMIP/MOHC/c.nc",
+        "CMIP6/CMIP/MOHC/d.nc",
+        "CMIP6/CMIP/NCAR/e.nc",
+        "CMIP6/ScenarioMIP/f.nc",
+        "CMIP6/ScenarioMIP/MOHC/g.nc",
+        "CORDEX/h.nc",
+        "CORDEX/EUR/i.nc",
+        "CORDEX/EUR/j/k.nc",
+        "obs/l.nc",
+    ]
+    client = FakeS3Client(keys)
+    monkeypatch.setattr(ObjectStoreInput, "create_client", lambda self: client)
+
+    return SimpleNamespace(keys=keys, client=client)
+
+
+@pytest.mark.parametrize(
+    "shards",
+    [{"shard_depth": 1}, {"shard_depth": 2}, {"shard_characters": "CMco"}],
+)
+def test_object_store_shards_list_every_key_once(object_store, shards):
+    from stac_generator.plugins.inputs.object_store import ObjectStoreInput
+
+    object_input = ObjectStoreInput(
+        conf={"url": "https://s3.example.com", "buckets": ["bucket"], "threads": 4} | shards
+    )
+
+    uris = [record["uri"] for record in object_input.run()]
+
+    assert len(uris) == len(set(uris))
+    assert sorted(uris) == sorted(
+        f"https://s3.example.com/bucket/{key}" for key in object_store.keys
+    )
+
+
+def test_object_store_shard_depth(object_store):
+    from stac_generator.plugins.inputs.object_store import ObjectStoreInput
+
+    object_input = ObjectStoreInput(
+        conf={"url": "https://s3.example.com", "prefix": "CMIP6/", "threads": 2, "shard_depth": 2}
+    )
+
+    # Each level above the shard depth is listed on its own
+    assert list(object_input.shards("bucket")) == [
+        {"prefix": "CMIP6/", "level": True},
+        {"prefix": "CMIP6/CMIP/", "level": True},
+        {"prefix": "CMIP6/CMIP/MOHC/"},
+        {"prefix": "CMIP6/CMIP/NCAR/"},
+        {"prefix": "CMIP6/ScenarioMIP/", "level": True},
+        {"prefix": "CMIP6/ScenarioMIP/MOHC/"},
+    ]
+
+
+@pytest.mark.parametrize("threads", [1, 2])
+def test_object_store_store_granularity(monkeypatch, threads):
+    from stac_generator.plugins.inputs.object_store import ObjectStoreInput
+
+    keys = [
+        "CMIP6/tas.zarr/.zmetadata",
+        "CMIP6/tas.zarr/.zgroup",
+        "CMIP6/tas.zarr/tas/0.0",
+        "CMIP6/MOHC/pr.zarr/zarr.json",
+        "CMIP6/MOHC/pr.zarr/pr/c/0/0",
+        "CMIP6/MOHC/refs/pr.json",
+        "CMIP6/MOHC/notes.txt",
+        "catalog.json",
+    ]
+    client = FakeS3Client(keys)
+    monkeypatch.setattr(ObjectStoreInput, "create_client", lambda self: client)
+
+    conf = {
+        "url": "https://s3.example.com",
+        "buckets": ["bucket"],
+        "granularity": "store",
+        "threads": threads,
+        "marker_content": True,
+    }
+
+    # Reference files are opt in
+    records = list(ObjectStoreInput(conf=conf).run())
+    assert sorted(record["uri"] for record in records) == [
+        "https://s3.example.com/bucket/CMIP6/MOHC/pr.zarr",
+        "https://s3.example.com/bucket/CMIP6/tas.zarr",
+    ]
+
+    store = min(records, key=lambda record: record["uri"])
+    assert store["store_type"] == "zarr"
+    assert store["markers"]["zarr.json"]["content"] == {"key": "CMIP6/MOHC/pr.zarr/zarr.json"}
+
+    records = list(ObjectStoreInput(conf=conf | {"reference_suffixes": [".json"]}).run())
+    references = sorted(record["uri"] for record in records if record["store_type"] == "reference")
+    assert len(records) == 4
+    assert references == [
+        "https://s3.example.com/bucket/CMIP6/MOHC/refs/pr.json",
+        "https://s3.example.com/bucket/catalog.json",
+    ]
+
+
+@pytest.fixture
+def inventory(tmp_path):
+    config_dir = tmp_path / "inventory" / "my-bucket" / "all"
+    (config_dir / "data").mkdir(parents=True)
+    (config_dir / "2024-01-01T01-00Z").mkdir()
+
+    with gzip.open(config_dir / "data" / "part-0.csv.gz", "wt") as writer:
+        writer.write('"my-bucket","CMIP6/tas%20v1.nc","10","2024-01-01T00:00:00.000Z","abc"\n')
+        writer.write('"my-bucket","CMIP6/tas.json","5","2024-01-01T00:00:00.000Z","def"\n')
+        writer.write('"my-bucket","other/pr.nc","7","2024-01-01T00:00:00.000Z","ghi"\n')
+
+    manifest = {
+        "sourceBucket": "my-bucket",
+        "fileFormat": "CSV",
+        "fileSchema": "Bucket, Key, Size, LastModifiedDate, ETag",
+        "files": [{"key": "inventory/my-bucket/all/data/part-0.csv.gz"}],
+    }
+    manifest_path = config_dir / "2024-01-01T01-00Z" / "manifest.json"
+    manifest_path.write_text(json.dumps(manifest))
+
+    return manifest_path
+
+
+def test_s3_inventory_csv(inventory):
+    from stac_generator.plugins.inputs.s3_inventory import S3InventoryInput
+
+    inventory_input = S3InventoryInput(
+        conf={
+            "manifest": str(inventory),
+            "url": "https://s3.example.com",
+            "prefix": "CMIP6/",
+            "suffixes": [".nc"],
+        }
+    )
+
+    assert list(inventory_input.run()) == [
+        {
+            "uri": "https://s3.example.com/my-bucket/CMIP6/tas v1.nc",
+            "size": 10,
+            "last_modified": "2024-01-01T00:00:00.000Z",
+            "Etag": "abc",
+        }
+    ]
+
+
+def test_rabbitmq_ack_tracker_batches_contiguous_tags():
+    from stac_generator.plugins.inputs.rabbit_mq import AckTracker
+
+    class Connection:
+        def __init__(self):
+            self.callbacks = []
+
+        def add_callback_threadsafe(self, callback):
+            self.callbacks.append(callback)
+
+    class Channel:
+        is_open = True
+
+        def __init__(self):
+            self.acks = []
+
+        def basic_ack(self, delivery_tag, multiple=False):
+            self.acks.append((delivery_tag, multiple))
+
+    connection, channel = Connection(), Channel()
+    tracker = AckTracker(connection, channel)
+
+    for tag in range(1, 5):
+        tracker.delivered(tag)
+
+    # 2 is not processed, so only 1 can be acknowledged
+    for tag in (1, 3, 4):
+        tracker.complete(tag)
+    tracker.flush()
+
+    assert tracker.acknowledge(batch_size=2) == 0
+    assert tracker.unacknowledged == 4
+
+    # Processed but not yet flushed
+    tracker.complete(2)
+    assert tracker.acknowledge() == 1
+
+    tracker.flush()
+    assert tracker.acknowledge() == 3
+
+    for callback in connection.callbacks:
+        callback()
+
+    assert channel.acks == [(1, True), (4, True)]
+    assert tracker.unacknowledged == 0
+
+
+def test_rabbitmq_consumers_share_work_queue():
+    from types import SimpleNamespace
+
+    from stac_generator.plugins.inputs.rabbit_mq import AckTracker, RabbitMQInput
+
+    class Channel:
+        is_open = True
+
+        def __init__(self):
+            self.acks = []
+
+        def basic_ack(self, delivery_tag, multiple=False):
+            self.acks.append(delivery_tag)
+
+    class Connection:
+        is_open = True
+
+        def __init__(self, callback, channel, messages):
+            self.callback = callback
+            self.channel = channel
+            self.messages = messages
+            self.callbacks = []
+
+        def add_callback_threadsafe(self, callback):
+            self.callbacks.append(callback)
+
+        def process_data_events(self, time_limit=0):
+            while self.callbacks:
+                self.callbacks.pop(0)()
+
+            if self.messages:
+                tag = 4 - len(self.messages)
+                method = SimpleNamespace(delivery_tag=tag)
+                self.callback(self.channel, method, None, self.messages.pop(0))
+            else:
+                time.sleep(0.01)
+
+        def close(self):
+            self.is_open = False
+
+    channels = []
+
+    class TestRabbitMQInput(RabbitMQInput):
+        def _connect(self, callback, metric_prefix):
+            channel = Channel()
+            channels.append(channel)
+            messages = [json.dumps({"uri": f"{metric_prefix}/{n}"}).encode() for n in range(3)]
+
+            return AckTracker(Connection(callback, channel, messages), channel, metric_prefix)
+
+    rabbit_input = TestRabbitMQInput(
+        conf={
+            "connection": {"user": "u", "password": "p", "host": "h", "vhost": "v"},
+            "exchange": {"name": "e"},
+            "uri_term": "uri",
+            "regex": "",
+            "consumers": 2,
+            "prefetch_count": 10,
+        }
+    )
+
+    records = rabbit_input.run()
+    uris = []
+    for body in records:
+        uris.append(body["uri"])
+        rabbit_input.processed(body)
+        rabbit_input.flushed()
+
+        if len(uris) == 6:
+            break
+
+    deadline = time.monotonic() + 5
+    while sum(len(channel.acks) for channel in channels) < 6 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    records.close()
+
+    assert sorted(uris) == sorted(f"rabbitmq.consumer.{c}/{n}" for c in range(2) for n in range(3))
+    assert [channel.acks for channel in channels] == [[1, 2, 3], [1, 2, 3]]
+
+
+def test_rabbitmq_full_window_flushed_once_lanes_finish():
+    import threading
+
+    from stac_generator.core.generator import Generator
+    from stac_generator.core.lanes import LaneClassifier
+    from stac_generator.plugins.inputs.rabbit_mq import AckTracker, RabbitMQInput
+
+    class Connection:
+        def __init__(self):
+            self.callbacks = []
+
+        def add_callback_threadsafe(self, callback):
+            self.callbacks.append(callback)
+
+    class Channel:
+        is_open = True
+
+        def __init__(self):
+            self.acks = []
+
+        def basic_ack(self, delivery_tag, multiple=False):
+            self.acks.append((delivery_tag, multiple))
+
+    connection, channel = Connection(), Channel()
+    tracker = AckTracker(connection, channel)
+
+    rabbit_input = RabbitMQInput(
+        conf={
+            "connection": {"user": "u", "password": "p", "host": "h", "vhost": "v"},
+            "exchange": {"name": "e"},
+            "uri_term": "uri",
+            "regex": "",
+            "prefetch_count": 3,
+            "ack_batch_size": 10,
+        }
+    )
+    rabbit_input.skip_extraction = True
+    rabbit_input.consumers = [SimpleNamespace(tracker=tracker)]
+    rabbit_input.in_flight = {}
+
+    records = []
+    for tag in range(1, 4):
+        tracker.delivered(tag)
+        records.append({"uri": f"/badc/{tag}.nc"})
+        rabbit_input.in_flight[id(records[-1])] = [(tracker, tag)]
+
+    generator = Generator.__new__(Generator)
+    generator.conf = {}
+    generator.outputs = []
+    generator.failed_outputs = []
+    generator.output_lock = threading.RLock()
+    generator.lane_classifier = LaneClassifier([])
+    generator.block_cache = None
+    generator.recipe = lambda record, required=True: None
+    # A bulk output is holding the bodies
+    generator.pending_outputs = lambda: True
+
+    # Lanes finish out of order, and the window is only flushed once all are done
+    for record in (records[2], records[0]):
+        generator.process_record(rabbit_input, record)
+        assert not connection.callbacks
+
+    generator.process_record(rabbit_input, records[1])
+
+    for callback in connection.callbacks:
+        callback()
+
+    assert channel.acks == [(3, True)]
+
+
+def test_rabbitmq_invalid_records_are_acknowledged():
+    from stac_generator.core.metrics import METRICS
+    from stac_generator.plugins.inputs.rabbit_mq import RabbitMQInput
+
+    class Tracker:
+        completed = []
+
+        def complete(self, delivery_tag):
+            self.completed.append(delivery_tag)
+
+    rabbit_input = RabbitMQInput(
+        conf={
+            "connection": {"user": "u", "password": "p", "host": "h", "vhost": "v"},
+            "exchange": {"name": "e"},
+            "uri_term": "uri",
+            "regex": "",
+            "extra_terms": [{"key": "size", "output_key": "size"}],
+        }
+    )
+    rabbit_input.received = itertools.count(1)
+    invalid = METRICS.snapshot().get("rabbitmq.invalid", 0)
+
+    # A list, a missing extra term and a message without a uri
+    bodies = [b"[1, 2]", b'{"uri": "/badc/file.nc"}', b'{"size": 1}']
+    for tag, body in enumerate(bodies, 1):
+        assert rabbit_input.record(Tracker(), tag, body) is None
+
+    assert Tracker.completed == [1, 2, 3]
+    assert METRICS.snapshot()["rabbitmq.invalid"] - invalid == 3
+
+
+def test_rabbitmq_consumer_closes_connection_before_reconnecting(monkeypatch):
+    import pika
+
+    from stac_generator.plugins.inputs.rabbit_mq import (
+        AckTracker,
+        RabbitMQConsumer,
+        RabbitMQInput,
+    )
+
+    class Connection:
+        is_open = True
+
+        def channel(self):
+            raise pika.exceptions.ChannelClosed(404, "NOT_FOUND")
+
+        def process_data_events(self, time_limit=0):
+            raise pika.exceptions.StreamLostError("lost")
+
+        def close(self):
+            self.is_open = False
+
+    connections = []
+
+    def connect(callback, metric_prefix):
+        # Every earlier connection is closed by the time the consumer reconnects
+        assert not any(connection.is_open for connection in connections)
+        connections.append(Connection())
+
+        if len(connections) == 3:
+            consumer.stop.set()
+
+        if len(connections) == 2:
+            # Fails part way through setting up the channel
+            monkeypatch.setattr(pika, "BlockingConnection", lambda parameters: connections[-1])
+            return RabbitMQInput._connect(rabbit_input, callback, metric_prefix)
+
+        return AckTracker(connections[-1], None, metric_prefix)
+
+    rabbit_input = RabbitMQInput(
+        conf={
+            "connection": {"user": "u", "password": "p", "host": "h", "vhost": "v"},
+            "exchange": {"name": "e"},
+            "uri_term": "uri",
+            "regex": "",
+            "reconnect_delay": 0,
+        }
+    )
+    rabbit_input._connect = connect
+    rabbit_input.work_queue = None
+
+    consumer = RabbitMQConsumer(rabbit_input, 0)
+    consumer.run()
+
+    assert len(connections) == 3
+    assert not any(connection.is_open for connection in connections)
+    assert consumer.tracker is None
+
+
+def test_rabbitmq_decode_message_formats():
+    from types import SimpleNamespace
+
+    from stac_generator.plugins.inputs.rabbit_mq import RabbitMQInput
+
+    conf = {
+        "connection": {"user": "u", "password": "p", "host": "h", "vhost": "v"},
+        "exchange": {"name": "e"},
+        "uri_term": "uri",
+        "regex": "",
+    }
+    legacy = b"2024-01-01 00:00:00:/badc/file.nc:DEPOSIT:10:done"
+
+    rabbit_input = RabbitMQInput(conf=conf)
+    assert rabbit_input.decode_message(b'{"filepath": "/badc/file.nc"}')["uri"] == "/badc/file.nc"
+
+    # Legacy formats are opt in
+    with pytest.raises(ValueError):
+        rabbit_input.decode_message(legacy)
+
+    rabbit_input = RabbitMQInput(conf=conf | {"message_formats": ["json", "colon"]})
+    assert rabbit_input.decode_message(legacy)["action"] == "DEPOSIT"
+
+    # The content type selects the format
+    properties = SimpleNamespace(content_type="application/json", headers=None)
+    with pytest.raises(ValueError):
+        rabbit_input.decode_message(legacy, properties)
+
+    # Messages naming an unknown format are invalid and acknowledged
+    class Tracker:
+        completed = []
+
+        def complete(self, delivery_tag):
+            self.completed.append(delivery_tag)
+
+    rabbit_input.received = itertools.count(1)
+    properties = SimpleNamespace(content_type=None, headers={"format": "xml"})
+    assert rabbit_input.record(Tracker(), 7, b"<file/>", properties) is None
+    assert Tracker.completed == [7]
+
+    # Headers can only select the configured formats
+    rabbit_input = RabbitMQInput(conf=conf)
+    rabbit_input.received = itertools.count(1)
+    properties = SimpleNamespace(content_type=None, headers={"format": "literal"})
+    assert rabbit_input.record(Tracker(), 8, b"{'uri': '/badc/file.nc'}", properties) is None
+    assert Tracker.completed == [7, 8]
+
+    properties = SimpleNamespace(content_type=None, headers={"format": "json"})
+    assert rabbit_input.record(Tracker(), 9, b'{"uri": "/badc/file.nc"}', properties)
+
+    with pytest.raises(ValidationError):
+        RabbitMQInput(conf=conf | {"log_sample": 0})
+
+
+def test_rabbitmq_coalesce_events():
+    from queue import Queue
+
+    from stac_generator.plugins.inputs.rabbit_mq import Delivery, RabbitMQInput
+
+    rabbit_input = RabbitMQInput(
+        conf={
+            "connection": {"user": "u", "password": "p", "host": "h", "vhost": "v"},
+            "exchange": {"name": "e"},
+            "uri_term": "uri",
+            "regex": "",
+            "coalesce_window": 0.2,
+        }
+    )
+    rabbit_input.work_queue = Queue()
+
+    now = time.monotonic()
+    events = [("a.nc", "DEPOSIT"), ("b.nc", "DEPOSIT"), ("a.nc", "MODIFY"), ("b.nc", "DELETE")]
+    for tag, (uri, action) in enumerate(events, 1):
+        rabbit_input.work_queue.put(Delivery({"uri": uri}, action, [(None, tag)], now))
+
+    deliveries = rabbit_input.coalesce()
+
+    # The delete is passed on straight away with the merged acknowledgements
+    delete = next(deliveries)
+    assert (delete.record["uri"], delete.action, delete.acks) == (
+        "b.nc",
+        "DELETE",
+        [(None, 2), (None, 4)],
+    )
+
+    modify = next(deliveries)
+    assert (modify.record["uri"], modify.action, modify.acks) == (
+        "a.nc",
+        "MODIFY",
+        [(None, 1), (None, 3)],
+    )
+    assert time.monotonic() - now >= 0.2
+
+
+def test_elasticsearch_aggregation_partitions_and_prefetch(monkeypatch):
+    from stac_generator.plugins.inputs import elasticsearch_aggregation
+
+    uris = [f"/data/{n:03d}.nc" for n in range(250)]
+    requests = []
+
+    class Elasticsearch:
+        def __init__(self, **kwargs):
+            pass
+
+        def search(self, index, body, request_timeout):
+            requests.append(body)
+            composite = body["aggs"]["bucket"]["composite"]
+            partition = body["query"]["bool"]["filter"][0]["range"]["uri.keyword"]
+
+            keys = [
+                uri
+                for uri in uris
+                if partition.get("gte", "") <= uri < partition.get("lt", "~")
+                and uri > composite.get("after", {}).get("uri", "")
+            ][: composite["size"]]
+
+            aggregation = {"buckets": [{"key": {"uri": uri, "recipe_path": ""}} for uri in keys]}
+            if len(keys) == composite["size"]:
+                aggregation["after_key"] = {"uri": keys[-1]}
+
+            return {"aggregations": {"bucket": aggregation}}
+
+    monkeypatch.setattr(elasticsearch_aggregation, "Elasticsearch", Elasticsearch)
+
+    aggregation_input = elasticsearch_aggregation.ElasticsearchAggregationInput(
+        conf={
+            "index": {"name": "test"},
+            "page_size": 100,
+            "partition_ranges": [{"lt": "/data/100.nc"}, {"gte": "/data/100.nc"}],
+            "prefetch": True,
+        }
+    )
+
+    records = [record["uri"] for record in aggregation_input.run()]
+
+    assert sorted(records) == uris
+    assert all(body["aggs"]["bucket"]["composite"]["size"] == 100 for body in requests)
+
+
+def test_elasticsearch_sliced_point_in_time(monkeypatch):
+    from stac_generator.plugins.inputs import elasticsearch
+
+    documents = [{"_id": f"item-{n}", "_source": {"n": n}, "sort": [n]} for n in range(25)]
+    closed = []
+
+    class Elasticsearch:
+        def __init__(self, **kwargs):
+            pass
+
+        def open_point_in_time(self, index, keep_alive):
+            return {"id": "pit"}
+
+        def close_point_in_time(self, body):
+            closed.append(body["id"])
+
+        def search(self, body, request_timeout):
+            assert body["_source"] == ["n"]
+            hits = [
+                hit
+                for hit in documents
+                if hit["sort"][0] % body["slice"]["max"] == body["slice"]["id"]
+                and hit["sort"] > body.get("search_after", [-1])
+            ]
+
+            return {"pit_id": "pit", "hits": {"hits": hits[: body["size"]]}}
+
+    monkeypatch.setattr(elasticsearch, "Elasticsearch", Elasticsearch)
+
+    elasticsearch_input = elasticsearch.ElasticsearchInput(
+        conf={"index": {"name": "items"}, "source_includes": ["n"], "page_size": 4, "slices": 3}
+    )
+
+    records = list(elasticsearch_input.run())
+
+    assert elasticsearch_input.skip_extraction
+    assert sorted(record["n"] for record in records) == list(range(25))
+    assert {record["id"] for record in records} == {f"item-{n}" for n in range(25)}
+    assert closed == ["pit"]
+
+
+CATALOG = """<?xml version="1.0" encoding="UTF-8"?>
+<catalog xmlns="http://www.unidata.ucar.edu/namespaces/thredds/InvCatalog/v1.0"
+    xmlns:xlink="http://www.w3.org/1999/xlink" name="{name}">
+  <service name="odap" serviceType="OPENDAP" base="/thredds/dodsC/"/>
+  {metadata}
+  {body}
+</catalog>
+"""
+
+
+def serve_thredds(tmp_path, dataset: str, metadata: str = ""):
+    """Serve a root catalog referencing three catalogs of four datasets."""
+    import functools
+    import threading
+    from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+    root = tmp_path / "thredds"
+    root.mkdir()
+
+    refs = "".join(
+        f'<catalogRef xlink:href="sub{n}.xml" xlink:title="sub{n}" name="sub{n}"/>'
+        for n in range(3)
+    )
+    (root / "catalog.xml").write_text(CATALOG.format(name="root", metadata=metadata, body=refs))
+
+    for n in range(3):
+        datasets = "".join(dataset.format(name=f"file{n}_{m}.nc") for m in range(4))
+        (root / f"sub{n}.xml").write_text(
+            CATALOG.format(name=f"sub{n}", metadata=metadata, body=datasets)
+        )
+
+    class Handler(SimpleHTTPRequestHandler):
+        # Keep connections open between requests, like a real TDS
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+    class Server(ThreadingHTTPServer):
+        connections = 0
+
+        def process_request(self, request, client_address):
+            Server.connections += 1
+            super().process_request(request, client_address)
+
+    server = Server(("127.0.0.1", 0), functools.partial(Handler, directory=str(tmp_path)))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    yield SimpleNamespace(
+        url=f"http://127.0.0.1:{server.server_address[1]}/thredds/catalog.xml", server=Server
+    )
+
+    server.shutdown()
+
+
+@pytest.fixture
+def thredds_server(tmp_path):
+    yield from serve_thredds(
+        tmp_path,
+        '<dataset name="{name}" urlPath="data/{name}"><serviceName>odap</serviceName></dataset>',
+    )
+
+
+@pytest.fixture
+def thredds_inherited_server(tmp_path):
+    # siphon only reads the service of a catalog's inherited metadata
+    yield from serve_thredds(
+        tmp_path,
+        '<dataset name="{name}" urlPath="data/{name}"/>',
+        '<metadata inherited="true"><serviceName>odap</serviceName></metadata>',
+    )
+
+
+def test_thredds_concurrent_crawl_with_cache(thredds_server, tmp_path):
+    from stac_generator.core.metrics import METRICS
+    from stac_generator.plugins.inputs.thredds import ThreddsInput
+
+    conf = {
+        "url": thredds_server.url,
+        "uri_term": "url_path",
+        "threads": 3,
+        "cache_path": str(tmp_path / "cache"),
+    }
+    expected = sorted(f"data/file{n}_{m}.nc" for n in range(3) for m in range(4))
+
+    assert sorted(record["uri"] for record in ThreddsInput(conf=conf).run()) == expected
+
+    hits = METRICS.snapshot().get("thredds.cache_hits", 0)
+
+    # A re-crawl revalidates every catalog against the cache
+    assert sorted(record["uri"] for record in ThreddsInput(conf=conf).run()) == expected
+    assert METRICS.snapshot()["thredds.cache_hits"] - hits == 4
+
+
+def test_thredds_crawl_reuses_connections(thredds_server):
+    from stac_generator.plugins.inputs.thredds import ThreddsInput
+
+    for threads, streaming in [(1, False), (3, False), (1, True)]:
+        thredds_server.server.connections = 0
+        conf = {
+            "url": thredds_server.url,
+            "uri_term": "url_path",
+            "threads": threads,
+            "streaming": streaming,
+        }
+
+        assert len(list(ThreddsInput(conf=conf).run())) == 12
+
+        # Four catalogs, fetched over at most one connection per thread
+        assert 1 <= thredds_server.server.connections <= threads
+
+
+def test_thredds_streaming_matches_siphon(thredds_inherited_server):
+    from stac_generator.plugins.inputs.thredds import ThreddsInput
+
+    conf = {
+        "url": thredds_inherited_server.url,
+        "uri_term": "access_urls.OPENDAP",
+        "extra_terms": [{"key": "name", "output_key": "name"}],
+    }
+
+    records = sorted(ThreddsInput(conf=conf).run(), key=lambda record: record["uri"])
+    streamed = sorted(
+        ThreddsInput(conf=conf | {"streaming": True, "threads": 2}).run(),
+        key=lambda record: record["uri"],
+    )
+
+    assert len(records) == 12
+    assert records[0]["uri"].endswith("/thredds/dodsC/data/file0_0.nc")
+    assert streamed == records
+
+
+def test_thredds_streaming_through_cache(thredds_server, tmp_path):
+    from stac_generator.core.metrics import METRICS
+    from stac_generator.plugins.inputs.thredds import ThreddsInput
+
+    conf = {
+        "url": thredds_server.url,
+        "uri_term": "access_urls.OPENDAP",
+        "streaming": True,
+        "cache_path": str(tmp_path / "cache"),
+    }
+
+    records = sorted(record["uri"] for record in ThreddsInput(conf=conf).run())
+    assert len(records) == 12
+    assert len(list((tmp_path / "cache").glob("*.json"))) == 4
+
+    hits = METRICS.snapshot().get("thredds.cache_hits", 0)
+    thredds_server.server.connections = 0
+
+    assert sorted(record["uri"] for record in ThreddsInput(conf=conf).run()) == records
+    assert METRICS.snapshot()["thredds.cache_hits"] - hits == 4
+    assert thredds_server.server.connections == 1
+
+
+class FakeSolrSession:
+    """Serves cursor pages of ESGF style Solr documents."""
+
+    docs = [
+        {
+            "id": f"cmip6.model.run{n:02d}.tas.tas_{n:02d}.nc|esgf.node",
+            "size": n,
+            "project": f"p{n % 3}",
+        }
+        for n in range(25)
+    ]
+    requests = []
+
+    def __init__(self):
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.closed = True
+
+    def get(self, url, params, timeout):
+        self.requests.append(params.copy())
+        docs = [
+            doc
+            for doc in self.docs
+            if "fq" not in params or doc["project"] == params["fq"].split(":", 1)[1]
+        ]
+        start = int(params["cursorMark"]) if params["cursorMark"] != "*" else 0
+        page = docs[start : start + params["rows"]]
+        body = {
+            "response": {"numFound": len(docs), "docs": page},
+            "nextCursorMark": str(start + len(page)) if page else params["cursorMark"],
+        }
+
+        class Response:
+            def raise_for_status(self):
+                pass
+
+            def json(self):
+                return body
+
+        return Response()
+
+
+def test_solr_session_fields_and_prefetch(monkeypatch):
+    from stac_generator.plugins.inputs import solr
+
+    FakeSolrSession.requests = []
+    monkeypatch.setattr(solr.requests, "Session", FakeSolrSession)
+
+    solr_input = solr.SolrInput(
+        conf={
+            "url": "https://index.node/solr/files/select",
+            "params": {"rows": 10},
+            "extra_terms": [{"key": "size", "output_key": "size"}],
+        }
+    )
+
+    records = list(solr_input.run())
+
+    assert len(records) == 25
+    assert records[0] == {"uri": "cmip6/model/run00/tas/tas_00.nc|esgf.node", "size": 0}
+    assert [params["cursorMark"] for params in FakeSolrSession.requests] == ["*", "10", "20", "25"]
+    assert all(params["fl"] == "id,size" for params in FakeSolrSession.requests)
+
+
+def test_solr_partitions_resume_from_cursor_file(monkeypatch, tmp_path):
+    from stac_generator.plugins.inputs import solr
+
+    FakeSolrSession.requests = []
+    monkeypatch.setattr(solr.requests, "Session", FakeSolrSession)
+
+    conf = {
+        "url": "https://index.node/solr/files/select",
+        "params": {"rows": 3},
+        "partition_queries": [f"project:p{n}" for n in range(3)],
+        "cursor_file": str(tmp_path / "cursors.json"),
+    }
+
+    # Interrupt the harvest part way through
+    records = solr.SolrInput(conf=conf).run()
+    first = [next(records)["uri"] for _ in range(10)]
+    records.close()
+
+    cursors = json.loads((tmp_path / "cursors.json").read_text())
+    assert set(cursors) <= set(conf["partition_queries"])
+
+    second = [record["uri"] for record in solr.SolrInput(conf=conf).run()]
+
+    assert len(set(first + second)) == 25
+    assert len(second) < 25
+    assert all(
+        cursor is None for cursor in json.loads((tmp_path / "cursors.json").read_text()).values()
+    )
+    assert list(solr.SolrInput(conf=conf).run()) == []
+
+
+def test_intake_esm_chunked_columns(monkeypatch, tmp_path):
+    import pandas as pd
+
+    from stac_generator.plugins.inputs import intake_esm
+
+    df = pd.DataFrame(
+        {
+            "path": [f"/badc/cmip6/file{n}.nc" for n in range(10)],
+            "variable_id": ["tas", "pr"] * 5,
+            "member_id": [f"r{n}i1p1f1" for n in range(10)],
+            "dims": ["['time', 'lat', 'lon']"] * 10,
+        }
+    )
+    df.to_csv(tmp_path / "catalog.csv.gz", index=False)
+    (tmp_path / "catalog.json").write_text(json.dumps({"catalog_file": "catalog.csv.gz"}))
+
+    conf = {
+        "url": str(tmp_path / "catalog.json"),
+        "uri_term": "path",
+        "extra_terms": [
+            {"key": "variable_id", "output_key": "variable"},
+            {"key": "dims", "output_key": "dims"},
+        ],
+        "skip": 1,
+        "chunk_size": 3,
+        "catalog_kwargs": {"columns_with_iterables": ["dims"]},
+    }
+    expected = [
+        {
+            "uri": f"/badc/cmip6/file{n}.nc",
+            "variable": ["tas", "pr"][n % 2],
+            "dims": ["time", "lat", "lon"],
+        }
+        for n in range(2, 10)
+    ]
+
+    assert list(intake_esm.IntakeESMInput(conf=conf).run()) == expected
+
+    class Catalog:
+        def __init__(self, df):
+            self.df = df
+
+        def search(self, **kwargs):
+            return Catalog(self.df[self.df.variable_id.isin(kwargs["variable_id"])])
+
+    monkeypatch.setattr(
+        intake_esm,
+        "intake",
+        SimpleNamespace(open_esm_datastore=lambda url, **kwargs: Catalog(df)),
+    )
+
+    searched = intake_esm.IntakeESMInput(
+        conf=conf | {"search_kwargs": {"variable_id": ["tas"]}, "skip": -1}
+    )
+
+    assert [record["uri"] for record in searched.run()] == [
+        f"/badc/cmip6/file{n}.nc" for n in range(0, 10, 2)
+    ]
+
+
+def test_text_file_parallel_chunks_and_dedupe(tmp_path):
+    from stac_generator.plugins.inputs.text_file import TextFileInput
+
+    for n in range(2):
+        with open(tmp_path / f"listing{n}.json", "w", encoding="utf-8") as writer:
+            for m in range(100):
+                writer.write(json.dumps({"path": f"/data/{(n * 50 + m) % 120}.nc", "size": m}))
+                writer.write("\n")
+
+    uris = {f"/data/{n}.nc" for n in range(120)}
+
+    for dedupe in ["exact", "bloom"]:
+        text_input = TextFileInput(
+            conf={
+                "path": str(tmp_path),
+                "uri_term": "path",
+                "extra_terms": [{"key": "size", "output_key": "size"}],
+                "threads": 3,
+                "chunk_size": 100,
+                "dedupe": dedupe,
+                "bloom_capacity": 1000,
+            }
+        )
+        records = list(text_input.run())
+
+        assert len(records) == len(uris)
+        assert {record["uri"] for record in records} == uris
+
+    text_input = TextFileInput(conf={"path": str(tmp_path), "uri_term": "path", "dedupe": "none"})
+    assert len(list(text_input.run())) == 200
+
+
+def test_stdin_lines_and_ndjson_output(monkeypatch, capfdbinary):
+    import io
+
+    from stac_generator.plugins.bulk_outputs.ndjson import NDJSONBulkOutput
+    from stac_generator.plugins.inputs.stdin import StdinInput
+
+    lines = b'/data/a.nc\n{"path": "/data/b.nc", "size": 2}\n\n/data/c.nc'
+    monkeypatch.setattr("sys.stdin", SimpleNamespace(buffer=io.BytesIO(lines)))
+
+    stdin_input = StdinInput(
+        conf={
+            "uri_term": "path",
+            "extra_terms": [{"key": "size", "output_key": "size"}],
+            "buffer_size": 7,
+        }
+    )
+    records = list(stdin_input.run())
+
+    assert records == [
+        {"uri": "/data/a.nc"},
+        {"uri": "/data/b.nc", "size": 2},
+        {"uri": "/data/c.nc"},
+    ]
+
+    output = NDJSONBulkOutput(conf={"cache_max_size": 2})
+    for record in records:
+        output.run(record)
+    output.clear_cache()
+
+    written = capfdbinary.readouterr().out.splitlines()
+    assert [json.loads(line) for line in written] == records
+    assert written[1] == b'{"uri":"/data/b.nc","size":2}'
+
+
+def test_parquet_projection_and_filters(tmp_path):
+    import datetime
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    from stac_generator.plugins.inputs.parquet import ParquetInput
+
+    table = pa.table(
+        {
+            "path": [f"/badc/{['cmip6', 'cordex'][n % 2]}/file{n:03d}.nc" for n in range(200)],
+            "size": list(range(200)),
+            "mtime": [
+                datetime.datetime(2024, 1, 1) + datetime.timedelta(days=n) for n in range(200)
+            ],
+            "owner": ["badc"] * 200,
+        }
+    )
+    pq.write_table(table, tmp_path / "listing.parquet", row_group_size=50)
+
+    conf = {
+        "path": str(tmp_path / "listing.parquet"),
+        "uri_term": "path",
+        "extra_terms": [{"key": "size", "output_key": "size"}],
+        "filters": [
+            {"key": "path", "op": "prefix", "value": "/badc/cmip6/"},
+            {"key": "size", "op": "<", "value": 100},
+            {"key": "mtime", "op": ">=", "value": "2024-01-21"},
+        ],
+        "batch_size": 16,
+    }
+
+    records = list(ParquetInput(conf=conf).run())
+
+    assert records == [{"uri": f"/badc/cmip6/file{n:03d}.nc", "size": n} for n in range(20, 100, 2)]
+
+    ipc_path = tmp_path / "listing.arrow"
+    with pa.ipc.new_file(ipc_path, table.schema) as writer:
+        writer.write_table(table)
+
+    records = ParquetInput(
+        conf={
+            "path": str(ipc_path),
+            "format": "ipc",
+            "uri_term": "path",
+            "filters": [{"key": "size", "op": "in", "value": [1, 3]}],
+        }
+    ).run()
+
+    assert list(records) == [{"uri": "/badc/cordex/file001.nc"}, {"uri": "/badc/cordex/file003.nc"}]
+
+    # An empty prefix matches every row
+    records = ParquetInput(
+        conf=conf | {"filters": [{"key": "path", "op": "prefix", "value": ""}]}
+    ).run()
+
+    assert len(list(records)) == 200